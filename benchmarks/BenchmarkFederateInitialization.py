@@ -0,0 +1,112 @@
+"""
+Benchmark of the subscription extraction and deduplication that is done when a federate is initialized,
+using a synthetic esdl with a configurable amount of houses. Each house is a building with an EConnection
+and a PVInstallation, all EConnections are connected to one bus.
+
+Two calculation services are initialized:
+- An EConnection service that simulates all EConnections and subscribes to its PVInstallation and the energy market.
+- A Carriers service that subscribes to all EConnections.
+
+Usage: python BenchmarkFederateInitialization.py [amount_of_houses ...]
+"""
+import base64
+import os
+import sys
+import time
+import uuid
+
+import helics as h
+from esdl import esdl
+from esdl.esdl_handler import EnergySystemHandler
+
+os.environ.setdefault("calculation_services", "EConnection;PVInstallation;EnergyMarket;Carriers")
+
+from dots_infrastructure.DataClasses import SubscriptionDescription
+from dots_infrastructure.EsdlHelper import EsdlHelper
+from dots_infrastructure.HelicsFederateHelpers import HelicsValueFederateExecutor
+from dots_infrastructure.Logger import LOGGER
+
+LOGGER.setLevel("WARNING")
+
+AMOUNTS_OF_HOUSES = [int(arg) for arg in sys.argv[1:]] if len(sys.argv) > 1 else [1000, 2000, 4000, 8000]
+CALCULATION_SERVICES = ["EConnection", "PVInstallation", "EnergyMarket", "Carriers"]
+
+def new_id():
+    return str(uuid.uuid4())
+
+def connect(out_port : esdl.OutPort, in_port : esdl.InPort):
+    out_port.connectedTo.append(in_port)
+
+def create_synthetic_esdl(amount_of_houses : int):
+    energy_system = esdl.EnergySystem(id=new_id(), name="synthetic")
+    carriers = esdl.Carriers(id=new_id())
+    electricity = esdl.ElectricityCommodity(id=new_id(), name="Electricity")
+    carriers.carrier.append(electricity)
+    energy_system.energySystemInformation = esdl.EnergySystemInformation(id=new_id(), carriers=carriers)
+    services = esdl.Services(id=new_id())
+    services.service.append(esdl.EnergyMarket(id=new_id(), name="DA-market"))
+    energy_system.services = services
+    area = esdl.Area(id=new_id(), name="area")
+    energy_system.instance.append(esdl.Instance(id=new_id(), name="instance", area=area))
+
+    bus = esdl.Bus(id=new_id(), name="bus")
+    area.asset.append(bus)
+    e_connection_ids = []
+    for i in range(amount_of_houses):
+        bus_port = esdl.OutPort(id=new_id(), carrier=electricity)
+        bus.port.append(bus_port)
+        building = esdl.Building(id=new_id(), name=f"house{i}")
+        e_connection = esdl.EConnection(id=new_id(), name=f"connection{i}")
+        grid_port = esdl.InPort(id=new_id(), carrier=electricity)
+        pv_in_port = esdl.InPort(id=new_id(), carrier=electricity)
+        e_connection.port.extend([grid_port, pv_in_port])
+        pv = esdl.PVInstallation(id=new_id(), name=f"pv{i}")
+        pv_out_port = esdl.OutPort(id=new_id(), carrier=electricity)
+        pv.port.append(pv_out_port)
+        connect(bus_port, grid_port)
+        connect(pv_out_port, pv_in_port)
+        building.asset.extend([e_connection, pv])
+        area.asset.append(building)
+        e_connection_ids.append(e_connection.id)
+
+    esh = EnergySystemHandler(energy_system)
+    esh.resource = esh.rset.create_resource("synthetic.esdl")
+    esh.resource.append(energy_system)
+    esdl_string = esh.to_string()
+    return base64.b64encode(esdl_string.encode("utf-8")).decode("utf-8"), e_connection_ids, carriers.id
+
+def initialize_inputs(esdl_helper : EsdlHelper, esdl_ids, subscription_descriptions):
+    executor = HelicsValueFederateExecutor.__new__(HelicsValueFederateExecutor)
+    inputs = {}
+    extraction_duration = 0.0
+    deduplication_duration = 0.0
+    for esdl_id in esdl_ids:
+        start = time.perf_counter()
+        inputs_for_esdl_object = esdl_helper.get_connected_input_esdl_objects(esdl_id, CALCULATION_SERVICES, subscription_descriptions)
+        extraction_duration += time.perf_counter() - start
+        start = time.perf_counter()
+        executor.remove_duplicate_subscriptions_and_update_inputs(inputs, inputs_for_esdl_object)
+        deduplication_duration += time.perf_counter() - start
+    return len(inputs), extraction_duration, deduplication_duration
+
+def main():
+    e_connection_subscriptions = [
+        SubscriptionDescription("PVInstallation", "PV_Dispatch", "W", h.HelicsDataType.DOUBLE),
+        SubscriptionDescription("EnergyMarket", "Price", "EUR", h.HelicsDataType.DOUBLE)
+    ]
+    carriers_subscriptions = [
+        SubscriptionDescription("EConnection", "EConnectionDispatch", "W", h.HelicsDataType.DOUBLE)
+    ]
+
+    print(f"{'houses':>8} {'parse [s]':>10} {'service':>12} {'inputs':>8} {'extract [s]':>12} {'dedup [s]':>10}")
+    for amount_of_houses in AMOUNTS_OF_HOUSES:
+        esdl_base64, e_connection_ids, carriers_id = create_synthetic_esdl(amount_of_houses)
+        start = time.perf_counter()
+        esdl_helper = EsdlHelper(esdl_base64)
+        parse_duration = time.perf_counter() - start
+        for service_name, esdl_ids, subscriptions in [("EConnection", e_connection_ids, e_connection_subscriptions), ("Carriers", [carriers_id], carriers_subscriptions)]:
+            amount_of_inputs, extraction_duration, deduplication_duration = initialize_inputs(esdl_helper, esdl_ids, subscriptions)
+            print(f"{amount_of_houses:>8} {parse_duration:>10.2f} {service_name:>12} {amount_of_inputs:>8} {extraction_duration:>12.3f} {deduplication_duration:>10.3f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,130 @@
+"""
+Benchmark of the HELICS core types and of sharing a core between the federates of a calculation service. Two
+calculation services run a control loop against a local HELICS broker of the same type, on the esdl of the tests:
+- A PVInstallation service with a calculation that publishes the PV dispatch every minute and a calculation that
+  subscribes to the dispatch of the EConnection.
+- An EConnection service with a calculation that subscribes to the PV dispatch and publishes its dispatch.
+
+Every time step the values make a round trip from the PV service to the EConnection service and back. Reported are
+the wall time of the simulation, the mean duration of a time step (the latency of a round trip) and the amount of
+published values per second (the throughput).
+
+Usage: python BenchmarkHelicsCoreTypes.py [simulation_duration_in_seconds]
+"""
+import base64
+from datetime import datetime
+import os
+import sys
+import threading
+import time
+from unittest.mock import MagicMock
+
+import helics as h
+
+os.environ.setdefault("calculation_services", "PVInstallation;EConnection")
+
+from dots_infrastructure import CalculationServiceHelperFunctions
+from dots_infrastructure.DataClasses import HelicsCalculationInformation, PublicationDescription, SimulatorConfiguration, SubscriptionDescription
+from dots_infrastructure.EsdlHelper import EsdlHelper
+from dots_infrastructure.HelicsFederateHelpers import IN_PROCESS_CORE_TYPES, HelicsInitializationMessagesFederateExecutor, HelicsSimulationExecutor, HelicsValueFederateExecutor
+from dots_infrastructure.Logger import LOGGER
+from dots_infrastructure.test_infra.InfluxDBMock import InfluxDBMock
+
+SIMULATION_DURATION_IN_SECONDS = int(sys.argv[1]) if len(sys.argv) > 1 else 86400
+PERIOD_IN_SECONDS = 60
+ESDL_FILE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "test", "test.esdl")
+BROKER_PORT = 23420
+CALCULATION_SERVICES = ["PVInstallation", "EConnection"]
+PV_INSTALLATION_IDS = ['176af591-6d9d-4751-bb0f-fac7e99b1c3d', 'b8766109-5328-416f-9991-e81a5cada8a6']
+E_CONNECTION_IDS = ["f006d594-0743-4de5-a589-a6c2350898da"]
+CORE_CONFIGURATIONS = [
+    (h.HelicsCoreType.ZMQ, False),
+    (h.HelicsCoreType.ZMQ, True),
+    (h.HelicsCoreType.ZMQ_SS, False),
+    (h.HelicsCoreType.ZMQ_SS, True),
+    (h.HelicsCoreType.TCP_SS, True),
+    (h.HelicsCoreType.IPC, True),
+    (h.HelicsCoreType.INPROC, True),
+]
+
+published_values_lock = threading.Lock()
+amount_of_published_values = 0
+publish_helics_value = HelicsValueFederateExecutor.publish_helics_value
+
+def counted_publish_helics_value(self, helics_output, value):
+    global amount_of_published_values
+    publish_helics_value(self, helics_output, value)
+    with published_values_lock:
+        amount_of_published_values += 1
+
+def get_broker_name(broker_port):
+    return f"benchmark_broker_{broker_port}"
+
+def simulator_configuration(esdl_type, esdl_ids, model_id, broker_port, helics_core_type, share_helics_core):
+    # an ipc broker is addressed by the name of its queue instead of an ip address
+    broker_ip = get_broker_name(broker_port) if helics_core_type == h.HelicsCoreType.IPC else "127.0.0.1"
+    return SimulatorConfiguration(esdl_type, esdl_ids, model_id, broker_ip, broker_port, "benchmark", SIMULATION_DURATION_IN_SECONDS, datetime(2024, 1, 1), "test-host", "test-port", "test-username", "test-password", "test-database-name", h.HelicsLogLevel.NO_PRINT, CALCULATION_SERVICES, helics_core_type=helics_core_type, share_helics_core=share_helics_core)
+
+def calculation(name, inputs, outputs, calculation_function):
+    return HelicsCalculationInformation(PERIOD_IN_SECONDS, 0, False, False, True, name, inputs, outputs, calculation_function)
+
+class CalculationServicePVInstallation(HelicsSimulationExecutor):
+
+    def __init__(self, *core_configuration):
+        CalculationServiceHelperFunctions.get_simulator_configuration_from_environment = lambda: simulator_configuration("PVInstallation", PV_INSTALLATION_IDS, "Benchmark-PV", *core_configuration)
+        super().__init__()
+        self.influx_connector = InfluxDBMock()
+        self.next_pv_dispatch = 1.0
+        self.add_calculation(calculation("pv_dispatch", [], [PublicationDescription(True, "PVInstallation", "PV_Dispatch", "W", h.HelicsDataType.DOUBLE)], self.pv_dispatch))
+        self.add_calculation(calculation("process_e_connection_dispatch", [SubscriptionDescription("EConnection", "EConnectionDispatch", "W", h.HelicsDataType.DOUBLE)], [], self.process_e_connection_dispatch))
+
+    def pv_dispatch(self, param_dict, simulation_time, time_step_number, esdl_id, energy_system):
+        return {"PV_Dispatch" : self.next_pv_dispatch}
+
+    def process_e_connection_dispatch(self, param_dict, simulation_time, time_step_number, esdl_id, energy_system):
+        self.next_pv_dispatch = CalculationServiceHelperFunctions.get_single_param_with_name(param_dict, "EConnectionDispatch") + 1
+        return {}
+
+class CalculationServiceEConnection(HelicsSimulationExecutor):
+
+    def __init__(self, *core_configuration):
+        CalculationServiceHelperFunctions.get_simulator_configuration_from_environment = lambda: simulator_configuration("EConnection", E_CONNECTION_IDS, "Benchmark-EConnection", *core_configuration)
+        super().__init__()
+        self.influx_connector = InfluxDBMock()
+        self.add_calculation(calculation("e_connection_dispatch", [SubscriptionDescription("PVInstallation", "PV_Dispatch", "W", h.HelicsDataType.DOUBLE)], [PublicationDescription(True, "EConnection", "EConnectionDispatch", "W", h.HelicsDataType.DOUBLE)], self.e_connection_dispatch))
+
+    def e_connection_dispatch(self, param_dict, simulation_time, time_step_number, esdl_id, energy_system):
+        return {"EConnectionDispatch" : sum(CalculationServiceHelperFunctions.get_vector_param_with_name(param_dict, "PV_Dispatch"))}
+
+def run_simulation(helics_core_type, share_helics_core, broker_port):
+    global amount_of_published_values
+    calculation_services = [CalculationServicePVInstallation(broker_port, helics_core_type, share_helics_core), CalculationServiceEConnection(broker_port, helics_core_type, share_helics_core)]
+    amount_of_federates = sum(len(calculation_service.calculations) for calculation_service in calculation_services)
+    broker_arguments = f"-f {amount_of_federates}" if helics_core_type in IN_PROCESS_CORE_TYPES else f"-f {amount_of_federates} --port {broker_port}"
+    broker = h.helicsCreateBroker(helics_core_type.name.lower(), get_broker_name(broker_port), broker_arguments)
+
+    amount_of_published_values = 0
+    start = time.perf_counter()
+    for calculation_service in calculation_services:
+        calculation_service.start_simulation()
+    for calculation_service in calculation_services:
+        calculation_service.stop_simulation()
+    duration = time.perf_counter() - start
+    h.helicsBrokerWaitForDisconnect(broker, 10000)
+    return amount_of_published_values, duration
+
+if __name__ == "__main__":
+    LOGGER.disabled = True
+    with open(ESDL_FILE_PATH, mode="r") as esdl_file:
+        encoded_base64_esdl = base64.b64encode(esdl_file.read().encode("utf-8")).decode("utf-8")
+    HelicsInitializationMessagesFederateExecutor.init_federate = MagicMock()
+    HelicsInitializationMessagesFederateExecutor.send_amount_of_calculations = MagicMock()
+    HelicsInitializationMessagesFederateExecutor.wait_for_esdl_file = MagicMock(side_effect=lambda: EsdlHelper(encoded_base64_esdl))
+    HelicsValueFederateExecutor.publish_helics_value = counted_publish_helics_value
+
+    amount_of_time_steps = SIMULATION_DURATION_IN_SECONDS // PERIOD_IN_SECONDS
+    print(f"simulation of {SIMULATION_DURATION_IN_SECONDS} s, {amount_of_time_steps} time steps of {PERIOD_IN_SECONDS} s, 3 federates in 2 services")
+    for i, (helics_core_type, share_helics_core) in enumerate(CORE_CONFIGURATIONS):
+        amount_of_values, duration = run_simulation(helics_core_type, share_helics_core, BROKER_PORT + i)
+        core_layout = "shared core per service" if share_helics_core else "core per federate"
+        print(f"{helics_core_type.name:>7}, {core_layout:<24}: {duration:.2f} s, {duration / amount_of_time_steps * 1e3:.3f} ms per time step, {amount_of_values / duration:,.0f} values/s")
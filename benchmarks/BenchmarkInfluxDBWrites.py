@@ -0,0 +1,129 @@
+"""
+Benchmark of the InfluxDBConnector write path for different chunk sizes and gzip compression levels. The data points
+are serialized to line protocol up front, the benchmark measures writing them with write_line_protocol in chunks,
+i.e. compressing the chunks and posting them over the persistent client. As reference the same chunks are written
+with a new client per chunk, which is what happens when the client of the connector is not reused.
+
+The writes go to a local HTTP stand-in for the InfluxDB /write and /ping endpoints. The stand-in speaks HTTP/1.1 so
+connections are kept alive, decompresses gzip request bodies, counts the received lines and the opened connections.
+Optionally the stand-in limits the received bytes to the given bandwidth to mimic a remote InfluxDB. The values of the
+data points are random so the compression ratio is not flattered by repeated values.
+
+Usage: python BenchmarkInfluxDBWrites.py [amount_of_data_points] [bandwidth_in_megabit_per_second]
+"""
+from datetime import datetime, timedelta
+import gzip
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import random
+import sys
+import threading
+import time
+
+from dots_infrastructure.Logger import LOGGER
+from dots_infrastructure.influxdb_connector import InfluxDBConnector, to_line_protocol
+from dots_infrastructure.result_sink import ColumnarPointBuffer, get_epoch_seconds
+
+AMOUNT_OF_DATA_POINTS = int(sys.argv[1]) if len(sys.argv) > 1 else 1000000
+BANDWIDTH_IN_MEGABIT_PER_SECOND = float(sys.argv[2]) if len(sys.argv) > 2 else 0.0
+AMOUNT_OF_ESDL_IDS = 100
+OUTPUT_NAMES = ["active_power", "reactive_power", "state_of_charge", "temperature"]
+
+class InfluxWriteStandIn(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    statistics_lock = threading.Lock()
+    amount_of_connections = 0
+    amount_of_lines = 0
+    amount_of_bytes = 0
+
+    def setup(self):
+        super().setup()
+        with self.statistics_lock:
+            InfluxWriteStandIn.amount_of_connections += 1
+
+    def _respond(self, status_code):
+        self.send_response(status_code)
+        self.send_header("X-Influxdb-Version", "1.8.10")
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+    def do_GET(self):
+        self._respond(204)
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        if BANDWIDTH_IN_MEGABIT_PER_SECOND > 0:
+            time.sleep(len(body) * 8 / (BANDWIDTH_IN_MEGABIT_PER_SECOND * 1e6))
+        if self.headers.get("Content-Encoding") == "gzip":
+            data = gzip.decompress(body)
+        else:
+            data = body
+        with self.statistics_lock:
+            InfluxWriteStandIn.amount_of_bytes += len(body)
+            InfluxWriteStandIn.amount_of_lines += data.count(b"\n")
+        self._respond(204)
+
+    def log_message(self, format, *args):
+        pass
+
+    @classmethod
+    def reset_statistics(cls):
+        cls.amount_of_connections = 0
+        cls.amount_of_lines = 0
+        cls.amount_of_bytes = 0
+
+def generate_data_points() -> ColumnarPointBuffer:
+    data_points = ColumnarPointBuffer()
+    random_generator = random.Random(42)
+    esdl_ids = [f"esdl-id-{i}" for i in range(AMOUNT_OF_ESDL_IDS)]
+    start_time = datetime(2024, 1, 1)
+    amount_of_time_steps = AMOUNT_OF_DATA_POINTS // (AMOUNT_OF_ESDL_IDS * len(OUTPUT_NAMES))
+    for time_step in range(amount_of_time_steps):
+        timestamp = get_epoch_seconds(start_time + timedelta(seconds=900 * time_step))
+        for esdl_id in esdl_ids:
+            for output_name in OUTPUT_NAMES:
+                data_points.append(esdl_id, output_name, timestamp, random_generator.uniform(-1e4, 1e4))
+    return data_points
+
+def serialize_in_chunks(data_points: ColumnarPointBuffer, chunk_size: int, influx_connector: InfluxDBConnector):
+    chunks = []
+    remaining_data_points = ColumnarPointBuffer()
+    remaining_data_points.extend(data_points)
+    while len(remaining_data_points) > 0:
+        chunks.append(to_line_protocol(remaining_data_points.take(chunk_size), influx_connector.get_line_prefix))
+    return chunks
+
+def write_chunks(port: int, data_points: ColumnarPointBuffer, chunk_size: int, gzip_compression_level: int, reuse_client: bool = True):
+    influx_connector = InfluxDBConnector("127.0.0.1", str(port), "user", "password", "benchmark", chunk_size=chunk_size, gzip_compression_level=gzip_compression_level)
+    influx_connector.init_profile_output_data("benchmark-simulation", "benchmark-model", "Battery", {})
+    chunks = serialize_in_chunks(data_points, chunk_size, influx_connector)
+
+    InfluxWriteStandIn.reset_statistics()
+    start = time.perf_counter()
+    for chunk in chunks:
+        if not reuse_client:
+            influx_connector.close()
+        influx_connector.write_line_protocol(chunk)
+    duration = time.perf_counter() - start
+    influx_connector.close()
+    return duration
+
+def print_result(name: str, amount_of_points: int, duration: float):
+    print(f"{name}: {InfluxWriteStandIn.amount_of_lines} lines ({amount_of_points} data points) in {duration:.2f} s ({amount_of_points / duration:,.0f} points/s), "
+          f"{InfluxWriteStandIn.amount_of_bytes / 1e6:.1f} MB sent over {InfluxWriteStandIn.amount_of_connections} connections")
+
+if __name__ == "__main__":
+    LOGGER.disabled = True
+    server = ThreadingHTTPServer(("127.0.0.1", 0), InfluxWriteStandIn)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    port = server.server_address[1]
+    data_points = generate_data_points()
+    amount_of_points = len(data_points)
+    if BANDWIDTH_IN_MEGABIT_PER_SECOND > 0:
+        print(f"stand-in bandwidth limited to {BANDWIDTH_IN_MEGABIT_PER_SECOND} Mbit/s")
+
+    print_result("new client per chunk, chunk size 100000, no gzip (reference)", amount_of_points, write_chunks(port, data_points, 100000, 0, reuse_client=False))
+    for chunk_size in [10000, 50000, 100000]:
+        for gzip_compression_level in [0, 1, 6]:
+            duration = write_chunks(port, data_points, chunk_size, gzip_compression_level)
+            print_result(f"persistent client, chunk size {chunk_size}, gzip level {gzip_compression_level}", amount_of_points, duration)
+    server.shutdown()
@@ -0,0 +1,116 @@
+"""
+Benchmark of hosting the calculations of a calculation service in a federate per calculation versus in a single
+multiplexed federate. Two calculation services run against a local HELICS broker on the esdl of the tests:
+- A PVInstallation service with a calculation that publishes the PV dispatch every minute and four calculations
+  on periods of 2, 5, 15 and 60 minutes.
+- An EConnection service with a calculation that subscribes to the PV dispatch and a calculation on a period of
+  15 minutes.
+
+Reported are the wall time of the simulation and the amount of time grants per layout, the time grants are counted
+by wrapping helicsFederateRequestTime.
+
+Usage: python BenchmarkMultiplexedFederate.py [simulation_duration_in_seconds]
+"""
+import base64
+from datetime import datetime
+import os
+import sys
+import threading
+import time
+from unittest.mock import MagicMock
+
+import helics as h
+
+os.environ.setdefault("calculation_services", "PVInstallation;EConnection")
+
+from dots_infrastructure import CalculationServiceHelperFunctions
+from dots_infrastructure.DataClasses import HelicsCalculationInformation, PublicationDescription, SimulatorConfiguration, SubscriptionDescription
+from dots_infrastructure.EsdlHelper import EsdlHelper
+from dots_infrastructure.HelicsFederateHelpers import HelicsInitializationMessagesFederateExecutor, HelicsSimulationExecutor
+from dots_infrastructure.Logger import LOGGER
+from dots_infrastructure.test_infra.InfluxDBMock import InfluxDBMock
+
+SIMULATION_DURATION_IN_SECONDS = int(sys.argv[1]) if len(sys.argv) > 1 else 86400
+ESDL_FILE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "test", "test.esdl")
+BROKER_PORT = 23410
+CALCULATION_SERVICES = ["PVInstallation", "EConnection"]
+PV_INSTALLATION_IDS = ['176af591-6d9d-4751-bb0f-fac7e99b1c3d', 'b8766109-5328-416f-9991-e81a5cada8a6']
+E_CONNECTION_IDS = ["f006d594-0743-4de5-a589-a6c2350898da"]
+
+time_grant_lock = threading.Lock()
+amount_of_time_grants = 0
+helics_federate_request_time = h.helicsFederateRequestTime
+
+def counted_helics_federate_request_time(federate, requested_time):
+    global amount_of_time_grants
+    granted_time = helics_federate_request_time(federate, requested_time)
+    with time_grant_lock:
+        amount_of_time_grants += 1
+    return granted_time
+
+def simulator_configuration(esdl_type, esdl_ids, model_id, multiplex_calculations):
+    return SimulatorConfiguration(esdl_type, esdl_ids, model_id, "127.0.0.1", BROKER_PORT, "benchmark", SIMULATION_DURATION_IN_SECONDS, datetime(2024, 1, 1), "test-host", "test-port", "test-username", "test-password", "test-database-name", h.HelicsLogLevel.NO_PRINT, CALCULATION_SERVICES, multiplex_calculations=multiplex_calculations)
+
+def calculation(period_in_seconds, name, inputs, outputs, calculation_function):
+    return HelicsCalculationInformation(period_in_seconds, 0, False, False, True, name, inputs, outputs, calculation_function)
+
+class CalculationServicePVInstallation(HelicsSimulationExecutor):
+
+    def __init__(self, multiplex_calculations):
+        CalculationServiceHelperFunctions.get_simulator_configuration_from_environment = lambda: simulator_configuration("PVInstallation", PV_INSTALLATION_IDS, "Benchmark-PV", multiplex_calculations)
+        super().__init__()
+        self.influx_connector = InfluxDBMock()
+        self.add_calculation(calculation(60, "pv_dispatch", [], [PublicationDescription(True, "PVInstallation", "PV_Dispatch", "W", h.HelicsDataType.DOUBLE)], self.pv_dispatch))
+        for period_in_seconds in [120, 300, 900, 3600]:
+            self.add_calculation(calculation(period_in_seconds, f"pv_forecast_{period_in_seconds}", [], [], self.pv_forecast))
+
+    def pv_dispatch(self, param_dict, simulation_time, time_step_number, esdl_id, energy_system):
+        return {"PV_Dispatch" : float(time_step_number.current_time_step_number)}
+
+    def pv_forecast(self, param_dict, simulation_time, time_step_number, esdl_id, energy_system):
+        return {}
+
+class CalculationServiceEConnection(HelicsSimulationExecutor):
+
+    def __init__(self, multiplex_calculations):
+        CalculationServiceHelperFunctions.get_simulator_configuration_from_environment = lambda: simulator_configuration("EConnection", E_CONNECTION_IDS, "Benchmark-EConnection", multiplex_calculations)
+        super().__init__()
+        self.influx_connector = InfluxDBMock()
+        self.add_calculation(calculation(60, "e_connection_dispatch", [SubscriptionDescription("PVInstallation", "PV_Dispatch", "W", h.HelicsDataType.DOUBLE)], [], self.e_connection_dispatch))
+        self.add_calculation(calculation(900, "e_connection_schedule", [], [], self.e_connection_schedule))
+
+    def e_connection_dispatch(self, param_dict, simulation_time, time_step_number, esdl_id, energy_system):
+        return {}
+
+    def e_connection_schedule(self, param_dict, simulation_time, time_step_number, esdl_id, energy_system):
+        return {}
+
+def run_simulation(multiplex_calculations):
+    global amount_of_time_grants
+    calculation_services = [CalculationServicePVInstallation(multiplex_calculations), CalculationServiceEConnection(multiplex_calculations)]
+    amount_of_federates = 2 if multiplex_calculations else sum(len(calculation_service.calculations) for calculation_service in calculation_services)
+    broker = h.helicsCreateBroker("zmq", f"benchmark_broker_{int(multiplex_calculations)}", f"-f {amount_of_federates} --port {BROKER_PORT}")
+
+    amount_of_time_grants = 0
+    start = time.perf_counter()
+    for calculation_service in calculation_services:
+        calculation_service.start_simulation()
+    for calculation_service in calculation_services:
+        calculation_service.stop_simulation()
+    duration = time.perf_counter() - start
+    h.helicsBrokerWaitForDisconnect(broker, 10000)
+    return amount_of_federates, amount_of_time_grants, duration
+
+if __name__ == "__main__":
+    LOGGER.disabled = True
+    with open(ESDL_FILE_PATH, mode="r") as esdl_file:
+        encoded_base64_esdl = base64.b64encode(esdl_file.read().encode("utf-8")).decode("utf-8")
+    HelicsInitializationMessagesFederateExecutor.init_federate = MagicMock()
+    HelicsInitializationMessagesFederateExecutor.send_amount_of_calculations = MagicMock()
+    HelicsInitializationMessagesFederateExecutor.wait_for_esdl_file = MagicMock(side_effect=lambda: EsdlHelper(encoded_base64_esdl))
+    h.helicsFederateRequestTime = counted_helics_federate_request_time
+
+    print(f"simulation of {SIMULATION_DURATION_IN_SECONDS} s, pv dispatch every 60 s")
+    for layout, multiplex_calculations in [("federate per calculation", False), ("multiplexed federate per service", True)]:
+        amount_of_federates, time_grants, duration = run_simulation(multiplex_calculations)
+        print(f"{layout}: {amount_of_federates} federates, {time_grants} time grants in {duration:.2f} s")
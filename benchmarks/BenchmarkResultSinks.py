@@ -0,0 +1,110 @@
+"""
+Benchmark of the write throughput of the result sinks. Every sink receives the same data points through
+set_time_step_data_point from a single thread. Reported are the total time, including staging, flushing and
+stopping the writer thread, and the time spent by the writer thread in write_data_points (the sink itself).
+As reference the same data points are written as dicts with InfluxDBClient.write_points, as was done before.
+The InfluxDB writes go to a local HTTP stand-in for the InfluxDB /write endpoint that discards the data, so
+only the client side cost is measured. The parquet sink writes to a temporary directory on the local disk.
+
+Usage: python BenchmarkResultSinks.py [amount_of_data_points]
+"""
+from datetime import datetime, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import sys
+import tempfile
+import threading
+import time
+
+from influxdb import InfluxDBClient
+
+from dots_infrastructure.Logger import LOGGER
+from dots_infrastructure.influxdb_connector import InfluxDBConnector
+from dots_infrastructure.parquet_connector import ParquetConnector
+
+AMOUNT_OF_DATA_POINTS = int(sys.argv[1]) if len(sys.argv) > 1 else 1000000
+AMOUNT_OF_ESDL_IDS = 100
+OUTPUT_NAMES = ["active_power", "reactive_power", "state_of_charge", "temperature"]
+
+class InfluxWriteStandIn(BaseHTTPRequestHandler):
+
+    def _respond(self, status_code):
+        self.send_response(status_code)
+        self.send_header("X-Influxdb-Version", "1.8.10")
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+    def do_GET(self):
+        self._respond(204)
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        self._respond(204)
+
+    def log_message(self, format, *args):
+        pass
+
+def generate_data_points():
+    esdl_ids = [f"esdl-id-{i}" for i in range(AMOUNT_OF_ESDL_IDS)]
+    start_time = datetime(2024, 1, 1)
+    amount_of_time_steps = AMOUNT_OF_DATA_POINTS // (AMOUNT_OF_ESDL_IDS * len(OUTPUT_NAMES))
+    for time_step in range(amount_of_time_steps):
+        simulation_datetime = start_time + timedelta(seconds=900 * time_step)
+        for esdl_id in esdl_ids:
+            for i, output_name in enumerate(OUTPUT_NAMES):
+                yield esdl_id, output_name, simulation_datetime, time_step * 0.5 + i
+
+def write_data_points(result_sink):
+    result_sink.init_profile_output_data("benchmark-simulation", "benchmark-model", "Battery", {})
+    sink_duration = 0.0
+    write_data_points_of_sink = result_sink.write_data_points
+    def timed_write_data_points(data_points):
+        nonlocal sink_duration
+        start = time.perf_counter()
+        write_data_points_of_sink(data_points)
+        sink_duration += time.perf_counter() - start
+    result_sink.write_data_points = timed_write_data_points
+
+    amount_of_points = 0
+    start = time.perf_counter()
+    for esdl_id, output_name, simulation_datetime, value in generate_data_points():
+        result_sink.set_time_step_data_point(esdl_id, output_name, simulation_datetime, value)
+        amount_of_points += 1
+    result_sink.write_output()
+    result_sink.stop_writer()
+    duration = time.perf_counter() - start
+    return amount_of_points, duration, sink_duration
+
+def write_data_points_as_dicts(port):
+    client = InfluxDBClient(host="127.0.0.1", port=port, database="benchmark")
+    data_points = [{
+        "measurement": "Battery",
+        "tags": {"simulation_id": "benchmark-simulation", "model_id": "benchmark-model", "esdl_id": esdl_id, "esdl_name": "Battery"},
+        "time": simulation_datetime,
+        "fields": {output_name : value},
+    } for esdl_id, output_name, simulation_datetime, value in generate_data_points()]
+    start = time.perf_counter()
+    for i in range(0, len(data_points), InfluxDBConnector.MAX_AMOUNT_OF_DB_POINTS):
+        client.write_points(data_points[i:i + InfluxDBConnector.MAX_AMOUNT_OF_DB_POINTS], database="benchmark", time_precision="s")
+    return len(data_points), time.perf_counter() - start
+
+def print_result(name, amount_of_points, duration, sink_duration = None):
+    sink_result = f", {sink_duration:.2f} s in sink ({amount_of_points / sink_duration:,.0f} points/s)" if sink_duration is not None else ""
+    print(f"{name}: {amount_of_points} data points in {duration:.2f} s ({amount_of_points / duration:,.0f} points/s){sink_result}")
+
+if __name__ == "__main__":
+    LOGGER.disabled = True
+    server = ThreadingHTTPServer(("127.0.0.1", 0), InfluxWriteStandIn)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    amount_of_points, dict_duration = write_data_points_as_dicts(server.server_address[1])
+    print_result("influxdb write_points with dicts (reference)", amount_of_points, dict_duration)
+
+    amount_of_points, duration, influx_sink_duration = write_data_points(InfluxDBConnector("127.0.0.1", str(server.server_address[1]), "user", "password", "benchmark"))
+    print_result("influxdb line protocol", amount_of_points, duration, influx_sink_duration)
+
+    with tempfile.TemporaryDirectory() as output_directory:
+        amount_of_points, duration, parquet_sink_duration = write_data_points(ParquetConnector(output_directory))
+        print_result("parquet", amount_of_points, duration, parquet_sink_duration)
+
+    print(f"parquet sink throughput: {dict_duration / parquet_sink_duration:.1f}x dict write_points, {influx_sink_duration / parquet_sink_duration:.1f}x influxdb line protocol")
+    server.shutdown()
@@ -0,0 +1,141 @@
+"""
+Micro-benchmark comparing the if/elif dispatch on HelicsDataType that was used by get_helics_value and
+publish_helics_value with the getter and publisher functions that are bound at registration.
+The "eager debug" variants also build the debug messages regardless of the log level, as was done before.
+
+Usage: python BenchmarkValueDispatch.py [amount_of_values]
+"""
+import sys
+import timeit
+import helics as h
+
+from dots_infrastructure.Logger import LOGGER
+
+from dots_infrastructure import Common
+
+AMOUNT_OF_VALUES = int(sys.argv[1]) if len(sys.argv) > 1 else 10000
+REPEATS = 5
+
+def get_value_if_elif(input_type, sub):
+    if input_type == h.HelicsDataType.BOOLEAN:
+        return h.helicsInputGetBoolean(sub)
+    elif input_type == h.HelicsDataType.COMPLEX_VECTOR:
+        return h.helicsInputGetComplexVector(sub)
+    elif input_type == h.HelicsDataType.DOUBLE:
+        return h.helicsInputGetDouble(sub)
+    elif input_type == h.HelicsDataType.COMPLEX:
+        return h.helicsInputGetComplex(sub)
+    elif input_type == h.HelicsDataType.INT:
+        return h.helicsInputGetInteger(sub)
+    elif input_type == h.HelicsDataType.JSON:
+        return h.helicsInputGetString(sub)
+    elif input_type == h.HelicsDataType.NAMED_POINT:
+        return h.helicsInputGetNamedPoint(sub)
+    elif input_type == h.HelicsDataType.STRING:
+        return h.helicsInputGetString(sub)
+    elif input_type == h.HelicsDataType.RAW:
+        return h.helicsInputGetRawValue(sub)
+    elif input_type == h.HelicsDataType.TIME:
+        return h.helicsInputGetTime(sub)
+    elif input_type == h.HelicsDataType.VECTOR:
+        return h.helicsInputGetVector(sub)
+    elif input_type == h.HelicsDataType.ANY:
+        return h.helicsInputGetBytes(sub)
+    raise ValueError("Unsupported Helics Data Type")
+
+def publish_value_if_elif(output_type, pub, value):
+    if output_type == h.HelicsDataType.BOOLEAN:
+        h.helicsPublicationPublishBoolean(pub, value)
+    elif output_type == h.HelicsDataType.COMPLEX_VECTOR:
+        h.helicsPublicationPublishComplexVector(pub, value)
+    elif output_type == h.HelicsDataType.DOUBLE:
+        h.helicsPublicationPublishDouble(pub, value)
+    elif output_type == h.HelicsDataType.COMPLEX:
+        h.helicsPublicationPublishComplex(pub, value)
+    elif output_type == h.HelicsDataType.INT:
+        h.helicsPublicationPublishInteger(pub, value)
+    elif output_type == h.HelicsDataType.JSON:
+        h.helicsPublicationPublishString(pub, value)
+    elif output_type == h.HelicsDataType.NAMED_POINT:
+        h.helicsPublicationPublishNamedPoint(pub, value)
+    elif output_type == h.HelicsDataType.STRING:
+        h.helicsPublicationPublishString(pub, value)
+    elif output_type == h.HelicsDataType.RAW:
+        h.helicsPublicationPublishRaw(pub, value)
+    elif output_type == h.HelicsDataType.TIME:
+        h.helicsPublicationPublishTime(pub, value)
+    elif output_type == h.HelicsDataType.VECTOR:
+        h.helicsPublicationPublishVector(pub, value)
+    elif output_type == h.HelicsDataType.ANY:
+        h.helicsPublicationPublishBytes(pub, value)
+    else:
+        raise ValueError("Unsupported Helics Data Type")
+
+def create_federate(amount_of_values : int):
+    broker = h.helicsCreateBroker("inproc", "benchmark_broker", "-f 1")
+    federate_info = h.helicsCreateFederateInfo()
+    h.helicsFederateInfoSetCoreType(federate_info, h.HelicsCoreType.INPROC)
+    h.helicsFederateInfoSetCoreInitString(federate_info, "--broker=benchmark_broker")
+    h.helicsFederateInfoSetIntegerProperty(federate_info, h.HelicsProperty.INT_LOG_LEVEL, h.HelicsLogLevel.NO_PRINT)
+    federate = h.helicsCreateValueFederate("benchmark_federate", federate_info)
+    # The VECTOR type is the last branch of the if/elif chain, DOUBLE one of the first
+    data_types = [h.HelicsDataType.DOUBLE, h.HelicsDataType.VECTOR]
+    pubs = []
+    subs = []
+    for i in range(amount_of_values):
+        data_type = data_types[i % len(data_types)]
+        key = f"Benchmark/value/{i}"
+        pubs.append((data_type, h.helicsFederateRegisterGlobalPublication(federate, key, data_type, "")))
+        subs.append((data_type, h.helicsFederateRegisterSubscription(federate, key, "")))
+    h.helicsFederateEnterExecutingMode(federate)
+    return broker, federate, pubs, subs
+
+def main():
+    broker, federate, pubs, subs = create_federate(AMOUNT_OF_VALUES)
+    values = {h.HelicsDataType.DOUBLE : 1.0, h.HelicsDataType.VECTOR : [1.0, 2.0]}
+    bound_pubs = [(Common.get_helics_publication_publisher(data_type), pub, values[data_type]) for data_type, pub in pubs]
+    bound_subs = [(Common.get_helics_input_getter(data_type), sub) for data_type, sub in subs]
+
+    def publish_if_elif():
+        for data_type, pub in pubs:
+            publish_value_if_elif(data_type, pub, values[data_type])
+
+    def publish_bound():
+        for publisher, pub, value in bound_pubs:
+            publisher(pub, value)
+
+    publish_bound()
+    h.helicsFederateRequestTime(federate, 1)
+
+    def get_if_elif():
+        for data_type, sub in subs:
+            get_value_if_elif(data_type, sub)
+
+    def get_if_elif_eager_debug():
+        for data_type, sub in subs:
+            LOGGER.debug(f"[{h.helicsFederateGetName(federate)}] Getting value for subscription: {h.helicsInputGetTarget(sub)} with type: {data_type} updated time: {h.helicsInputLastUpdateTime(sub)}")
+            value = get_value_if_elif(data_type, sub)
+            LOGGER.debug(f"[{h.helicsFederateGetName(federate)}] Got value: {value} from {h.helicsInputGetTarget(sub)}")
+
+    def get_bound():
+        for getter, sub in bound_subs:
+            getter(sub)
+
+    results = {
+        "get (eager debug)" : min(timeit.repeat(get_if_elif_eager_debug, number=1, repeat=REPEATS)),
+        "get (if/elif)" : min(timeit.repeat(get_if_elif, number=1, repeat=REPEATS)),
+        "get (bound)" : min(timeit.repeat(get_bound, number=1, repeat=REPEATS)),
+        "publish (if/elif)" : min(timeit.repeat(publish_if_elif, number=1, repeat=REPEATS)),
+        "publish (bound)" : min(timeit.repeat(publish_bound, number=1, repeat=REPEATS)),
+    }
+
+    print(f"{AMOUNT_OF_VALUES} values, best of {REPEATS}")
+    for name, duration in results.items():
+        print(f"{name:<22} {duration * 1000:8.2f} ms total {duration / AMOUNT_OF_VALUES * 1e9:8.0f} ns/call")
+
+    Common.destroy_federate(federate)
+    h.helicsBrokerDisconnect(broker)
+    h.helicsCloseLibrary()
+
+if __name__ == "__main__":
+    main()
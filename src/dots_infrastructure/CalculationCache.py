@@ -0,0 +1,54 @@
+from collections import OrderedDict
+from typing import Any, Callable, Hashable
+
+import numpy as np
+
+from dots_infrastructure.DataClasses import EsdlId
+
+def to_hashable(value) -> Hashable:
+    """Converts an input value (e.g. a list of values of multiple connected esdl objects) to a hashable value that compares by content."""
+    if isinstance(value, (list, tuple)):
+        return tuple(to_hashable(item) for item in value)
+    if isinstance(value, dict):
+        return tuple((key, to_hashable(item)) for key, item in value.items())
+    if isinstance(value, np.ndarray):
+        return (value.dtype.str, value.shape, value.tobytes())
+    return value
+
+class CalculationCache:
+    """
+    A bounded least recently used cache of the results of a calculation function, addressed by the esdl id, the input values and an
+    optional state key of a calculation. The amount of hits and misses is counted.
+    """
+
+    def __init__(self, max_size : int):
+        self.max_size = max(1, max_size)
+        self.results : OrderedDict[Hashable, Any] = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get_key(self, esdl_id : EsdlId, param_dict : dict, state_key : Hashable = None) -> Hashable:
+        """Returns the key of the input values of an esdl id, or None when the input values can not be hashed and the result can not be cached."""
+        key = (esdl_id, to_hashable(param_dict), state_key)
+        try:
+            hash(key)
+        except TypeError:
+            return None
+        return key
+
+    def get_or_calculate(self, key : Hashable, calculate : Callable[[], Any]):
+        if key is not None and key in self.results:
+            self.hits += 1
+            self.results.move_to_end(key)
+            return self.results[key]
+        self.misses += 1
+        result = calculate()
+        if key is not None:
+            self.results[key] = result
+            if len(self.results) > self.max_size:
+                self.results.popitem(last=False)
+        return result
+
+    def get_hit_ratio(self) -> float:
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups > 0 else 0.0
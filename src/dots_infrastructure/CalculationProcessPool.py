@@ -0,0 +1,67 @@
+from concurrent.futures import ProcessPoolExecutor
+import dataclasses
+from datetime import datetime
+from io import BytesIO
+import multiprocessing
+import os
+from typing import Callable, List
+from esdl import esdl
+
+from dots_infrastructure.DataClasses import EsdlId, TimeStepInformation
+from dots_infrastructure.EsdlHelper import EsdlHelper
+from dots_infrastructure.Logger import LOGGER
+
+_worker_energy_system : esdl.EnergySystem = None
+
+def _init_worker(esdl_bytes : bytes):
+    global _worker_energy_system
+    _worker_energy_system = EsdlHelper.get_energy_system_from_esdl_stream(BytesIO(esdl_bytes))
+    LOGGER.debug(f"Initialized calculation worker process {os.getpid()}")
+
+def _calculate_esdl_ids(calculation_function : Callable, calculation_params : List[tuple[EsdlId, dict]], simulator_time : datetime, time_step_information : TimeStepInformation) -> List[dict]:
+    ret_val = []
+    for esdl_id, param_dict in calculation_params:
+        pub_values = calculation_function(param_dict, simulator_time, time_step_information, esdl_id, _worker_energy_system)
+        if dataclasses.is_dataclass(pub_values):
+            pub_values = dataclasses.asdict(pub_values)
+        ret_val.append(pub_values)
+    return ret_val
+
+def split_in_chunks(esdl_ids : List[EsdlId], amount_of_chunks : int) -> List[List[EsdlId]]:
+    chunk_size, remainder = divmod(len(esdl_ids), amount_of_chunks)
+    ret_val = []
+    start = 0
+    for i in range(amount_of_chunks):
+        end = start + chunk_size + (1 if i < remainder else 0)
+        if end > start:
+            ret_val.append(esdl_ids[start:end])
+        start = end
+    return ret_val
+
+class CalculationProcessPool:
+    """
+    A persistent pool of worker processes, shared by the calculations of a calculation service, that executes a calculation function
+    for the esdl ids of a time step in parallel. The esdl file is parsed once in every worker, hence the calculation function must be
+    picklable (e.g. a module level function).
+    """
+
+    def __init__(self, esdl_bytes : bytes, max_workers : int = None):
+        self.max_workers = max_workers if max_workers else os.cpu_count()
+        self.executor = ProcessPoolExecutor(self.max_workers,
+                                            mp_context=multiprocessing.get_context("spawn"),
+                                            initializer=_init_worker,
+                                            initargs=(esdl_bytes,))
+
+    def calculate(self, calculation_function : Callable, esdl_ids : List[EsdlId], calculation_params : dict[EsdlId, dict], simulator_time : datetime, time_step_information : TimeStepInformation) -> List[dict]:
+        futures = []
+        for chunk in split_in_chunks(esdl_ids, self.max_workers):
+            chunk_params = [(esdl_id, calculation_params[esdl_id]) for esdl_id in chunk]
+            futures.append(self.executor.submit(_calculate_esdl_ids, calculation_function, chunk_params, simulator_time, time_step_information))
+
+        ret_val = []
+        for future in futures:
+            ret_val.extend(future.result())
+        return ret_val
+
+    def shutdown(self, wait : bool = True):
+        self.executor.shutdown(wait=wait, cancel_futures=True)
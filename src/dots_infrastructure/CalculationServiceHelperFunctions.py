@@ -1,9 +1,12 @@
 from datetime import datetime
+import numbers
 import os
 import helics as h
+import numpy as np
 from typing import List
 
-from dots_infrastructure.DataClasses import CalculationServiceOutput, PublicationDescription, SimulatorConfiguration
+from dots_infrastructure.Constants import ResultSinkType
+from dots_infrastructure.DataClasses import CalculationServiceInput, CalculationServiceOutput, EsdlId, PublicationDescription, SimulatorConfiguration
 from dots_infrastructure.Logger import LOGGER
 
 log_level_to_helics_log_level = {
@@ -29,16 +32,33 @@ def get_simulator_configuration_from_environment() -> SimulatorConfiguration:
     influx_username = os.getenv("INFLUXDB_USER")
     influx_password = os.getenv("INFLUXDB_PASSWORD")
     influx_database_name = os.getenv("INFLUXDB_NAME")
+    influx_write_queue_size = int(os.getenv("INFLUXDB_WRITE_QUEUE_SIZE", 16))
+    influx_write_queue_timeout = float(os.getenv("INFLUXDB_WRITE_QUEUE_TIMEOUT")) if os.getenv("INFLUXDB_WRITE_QUEUE_TIMEOUT") else None
+    influx_spill_directory = os.getenv("INFLUXDB_SPILL_DIRECTORY")
+    influx_spill_threshold_bytes = int(os.getenv("INFLUXDB_SPILL_THRESHOLD_BYTES", 64 * 1024 * 1024))
+    influx_chunk_size = int(os.getenv("INFLUXDB_CHUNK_SIZE", 100000))
+    influx_gzip_compression_level = int(os.getenv("INFLUXDB_GZIP_COMPRESSION_LEVEL", 1))
+    influx_health_check_interval = float(os.getenv("INFLUXDB_HEALTH_CHECK_INTERVAL", 30.0))
+    influx_recover_spilled_chunks = os.getenv("INFLUXDB_RECOVER_SPILLED_CHUNKS", "false").lower() in ["true", "1", "yes"]
+    esdl_cache_directory = os.getenv("esdl_cache_directory")
+    profile_cache_directory = os.getenv("profile_cache_directory")
+    profile_resolution_in_seconds = float(os.getenv("profile_resolution_in_seconds")) if os.getenv("profile_resolution_in_seconds") else None
+    multiplex_calculations = os.getenv("multiplex_calculations", "false").lower() in ["true", "1", "yes"]
+    helics_core_type = h.HelicsCoreType[os.getenv("helics_core_type", "ZMQ").upper()]
+    share_helics_core = os.getenv("share_helics_core", "false").lower() in ["true", "1", "yes"]
+    result_sink_type = ResultSinkType[os.getenv("result_sink", "INFLUXDB").upper()]
+    result_output_directory = os.getenv("result_output_directory", "results")
+    parquet_chunk_size = int(os.getenv("parquet_chunk_size", 100000))
     log_level = os.getenv("log_level", "INFO") 
     LOGGER.info(f"Using log level {log_level.upper()}")
     LOGGER.setLevel(log_level.upper())
-    return SimulatorConfiguration(esdl_type, esdl_ids, model_id, broker_ip, broker_port,simulation_id, simulation_duration_in_seconds, start_time_datetime, influx_host, influx_port, influx_username, influx_password, influx_database_name, log_level_to_helics_log_level[log_level], calculation_services)
+    return SimulatorConfiguration(esdl_type, esdl_ids, model_id, broker_ip, broker_port,simulation_id, simulation_duration_in_seconds, start_time_datetime, influx_host, influx_port, influx_username, influx_password, influx_database_name, log_level_to_helics_log_level[log_level], calculation_services, esdl_cache_directory, influx_write_queue_size, influx_write_queue_timeout, result_sink_type, result_output_directory, influx_spill_directory, influx_spill_threshold_bytes, influx_chunk_size, influx_gzip_compression_level, influx_health_check_interval, profile_cache_directory, profile_resolution_in_seconds, multiplex_calculations, helics_core_type, share_helics_core, influx_recover_spilled_chunks, parquet_chunk_size)
 
 def generate_publications_from_value_descriptions(value_descriptions : List[PublicationDescription], simulator_configuration : SimulatorConfiguration) -> List[CalculationServiceOutput]:
     ret_val = []
     for value_description in value_descriptions:
         for esdl_id in simulator_configuration.esdl_ids:
-            ret_val.append(CalculationServiceOutput(value_description.global_flag, value_description.esdl_type, value_description.output_name, esdl_id, value_description.data_type, value_description.output_unit))
+            ret_val.append(CalculationServiceOutput(value_description.global_flag, value_description.esdl_type, value_description.output_name, esdl_id, value_description.data_type, value_description.output_unit, record=value_description.record, recording_policy=value_description.recording_policy, absolute_tolerance=value_description.absolute_tolerance, relative_tolerance=value_description.relative_tolerance))
     return ret_val
 
 def get_single_param_with_name(param_dict : dict, name : str, default = None):
@@ -55,6 +75,18 @@ def get_single_param_with_name(param_dict : dict, name : str, default = None):
             return param_dict[key]
     return default
 
+def is_within_tolerance(value, last_value, absolute_tolerance : float = None, relative_tolerance : float = None) -> bool:
+    """
+    Returns whether a numeric value differs at most absolute_tolerance or relative_tolerance times the magnitude of last_value from last_value.
+    Values without a tolerance, without a last value or that are not numeric are never within tolerance.
+    """
+    if (absolute_tolerance is None and relative_tolerance is None) or last_value is None:
+        return False
+    if not isinstance(value, numbers.Real) or not isinstance(last_value, numbers.Real):
+        return False
+    tolerance = max(absolute_tolerance or 0.0, (relative_tolerance or 0.0) * abs(last_value))
+    return abs(value - last_value) <= tolerance
+
 def clear_dictionary_values(dictionary_to_clear : dict):
     return dictionary_to_clear.fromkeys(dictionary_to_clear, None)
 
@@ -63,3 +95,48 @@ def dictionary_has_values_for_all_keys(dictionary : dict):
 
 def get_vector_param_with_name(param_dict : dict, name : str):
     return [value for key, value in param_dict.items() if any(name == key_part for key_part in key.split("/"))]
+
+
+def _values_to_array(values_per_esdl_id : List[List]) -> np.ndarray:
+    if all(len(values) == 1 for values in values_per_esdl_id):
+        try:
+            return np.array([values[0] for values in values_per_esdl_id])
+        except ValueError:
+            pass
+    ret_val = np.empty(len(values_per_esdl_id), dtype=object)
+    for i, values in enumerate(values_per_esdl_id):
+        ret_val[i] = values[0] if len(values) == 1 else values
+    return ret_val
+
+def get_batch_input_arrays(calculation_params : dict[EsdlId, dict], input_dict : dict[EsdlId, List[CalculationServiceInput]], input_names : List[str], esdl_ids : List[EsdlId]) -> dict[str, np.ndarray]:
+    """
+    Converts the per esdl id parameter dictionaries into one array per input name, lined up with esdl_ids.
+    Args:
+        calculation_params (dict): Dictionary with the parameter dictionary of each esdl id.
+        input_dict (dict): Dictionary with the inputs of each esdl id.
+        input_names (List[str]): The names of the inputs to create an array for.
+        esdl_ids (List[EsdlId]): The esdl ids that determine the order of the array entries.
+    When an esdl id receives a single value for an input name the entry holds that value, otherwise the entry holds the list of received values.
+    """
+    values_per_input_name = {input_name : [[] for _ in esdl_ids] for input_name in input_names}
+    for i, esdl_id in enumerate(esdl_ids):
+        for helics_input in input_dict.get(esdl_id, []):
+            values_per_input_name[helics_input.input_name][i].append(calculation_params[esdl_id][helics_input.helics_sub_key])
+    return {input_name : _values_to_array(values) for input_name, values in values_per_input_name.items()}
+
+def get_batch_output_columns(pub_values : dict, output_names : List[str], amount_of_esdl_ids : int) -> dict[str, List]:
+    """
+    Converts the arrays returned by a batch calculation into lists of python values, one list per output name.
+    Args:
+        pub_values (dict): Dictionary with an array-like of values per output name.
+        output_names (List[str]): The names of the outputs that are published.
+        amount_of_esdl_ids (int): The expected length of each array.
+    """
+    ret_val = {}
+    for output_name in output_names:
+        values = pub_values[output_name]
+        values = values.tolist() if isinstance(values, np.ndarray) else list(values)
+        if len(values) != amount_of_esdl_ids:
+            raise ValueError(f"Batch output {output_name} has {len(values)} values, expected {amount_of_esdl_ids}")
+        ret_val[output_name] = values
+    return ret_val
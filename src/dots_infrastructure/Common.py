@@ -1,5 +1,45 @@
 import helics as h
 
+HELICS_INPUT_GETTERS = {
+    h.HelicsDataType.BOOLEAN : h.helicsInputGetBoolean,
+    h.HelicsDataType.COMPLEX_VECTOR : h.helicsInputGetComplexVector,
+    h.HelicsDataType.DOUBLE : h.helicsInputGetDouble,
+    h.HelicsDataType.COMPLEX : h.helicsInputGetComplex,
+    h.HelicsDataType.INT : h.helicsInputGetInteger,
+    h.HelicsDataType.JSON : h.helicsInputGetString,
+    h.HelicsDataType.NAMED_POINT : h.helicsInputGetNamedPoint,
+    h.HelicsDataType.STRING : h.helicsInputGetString,
+    h.HelicsDataType.RAW : h.helicsInputGetRawValue,
+    h.HelicsDataType.TIME : h.helicsInputGetTime,
+    h.HelicsDataType.VECTOR : h.helicsInputGetVector,
+    h.HelicsDataType.ANY : h.helicsInputGetBytes
+}
+
+HELICS_PUBLICATION_PUBLISHERS = {
+    h.HelicsDataType.BOOLEAN : h.helicsPublicationPublishBoolean,
+    h.HelicsDataType.COMPLEX_VECTOR : h.helicsPublicationPublishComplexVector,
+    h.HelicsDataType.DOUBLE : h.helicsPublicationPublishDouble,
+    h.HelicsDataType.COMPLEX : h.helicsPublicationPublishComplex,
+    h.HelicsDataType.INT : h.helicsPublicationPublishInteger,
+    h.HelicsDataType.JSON : h.helicsPublicationPublishString,
+    h.HelicsDataType.NAMED_POINT : h.helicsPublicationPublishNamedPoint,
+    h.HelicsDataType.STRING : h.helicsPublicationPublishString,
+    h.HelicsDataType.RAW : h.helicsPublicationPublishRaw,
+    h.HelicsDataType.TIME : h.helicsPublicationPublishTime,
+    h.HelicsDataType.VECTOR : h.helicsPublicationPublishVector,
+    h.HelicsDataType.ANY : h.helicsPublicationPublishBytes
+}
+
 def destroy_federate(fed):
     h.helicsFederateDisconnect(fed)
-    h.helicsFederateDestroy(fed)
\ No newline at end of file
+    h.helicsFederateDestroy(fed)
+
+def get_helics_input_getter(input_type : h.HelicsDataType):
+    if input_type not in HELICS_INPUT_GETTERS:
+        raise ValueError("Unsupported Helics Data Type")
+    return HELICS_INPUT_GETTERS[input_type]
+
+def get_helics_publication_publisher(output_type : h.HelicsDataType):
+    if output_type not in HELICS_PUBLICATION_PUBLISHERS:
+        raise ValueError("Unsupported Helics Data Type")
+    return HELICS_PUBLICATION_PUBLISHERS[output_type]
\ No newline at end of file
@@ -2,4 +2,20 @@ from enum import Enum
 
 class TimeRequestType(Enum):
     PERIOD = 0
-    ON_INPUT = 1
\ No newline at end of file
+    ON_INPUT = 1
+
+class ResultSinkType(Enum):
+    INFLUXDB = 0
+    PARQUET = 1
+
+class CalculationMode(Enum):
+    PER_ESDL_ID = 0
+    BATCH = 1
+    PROCESS_POOL = 2
+
+class RecordingAggregation(Enum):
+    MEAN = 0
+    MIN = 1
+    MAX = 2
+    LAST = 3
+    EVERY_NTH = 4
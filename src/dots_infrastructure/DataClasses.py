@@ -1,12 +1,18 @@
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from datetime import datetime
-from typing import List
+from typing import Any, Callable, List
 import helics as h
 
-from dots_infrastructure.Constants import TimeRequestType
+from dots_infrastructure.Constants import CalculationMode, RecordingAggregation, ResultSinkType, TimeRequestType
 
 EsdlId = str
 
+@dataclass
+class RecordingPolicy:
+    aggregation : RecordingAggregation
+    window_in_seconds : int = 900
+    every_nth : int = 1
+
 @dataclass
 class CalculationServiceInput:
     esdl_asset_type : str
@@ -17,6 +23,7 @@ class CalculationServiceInput:
     simulator_esdl_id : str
     helics_sub_key : str = ""
     helics_input : h.HelicsInput = None
+    value_getter : Callable = field(default=None, compare=False, repr=False)
 
 @dataclass 
 class CalculationServiceOutput:
@@ -27,6 +34,12 @@ class CalculationServiceOutput:
     output_type : h.HelicsDataType
     output_unit : str
     helics_publication : h.HelicsPublication = None
+    value_publisher : Callable = field(default=None, compare=False, repr=False)
+    record : bool = False
+    recording_policy : RecordingPolicy = None
+    absolute_tolerance : float = None
+    relative_tolerance : float = None
+    last_published_value : Any = field(default=None, compare=False, repr=False)
 
 @dataclass
 class HelicsInitMessagesFederateInformation:
@@ -39,6 +52,30 @@ class SubscriptionDescription:
     input_name : str
     input_unit : str
     input_type : h.HelicsDataType
+    keep_last_value : bool = False
+
+@dataclass(frozen=True)
+class InfluxDBProfileReference:
+    profile_key : str
+    host : str
+    port : str
+    database : str
+    measurement : str
+    field : str
+    filters : str = None
+    multiplier : float = 1.0
+
+@dataclass(frozen=True)
+class InfluxDBProfileQuery:
+    host : str
+    port : str
+    database : str
+    query : str
+
+@dataclass
+class EsdlCacheEntry:
+    subscriptions : dict[tuple, dict[EsdlId, List[CalculationServiceInput]]] = field(default_factory=dict)
+    influxdb_profiles : dict[EsdlId, List[InfluxDBProfileReference]] = field(default_factory=dict)
 
 @dataclass
 class PublicationDescription:
@@ -47,6 +84,10 @@ class PublicationDescription:
     output_name : str
     output_unit : str
     data_type : h.HelicsDataType
+    record : bool = False
+    recording_policy : RecordingPolicy = None
+    absolute_tolerance : float = None
+    relative_tolerance : float = None
 
 @dataclass
 class HelicsCalculationInformation:
@@ -62,6 +103,13 @@ class HelicsCalculationInformation:
     time_delta : float = 0
     federate_time_period = 0
     time_request_type : TimeRequestType = TimeRequestType.PERIOD
+    calculation_mode : CalculationMode = CalculationMode.PER_ESDL_ID
+    process_pool_size : int = None
+    asynchronous_time_requests : bool = False
+    post_time_step_function : Callable = None
+    memoize : bool = False
+    memoization_state_key_function : Callable = None
+    memoization_cache_size : int = None
 
 @dataclass
 class SimulatorConfiguration:
@@ -80,6 +128,23 @@ class SimulatorConfiguration:
     influx_database_name : str
     log_level : h.HelicsLogLevel
     calculation_services : List[str]
+    esdl_cache_directory : str = None
+    influx_write_queue_size : int = 16
+    influx_write_queue_timeout : float = None
+    result_sink_type : ResultSinkType = ResultSinkType.INFLUXDB
+    result_output_directory : str = "results"
+    influx_spill_directory : str = None
+    influx_spill_threshold_bytes : int = 64 * 1024 * 1024
+    influx_chunk_size : int = 100000
+    influx_gzip_compression_level : int = 1
+    influx_health_check_interval : float = 30.0
+    profile_cache_directory : str = None
+    profile_resolution_in_seconds : float = None
+    multiplex_calculations : bool = False
+    helics_core_type : h.HelicsCoreType = h.HelicsCoreType.ZMQ
+    share_helics_core : bool = False
+    influx_recover_spilled_chunks : bool = False
+    parquet_chunk_size : int = 100000
 
 @dataclass
 class SimulaitonDataPoint:
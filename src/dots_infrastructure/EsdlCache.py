@@ -0,0 +1,113 @@
+from hashlib import sha256
+import os
+import pickle
+import tempfile
+from typing import BinaryIO
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+from dots_infrastructure.DataClasses import EsdlCacheEntry
+from dots_infrastructure.Logger import LOGGER
+
+class EsdlCache:
+    """
+    On disk cache of the information that is derived from an esdl file, addressed by the sha256 hash of the esdl bytes.
+
+    The cache files are pickled, the cache directory should therefore only be writable by trusted processes.
+    Services that share the cache directory merge their entries into the same file, so the subscriptions
+    stored by one service are kept when another service stores its own.
+    """
+
+    CACHE_FILE_EXTENSION = ".esdlcache"
+    LOCK_FILE_EXTENSION = ".lock"
+    HASH_READ_SIZE = 1024 * 1024
+
+    def __init__(self, cache_directory : str):
+        self.cache_directory = cache_directory
+        os.makedirs(self.cache_directory, exist_ok=True)
+
+    @staticmethod
+    def get_esdl_hash(esdl_bytes : bytes) -> str:
+        return sha256(esdl_bytes).hexdigest()
+
+    @staticmethod
+    def get_esdl_stream_hash(esdl_stream : BinaryIO) -> str:
+        """Hashes the remaining bytes of a seekable binary stream and moves the stream back to where it was."""
+        start_position = esdl_stream.tell()
+        esdl_hash = sha256()
+        for esdl_bytes in iter(lambda: esdl_stream.read(EsdlCache.HASH_READ_SIZE), b""):
+            esdl_hash.update(esdl_bytes)
+        esdl_stream.seek(start_position)
+        return esdl_hash.hexdigest()
+
+    def _get_cache_file_path(self, esdl_hash : str) -> str:
+        return os.path.join(self.cache_directory, f"{esdl_hash}{self.CACHE_FILE_EXTENSION}")
+
+    def _lock(self, esdl_hash : str):
+        """Returns an opened lock file that is exclusively locked, when file locking is available on this platform."""
+        if fcntl is None:
+            return None
+        lock_file = open(os.path.join(self.cache_directory, f"{esdl_hash}{self.LOCK_FILE_EXTENSION}"), "ab")
+        fcntl.flock(lock_file, fcntl.LOCK_EX)
+        return lock_file
+
+    @staticmethod
+    def _unlock(lock_file):
+        if lock_file is not None:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
+            lock_file.close()
+
+    @staticmethod
+    def _merge(stored_entry : EsdlCacheEntry, cache_entry : EsdlCacheEntry) -> EsdlCacheEntry:
+        """Adds the subscriptions of the stored entry that are not in the new entry, so entries of other services are not lost."""
+        if stored_entry is None:
+            return cache_entry
+        for subscriptions_cache_key, stored_subscriptions in stored_entry.subscriptions.items():
+            subscriptions = cache_entry.subscriptions.setdefault(subscriptions_cache_key, {})
+            for esdl_id, stored_inputs in stored_subscriptions.items():
+                subscriptions.setdefault(esdl_id, stored_inputs)
+        if cache_entry.influxdb_profiles is None:
+            cache_entry.influxdb_profiles = stored_entry.influxdb_profiles
+        elif stored_entry.influxdb_profiles is not None:
+            for esdl_id, stored_profiles in stored_entry.influxdb_profiles.items():
+                cache_entry.influxdb_profiles.setdefault(esdl_id, stored_profiles)
+        return cache_entry
+
+    def load(self, esdl_hash : str) -> EsdlCacheEntry:
+        cache_file_path = self._get_cache_file_path(esdl_hash)
+        if not os.path.exists(cache_file_path):
+            LOGGER.debug(f"No esdl cache entry found for esdl with hash: {esdl_hash}")
+            return None
+        try:
+            with open(cache_file_path, "rb") as cache_file:
+                cache_entry = pickle.load(cache_file)
+            LOGGER.debug(f"Loaded esdl cache entry for esdl with hash: {esdl_hash}")
+            return cache_entry
+        except Exception as e:
+            LOGGER.warning(f"Ignoring unreadable esdl cache entry {cache_file_path}: {e}")
+            return None
+
+    def store(self, esdl_hash : str, cache_entry : EsdlCacheEntry):
+        """
+        Merges the cache entry with the entry that is already stored for the esdl file and replaces the stored entry with the result.
+        The given cache entry is updated with the merged subscriptions.
+        """
+        temporary_file_path = None
+        lock_file = None
+        try:
+            lock_file = self._lock(esdl_hash)
+            self._merge(self.load(esdl_hash), cache_entry)
+            file_descriptor, temporary_file_path = tempfile.mkstemp(dir=self.cache_directory)
+            with os.fdopen(file_descriptor, "wb") as cache_file:
+                pickle.dump(cache_entry, cache_file, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(temporary_file_path, self._get_cache_file_path(esdl_hash))
+            LOGGER.debug(f"Stored esdl cache entry for esdl with hash: {esdl_hash}")
+        except Exception as e:
+            LOGGER.warning(f"Failed to store esdl cache entry for esdl with hash {esdl_hash}: {e}")
+            if temporary_file_path is not None and os.path.exists(temporary_file_path):
+                os.remove(temporary_file_path)
+        finally:
+            self._unlock(lock_file)
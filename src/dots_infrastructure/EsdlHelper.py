@@ -1,29 +1,166 @@
 from base64 import b64decode
-from typing import List
-from esdl.esdl_handler import EnergySystemHandler
+import dataclasses
+from io import BytesIO
+import re
+import threading
+from typing import BinaryIO, List, Optional
+from esdl.esdl_handler import EnergySystemHandler, StringURI
+from pyecore.resources import URI
 
 from esdl import esdl
 from esdl import EnergySystem
-from dots_infrastructure.DataClasses import CalculationServiceInput, EsdlId, SubscriptionDescription
+from dots_infrastructure.DataClasses import CalculationServiceInput, EsdlCacheEntry, EsdlId, InfluxDBProfileReference, SubscriptionDescription
+from dots_infrastructure.EsdlCache import EsdlCache
 from dots_infrastructure.Logger import LOGGER
 
+class EsdlStreamURI(URI):
+    """
+    URI that lets pyecore parse an esdl document directly from an already opened binary stream.
+    """
+    def __init__(self, uri, stream : BinaryIO):
+        super().__init__(uri)
+        self.__stream = stream
+
+    def create_instream(self):
+        return self.__stream
+
+class Base64StreamDecoder:
+    """
+    Decodes a base64 encoded esdl file that arrives in chunks into a single binary buffer.
+
+    Chunks are decoded as soon as they arrive, only the characters that do not yet form a complete
+    base64 quantum are kept until the next chunk, so no copy of the full base64 text is ever built.
+    Characters outside the base64 alphabet (e.g. line breaks) are discarded, like b64decode does.
+    """
+    BASE64_QUANTUM_LENGTH = 4
+    NON_BASE64_CHARACTERS = re.compile(rb"[^A-Za-z0-9+/=]")
+
+    def __init__(self):
+        self.decoded_stream = BytesIO()
+        self.remainder = b""
+
+    def feed(self, base64_part : bytes):
+        data = self.remainder + self.NON_BASE64_CHARACTERS.sub(b"", base64_part)
+        decodable_length = len(data) - len(data) % self.BASE64_QUANTUM_LENGTH
+        if decodable_length > 0:
+            self.decoded_stream.write(b64decode(data[:decodable_length]))
+        self.remainder = data[decodable_length:]
+
+    def finish(self) -> BytesIO:
+        if self.remainder:
+            self.decoded_stream.write(b64decode(self.remainder + b"=="))
+            self.remainder = b""
+        self.decoded_stream.seek(0)
+        return self.decoded_stream
+
 class EsdlHelper:
 
-    def __init__(self, esdl_string_base64):
-        self.energy_system = self._get_energy_system_from_base64_encoded_esdl_string(esdl_string_base64)
-        self.non_connected_esdl_ids = []
-        self.esdl_object_mapping : dict = self._get_esdl_id_object_mapping(self.energy_system, self.non_connected_esdl_ids)
+    def __init__(self, esdl_string_base64 : str = None, esdl_stream : BinaryIO = None, esdl_cache : EsdlCache = None):
+        if esdl_stream is None:
+            esdl_stream = BytesIO(b64decode(esdl_string_base64 + "=="))
+        self.esdl_cache = esdl_cache
+        self.esdl_hash : str = None
+        self.cache_entry : EsdlCacheEntry = None
+        self.cache_entry_changed = False
+        self.cache_entry_lock = threading.Lock()
+
+        if self.esdl_cache is not None:
+            if not esdl_stream.seekable():
+                esdl_stream = BytesIO(esdl_stream.read())
+            self.esdl_hash = EsdlCache.get_esdl_stream_hash(esdl_stream)
+            self.cache_entry = self.esdl_cache.load(self.esdl_hash)
+
+        self.esdl_stream = esdl_stream
+        self.energy_system : EnergySystem = self.get_energy_system_from_esdl_stream(esdl_stream)
+        self.non_connected_esdl_ids : List[EsdlId] = []
+        self.esdl_objects_per_type : dict[type, List[tuple]] = {}
+        self.esdl_object_mapping : dict = self._get_esdl_id_object_mapping(self.energy_system, self.non_connected_esdl_ids, self.esdl_objects_per_type)
+        self.esdl_objects_of_type : dict[type, List] = {}
+        self._init_topology_index()
+
+        if self.esdl_cache is not None and self.cache_entry is None:
+            self.cache_entry = EsdlCacheEntry()
+
+    @staticmethod
+    def get_influxdb_profile_reference(profile : esdl.InfluxDBProfile) -> Optional[InfluxDBProfileReference]:
+        """
+        Returns the reference to the influx series of the profile, or None when the profile does not specify the host, database, measurement or field.
+        """
+        profile_key = profile.id if profile.id else profile.name if profile.name else f"{profile.measurement}.{profile.field}"
+        if not profile.host or not profile.database or not profile.measurement or not profile.field:
+            LOGGER.warning(f"Skipping InfluxDBProfile {profile_key}, it does not specify the host, database, measurement and field")
+            return None
+        return InfluxDBProfileReference(profile_key, profile.host.split("//")[-1], str(profile.port), profile.database, profile.measurement, profile.field, profile.filters if profile.filters else None, profile.multiplier if profile.multiplier else 1.0)
+
+    def _find_influxdb_profile_references(self, esdl_id : EsdlId) -> List[InfluxDBProfileReference]:
+        influxdb_profiles = []
+        esdl_asset = self.esdl_object_mapping.get(esdl_id)
+        if not isinstance(esdl_asset, esdl.EnergyAsset):
+            return influxdb_profiles
+        for esdl_object in esdl_asset.eAllContents():
+            if isinstance(esdl_object, esdl.InfluxDBProfile):
+                container = esdl_object.eContainer()
+                while not isinstance(container, esdl.EnergyAsset):
+                    container = container.eContainer()
+                influxdb_profile = self.get_influxdb_profile_reference(esdl_object) if container is esdl_asset else None
+                if influxdb_profile is not None:
+                    influxdb_profiles.append(influxdb_profile)
+        return influxdb_profiles
+
+    def get_influxdb_profile_references(self, esdl_ids : List[EsdlId]) -> dict[EsdlId, List[InfluxDBProfileReference]]:
+        """
+        Returns the InfluxDBProfiles of the given esdl assets, including the profiles of their ports. Only the given assets are searched,
+        the profiles that were found are stored in the esdl cache when available.
+        """
+        influxdb_profiles = {}
+        if self.cache_entry is None:
+            for esdl_id in esdl_ids:
+                influxdb_profiles[esdl_id] = self._find_influxdb_profile_references(esdl_id)
+        else:
+            with self.cache_entry_lock:
+                if self.cache_entry.influxdb_profiles is None:
+                    self.cache_entry.influxdb_profiles = {}
+                for esdl_id in esdl_ids:
+                    if esdl_id not in self.cache_entry.influxdb_profiles:
+                        self.cache_entry.influxdb_profiles[esdl_id] = self._find_influxdb_profile_references(esdl_id)
+                        self.cache_entry_changed = True
+                    influxdb_profiles[esdl_id] = self.cache_entry.influxdb_profiles[esdl_id]
+            self.store_cache_entry()
+        return {esdl_id : profiles for esdl_id, profiles in influxdb_profiles.items() if profiles}
+
+    def store_cache_entry(self):
+        """
+        Writes the cache entry of this esdl file to the esdl cache when it changed since it was last stored.
+        """
+        with self.cache_entry_lock:
+            if self.esdl_cache is not None and self.cache_entry_changed:
+                self.esdl_cache.store(self.esdl_hash, self.cache_entry)
+                self.cache_entry_changed = False
 
-    def _get_energy_system_from_base64_encoded_esdl_string(self, esdl_string_base64) -> EnergySystem:
-        esdl_string = b64decode(esdl_string_base64 + b"==".decode("utf-8")).decode("utf-8")
-        LOGGER.debug(f"Parsing esdl string of {len(esdl_string)} characters")
+    @staticmethod
+    def get_energy_system_from_esdl_stream(esdl_stream : BinaryIO) -> EnergySystem:
+        LOGGER.debug("Parsing esdl stream")
         esh = EnergySystemHandler()
-        esh.load_from_string(esdl_string)
+        esh.resource = esh.rset.create_resource(EsdlStreamURI('from_stream.esdl', esdl_stream))
+        esh.resource.load()
+        esh.energy_system = esh.resource.contents[0]
         return esh.get_energy_system()
-    
-    def _get_esdl_id_object_mapping(self, energy_system : EnergySystem, non_connected_esdl_ids : List) -> esdl:
+
+    def get_esdl_bytes(self) -> bytes:
+        """
+        Returns the esdl file as it was received, the energy system is only serialized again when the received stream can not be read again.
+        """
+        if self.esdl_stream.seekable():
+            self.esdl_stream.seek(0)
+            return self.esdl_stream.read()
+        uri = StringURI('to_string.esdl')
+        self.energy_system.eResource.save(uri)
+        return uri.getvalue().encode()
+
+    def _get_esdl_id_object_mapping(self, energy_system : EnergySystem, non_connected_esdl_ids : List, esdl_objects_per_type : dict[type, List[tuple]]) -> esdl:
         ret_val = {}
-        for obj in energy_system.eAllContents():
+        for position, obj in enumerate(energy_system.eAllContents()):
+            esdl_objects_per_type.setdefault(type(obj), []).append((position, obj))
             if hasattr(obj, "id"):
                 ret_val[obj.id] = obj
                 if not isinstance(obj, esdl.EnergyAsset):
@@ -31,20 +168,202 @@ class EsdlHelper:
         ret_val[energy_system.id] = energy_system
         return ret_val
     
+    def get_all_esdl_objects_from_type(self, esdl_type : type) -> List:
+        """
+        Get all esdl objs that are an instance of esdl_type, in the order in which they appear in the energy system.
+
+        **Parameters**
+
+        - **`esdl_type`** - Type of the esdl objs to find.
+        """
+        if esdl_type not in self.esdl_objects_of_type:
+            positioned_esdl_objects = [positioned_esdl_obj for obj_type, positioned_esdl_objs in self.esdl_objects_per_type.items() if issubclass(obj_type, esdl_type) for positioned_esdl_obj in positioned_esdl_objs]
+            positioned_esdl_objects.sort(key=lambda positioned_esdl_obj: positioned_esdl_obj[0])
+            self.esdl_objects_of_type[esdl_type] = [esdl_obj for _, esdl_obj in positioned_esdl_objects]
+        return self.esdl_objects_of_type[esdl_type]
+
+    def get_esdl_object_with_id(self, esdl_id : EsdlId):
+        """
+        Find an esdl obj by id.
+
+        **Parameters**
+
+        - **`esdl_id`** - id of the esdl obj.
+        """
+        return self.esdl_object_mapping.get(esdl_id)
+
+    def _index_positions_per_type_name(self, esdl_objs : List) -> dict[str, List[tuple]]:
+        ret_val = {}
+        for position, esdl_obj in enumerate(esdl_objs):
+            ret_val.setdefault(type(esdl_obj).__name__, []).append((position, esdl_obj))
+        return ret_val
+
+    def _init_topology_index(self):
+        """
+        Builds the indexes that are used to answer connectivity queries without walking the energy system again:
+        the connected assets of each energy asset, the connected component of each energy asset with the type names
+        in that component, the biconnected blocks of the energy assets and the (non connected) esdl objects per type
+        name in the order of the esdl object mapping.
+        """
+        self.connected_assets : dict[EsdlId, List[esdl.EnergyAsset]] = {}
+        for esdl_obj in self.esdl_object_mapping.values():
+            if isinstance(esdl_obj, esdl.EnergyAsset):
+                self.connected_assets[esdl_obj.id] = [connected_port.eContainer() for port in esdl_obj.port for connected_port in port.connectedTo]
+
+        self.component_per_esdl_id : dict[EsdlId, int] = {}
+        self.type_names_per_component : List[set[str]] = []
+        for esdl_id, connected_assets in self.connected_assets.items():
+            if esdl_id not in self.component_per_esdl_id:
+                component = len(self.type_names_per_component)
+                type_names = {type(self.esdl_object_mapping[esdl_id]).__name__}
+                self.component_per_esdl_id[esdl_id] = component
+                assets_to_visit = list(connected_assets)
+                while assets_to_visit:
+                    connected_asset = assets_to_visit.pop()
+                    if connected_asset.id not in self.component_per_esdl_id:
+                        self.component_per_esdl_id[connected_asset.id] = component
+                        type_names.add(type(connected_asset).__name__)
+                        assets_to_visit.extend(self.connected_assets.get(connected_asset.id, []))
+                self.type_names_per_component.append(type_names)
+
+        self.position_per_esdl_id : dict[EsdlId, int] = {esdl_id : position for position, esdl_id in enumerate(self.esdl_object_mapping)}
+        self.neighbour_ids : dict[EsdlId, List[EsdlId]] = {esdl_id : list(dict.fromkeys(connected_asset.id for connected_asset in connected_assets if connected_asset.id != esdl_id)) for esdl_id, connected_assets in self.connected_assets.items()}
+        self._init_block_index()
+        self.subscribed_esdl_ids_per_block_entry : dict[frozenset[str], dict[tuple[int, EsdlId], frozenset[EsdlId]]] = {}
+
+        self.esdl_objects_per_type_name = self._index_positions_per_type_name(self.esdl_object_mapping.values())
+        self.non_connected_esdl_objects_per_type_name = self._index_positions_per_type_name([self.esdl_object_mapping[esdl_id] for esdl_id in self.non_connected_esdl_ids])
+        self.esdl_objects_of_type_names : dict[frozenset[str], List] = {}
+        self.non_connected_esdl_objects_of_type_names : dict[frozenset[str], List] = {}
+        self.building_energy_assets : dict[EsdlId, List[esdl.EnergyAsset]] = {}
+
+    def _init_block_index(self):
+        """
+        Splits the energy assets into biconnected blocks (Tarjan), two blocks share at most one asset: a cut asset.
+        Removing a single asset from a block keeps the rest of that block connected, which lets the connected
+        assets of an asset be answered per block instead of walking the whole component.
+        """
+        self.blocks : List[set[EsdlId]] = []
+        self.blocks_per_esdl_id : dict[EsdlId, List[int]] = {}
+        discovery_order : dict[EsdlId, int] = {}
+        low_link : dict[EsdlId, int] = {}
+        for root_id in self.neighbour_ids:
+            if root_id in discovery_order:
+                continue
+            discovery_order[root_id] = low_link[root_id] = len(discovery_order)
+            edges_to_assign = []
+            assets_to_visit = [(root_id, None, iter(self.neighbour_ids[root_id]))]
+            while assets_to_visit:
+                esdl_id, parent_id, neighbour_ids = assets_to_visit[-1]
+                neighbour_id = next(neighbour_ids, None)
+                if neighbour_id is not None:
+                    if neighbour_id not in discovery_order:
+                        discovery_order[neighbour_id] = low_link[neighbour_id] = len(discovery_order)
+                        edges_to_assign.append((esdl_id, neighbour_id))
+                        assets_to_visit.append((neighbour_id, esdl_id, iter(self.neighbour_ids.get(neighbour_id, []))))
+                    elif neighbour_id != parent_id and discovery_order[neighbour_id] < discovery_order[esdl_id]:
+                        low_link[esdl_id] = min(low_link[esdl_id], discovery_order[neighbour_id])
+                        edges_to_assign.append((esdl_id, neighbour_id))
+                    continue
+                assets_to_visit.pop()
+                if parent_id is not None:
+                    low_link[parent_id] = min(low_link[parent_id], low_link[esdl_id])
+                    if low_link[esdl_id] >= discovery_order[parent_id]:
+                        block = set()
+                        edge = None
+                        while edge != (parent_id, esdl_id):
+                            edge = edges_to_assign.pop()
+                            block.update(edge)
+                        for block_esdl_id in block:
+                            self.blocks_per_esdl_id.setdefault(block_esdl_id, []).append(len(self.blocks))
+                        self.blocks.append(block)
+        self.cut_esdl_ids_per_block : List[List[EsdlId]] = [[esdl_id for esdl_id in block if len(self.blocks_per_esdl_id[esdl_id]) > 1] for block in self.blocks]
+
+    def _get_subscribed_esdl_ids_from_block(self, block : int, entry_esdl_id : EsdlId, subscribed_type_names : frozenset[str]) -> frozenset[EsdlId]:
+        """
+        Returns the subscribed esdl ids of a block and of everything that hangs off its cut assets, except behind the entry asset.
+        The result is computed once per block and entry asset for every set of subscribed type names.
+        """
+        subscribed_esdl_ids_per_block_entry = self.subscribed_esdl_ids_per_block_entry.setdefault(subscribed_type_names, {})
+        block_entries_to_compute = [(block, entry_esdl_id)]
+        while block_entries_to_compute:
+            block_entry = block_entries_to_compute[-1]
+            if block_entry in subscribed_esdl_ids_per_block_entry:
+                block_entries_to_compute.pop()
+                continue
+            current_block, current_entry_esdl_id = block_entry
+            hanging_block_entries = [(hanging_block, cut_esdl_id) for cut_esdl_id in self.cut_esdl_ids_per_block[current_block] if cut_esdl_id != current_entry_esdl_id for hanging_block in self.blocks_per_esdl_id[cut_esdl_id] if hanging_block != current_block]
+            missing_block_entries = [hanging_block_entry for hanging_block_entry in hanging_block_entries if hanging_block_entry not in subscribed_esdl_ids_per_block_entry]
+            if missing_block_entries:
+                block_entries_to_compute.extend(missing_block_entries)
+                continue
+            block_entries_to_compute.pop()
+            subscribed_esdl_ids = {esdl_id for esdl_id in self.blocks[current_block] if type(self.esdl_object_mapping[esdl_id]).__name__ in subscribed_type_names}
+            for hanging_block_entry in hanging_block_entries:
+                subscribed_esdl_ids.update(subscribed_esdl_ids_per_block_entry[hanging_block_entry])
+            subscribed_esdl_ids_per_block_entry[block_entry] = frozenset(subscribed_esdl_ids)
+        return subscribed_esdl_ids_per_block_entry[(block, entry_esdl_id)]
+
+    def _get_subscribed_esdl_ids_behind(self, cut_esdl_id : EsdlId, block : int, subscribed_type_names : frozenset[str]) -> set[EsdlId]:
+        subscribed_esdl_ids = set()
+        for hanging_block in self.blocks_per_esdl_id[cut_esdl_id]:
+            if hanging_block != block:
+                subscribed_esdl_ids.update(self._get_subscribed_esdl_ids_from_block(hanging_block, cut_esdl_id, subscribed_type_names))
+        return subscribed_esdl_ids
+
+    def _get_reachable_esdl_ids_in_block(self, block : int, start_esdl_id : EsdlId, blocked_esdl_ids : set[EsdlId]) -> set[EsdlId]:
+        reachable_esdl_ids = {start_esdl_id}
+        assets_to_visit = [start_esdl_id]
+        while assets_to_visit:
+            for neighbour_id in self.neighbour_ids[assets_to_visit.pop()]:
+                if neighbour_id in self.blocks[block] and neighbour_id not in blocked_esdl_ids and neighbour_id not in reachable_esdl_ids:
+                    reachable_esdl_ids.add(neighbour_id)
+                    assets_to_visit.append(neighbour_id)
+        return reachable_esdl_ids
+
+    def _get_connected_subscribed_esdl_ids(self, model_esdl_asset : esdl.EnergyAsset, in_port_esdl_ids : set[EsdlId], subscribed_type_names : frozenset[str]) -> set[EsdlId]:
+        """
+        Returns the subscribed esdl ids of the assets that are connected to the model asset, without passing the assets on its in ports.
+        The assets on its in ports themselves are connected, the model asset is connected when it has another connected asset.
+        """
+        if model_esdl_asset.id in in_port_esdl_ids:
+            return set()
+        subscribed_esdl_ids = set()
+        for block in self.blocks_per_esdl_id.get(model_esdl_asset.id, []):
+            blocked_esdl_ids = in_port_esdl_ids.intersection(self.blocks[block])
+            if len(blocked_esdl_ids) <= 1:
+                block_subscribed_esdl_ids = set(self._get_subscribed_esdl_ids_from_block(block, model_esdl_asset.id, subscribed_type_names))
+                for blocked_esdl_id in blocked_esdl_ids:
+                    block_subscribed_esdl_ids.difference_update(self._get_subscribed_esdl_ids_behind(blocked_esdl_id, block, subscribed_type_names))
+                    block_subscribed_esdl_ids.discard(blocked_esdl_id)
+                subscribed_esdl_ids.update(block_subscribed_esdl_ids)
+            else:
+                for reachable_esdl_id in self._get_reachable_esdl_ids_in_block(block, model_esdl_asset.id, blocked_esdl_ids):
+                    if type(self.esdl_object_mapping[reachable_esdl_id]).__name__ in subscribed_type_names:
+                        subscribed_esdl_ids.add(reachable_esdl_id)
+                    if reachable_esdl_id != model_esdl_asset.id and len(self.blocks_per_esdl_id[reachable_esdl_id]) > 1:
+                        subscribed_esdl_ids.update(self._get_subscribed_esdl_ids_behind(reachable_esdl_id, block, subscribed_type_names))
+        subscribed_esdl_ids.update(esdl_id for esdl_id in in_port_esdl_ids if type(self.esdl_object_mapping[esdl_id]).__name__ in subscribed_type_names)
+        if all(connected_asset.id in in_port_esdl_ids for connected_asset in self.connected_assets[model_esdl_asset.id]):
+            subscribed_esdl_ids.discard(model_esdl_asset.id)
+        return subscribed_esdl_ids
+
+    def _get_esdl_objects_of_type_names(self, esdl_objects_per_type_name : dict[str, List[tuple]], esdl_objects_of_type_names : dict[frozenset[str], List], type_names : set[str]) -> List:
+        type_names = frozenset(type_names)
+        if type_names not in esdl_objects_of_type_names:
+            positioned_esdl_objects = [positioned_esdl_obj for type_name in type_names for positioned_esdl_obj in esdl_objects_per_type_name.get(type_name, [])]
+            positioned_esdl_objects.sort(key=lambda positioned_esdl_obj: positioned_esdl_obj[0])
+            esdl_objects_of_type_names[type_names] = [esdl_obj for _, esdl_obj in positioned_esdl_objects]
+        return esdl_objects_of_type_names[type_names]
+
+    def _get_subscribed_type_names(self, calculation_services: List[str], input_descriptions : List[SubscriptionDescription]) -> set[str]:
+        return {input_description.esdl_type for input_description in input_descriptions if input_description.esdl_type in calculation_services}
+
     def extract_calculation_service_name(self, calculation_services: List[str], esdl_obj) -> str:
         esdl_obj_type_name = type(esdl_obj).__name__
-        name = next(
-            (
-                calc_service_name
-                for calc_service_name in calculation_services
-                if calc_service_name == esdl_obj_type_name
-            ),
-            None,
-        )
-        
-        return name
+        return esdl_obj_type_name if esdl_obj_type_name in calculation_services else None
     
-    def add_connected_esdl_object(self, subscriptions: List[SubscriptionDescription], calculation_services: List[str], input_descriptions : List[SubscriptionDescription], connected_asset: esdl, simulator_asset: esdl.EnergyAsset):
+    def add_connected_esdl_object(self, subscriptions: dict[str, CalculationServiceInput], calculation_services: List[str], input_descriptions : List[SubscriptionDescription], connected_asset: esdl, simulator_asset: esdl.EnergyAsset):
         calc_service_name = self.extract_calculation_service_name(calculation_services, connected_asset)
     
         if calc_service_name:
@@ -52,87 +371,88 @@ class EsdlHelper:
             for input_description in input_descriptions:
                 new_input = CalculationServiceInput(input_description.esdl_type, input_description.input_name, connected_asset.id, input_description.input_unit, input_description.input_type, simulator_asset.id)
                 new_input.helics_sub_key = f'{new_input.esdl_asset_type}/{new_input.input_name}/{new_input.input_esdl_id}'
-                if new_input not in subscriptions:
-                    subscriptions.append(new_input)
+                if new_input.helics_sub_key not in subscriptions:
+                    subscriptions[new_input.helics_sub_key] = new_input
     
-    def add_calc_services_from_ports_recursive(
-        self,
-        calculation_services: List[str],
-        connected_input_esdl_objects: List[CalculationServiceInput],
-        input_descriptions : List[SubscriptionDescription],
-        model_esdl_asset: esdl.EnergyAsset,
-        start_asset : esdl.EnergyAsset,
-        visited_assets : List[str]
-    ):
-        if model_esdl_asset.id not in visited_assets:
-            visited_assets.append(model_esdl_asset.id)
-            for port in model_esdl_asset.port:
-                for connected_port in port.connectedTo:
-                    connected_asset = connected_port.eContainer()
-                    self.add_connected_esdl_object(
-                        connected_input_esdl_objects, calculation_services, input_descriptions, connected_asset, start_asset
-                    )
-                    if connected_asset.port != None and connected_asset.port != []:
-                        self.add_calc_services_from_ports_recursive(calculation_services, connected_input_esdl_objects, input_descriptions, connected_asset, start_asset, visited_assets)
-
-    def add_calc_services_from_building(self, calculation_services: List[str], connected_input_esdl_objects: List[CalculationServiceInput], input_descriptions : List[SubscriptionDescription], model_esdl_asset: esdl.EnergyAsset, building : esdl.Building):
-        for esdl_entity in building.eAllContents():
-            if isinstance(esdl_entity, esdl.EnergyAsset):
-                self.add_connected_esdl_object(
-                        connected_input_esdl_objects, calculation_services, input_descriptions, esdl_entity, model_esdl_asset
-                    )
+    def add_calc_services_from_building(self, calculation_services: List[str], connected_input_esdl_objects: dict[str, CalculationServiceInput], input_descriptions : List[SubscriptionDescription], model_esdl_asset: esdl.EnergyAsset, building : esdl.Building):
+        if building.id not in self.building_energy_assets:
+            self.building_energy_assets[building.id] = [esdl_entity for esdl_entity in building.eAllContents() if isinstance(esdl_entity, esdl.EnergyAsset)]
+        for esdl_entity in self.building_energy_assets[building.id]:
+            self.add_connected_esdl_object(
+                    connected_input_esdl_objects, calculation_services, input_descriptions, esdl_entity, model_esdl_asset
+                )
 
     def add_calc_services_from_ports(
         self,
         calculation_services: List[str],
-        connected_input_esdl_objects: List[CalculationServiceInput],
+        connected_input_esdl_objects: dict[str, CalculationServiceInput],
         input_descriptions : List[SubscriptionDescription],
         model_esdl_asset: esdl.EnergyAsset
     ):
-        visited_assets = []
+        in_port_esdl_ids = set()
         for port in model_esdl_asset.port:
             if isinstance(port, esdl.InPort):
                 for connected_asset in port.connectedTo:
-                    visited_assets.append(connected_asset.eContainer().id)
+                    in_port_esdl_ids.add(connected_asset.eContainer().id)
         if isinstance(model_esdl_asset.eContainer(), esdl.Building):
             self.add_calc_services_from_building(calculation_services, connected_input_esdl_objects, input_descriptions, model_esdl_asset, model_esdl_asset.eContainer())
 
-        self.add_calc_services_from_ports_recursive(calculation_services, connected_input_esdl_objects, input_descriptions, model_esdl_asset, model_esdl_asset, visited_assets)
+        subscribed_type_names = frozenset(self._get_subscribed_type_names(calculation_services, input_descriptions))
+        component = self.component_per_esdl_id[model_esdl_asset.id]
+        if not self.type_names_per_component[component].isdisjoint(subscribed_type_names):
+            connected_esdl_ids = self._get_connected_subscribed_esdl_ids(model_esdl_asset, in_port_esdl_ids, subscribed_type_names)
+            for connected_esdl_id in sorted(connected_esdl_ids, key=self.position_per_esdl_id.get):
+                self.add_connected_esdl_object(
+                    connected_input_esdl_objects, calculation_services, input_descriptions, self.esdl_object_mapping[connected_esdl_id], model_esdl_asset
+                )
 
     def add_calc_services_from_non_connected_objects(
         self,
         calculation_services: List[str],
-        connected_input_esdl_objects: List[SubscriptionDescription],
+        connected_input_esdl_objects: dict[str, CalculationServiceInput],
         input_descriptions : List[SubscriptionDescription],
         model_esdl_asset: esdl.EnergyAsset
     ):
-        for esdl_id in self.non_connected_esdl_ids:
+        subscribed_type_names = self._get_subscribed_type_names(calculation_services, input_descriptions)
+        for esdl_obj in self._get_esdl_objects_of_type_names(self.non_connected_esdl_objects_per_type_name, self.non_connected_esdl_objects_of_type_names, subscribed_type_names):
             self.add_connected_esdl_object(
-                connected_input_esdl_objects, calculation_services, input_descriptions, self.esdl_object_mapping[esdl_id], model_esdl_asset
+                connected_input_esdl_objects, calculation_services, input_descriptions, esdl_obj, model_esdl_asset
             )
         self.add_connected_esdl_object(connected_input_esdl_objects, calculation_services, input_descriptions, self.energy_system, model_esdl_asset)
     
     def add_calc_services_from_all_objects(
         self,
         calculation_services: List[str],
-        connected_input_esdl_objects: List[SubscriptionDescription],
+        connected_input_esdl_objects: dict[str, CalculationServiceInput],
         input_descriptions : List[SubscriptionDescription],
         model_esdl_asset: esdl.EnergyAsset
     ):
-        for esdl_obj in self.esdl_object_mapping.values():
+        subscribed_type_names = self._get_subscribed_type_names(calculation_services, input_descriptions)
+        for esdl_obj in self._get_esdl_objects_of_type_names(self.esdl_objects_per_type_name, self.esdl_objects_of_type_names, subscribed_type_names):
             self.add_connected_esdl_object(
                 connected_input_esdl_objects, calculation_services, input_descriptions, esdl_obj, model_esdl_asset
             )
     
+    def _get_subscriptions_cache_key(self, calculation_services: List[str], input_descriptions : List[SubscriptionDescription]) -> tuple:
+        """The key of the subscriptions in the esdl cache, made of the fields that determine the subscribed inputs."""
+        return (tuple(sorted(calculation_services)), tuple((input_description.esdl_type, input_description.input_name, input_description.input_unit, int(input_description.input_type)) for input_description in input_descriptions))
+
     def get_connected_input_esdl_objects(
         self,
         esdl_id: EsdlId,
         calculation_services: List[str],
         input_descriptions : List[SubscriptionDescription]
     ) -> List[CalculationServiceInput]:
+        if self.cache_entry is not None:
+            subscriptions_cache_key = self._get_subscriptions_cache_key(calculation_services, input_descriptions)
+            with self.cache_entry_lock:
+                cached_inputs = self.cache_entry.subscriptions.get(subscriptions_cache_key, {}).get(esdl_id)
+            if cached_inputs is not None:
+                return [dataclasses.replace(cached_input) for cached_input in cached_inputs]
+
         model_esdl_obj = self.esdl_object_mapping[esdl_id]
     
-        connected_input_esdl_objects: List[CalculationServiceInput] = []
+        connected_input_esdl_objects: dict[str, CalculationServiceInput] = {}
         if isinstance(model_esdl_obj, esdl.EnergyAsset):
             self.add_calc_services_from_ports(
                 calculation_services, connected_input_esdl_objects, input_descriptions, model_esdl_obj
@@ -144,4 +464,9 @@ class EsdlHelper:
             self.add_calc_services_from_all_objects(
                 calculation_services, connected_input_esdl_objects, input_descriptions, model_esdl_obj
             )
-        return connected_input_esdl_objects
\ No newline at end of file
+
+        if self.cache_entry is not None:
+            with self.cache_entry_lock:
+                self.cache_entry.subscriptions.setdefault(subscriptions_cache_key, {})[esdl_id] = [dataclasses.replace(connected_input) for connected_input in connected_input_esdl_objects.values()]
+                self.cache_entry_changed = True
+        return list(connected_input_esdl_objects.values())
@@ -1,5 +1,7 @@
 from typing import List
 
+from dots_infrastructure.EsdlHelper import EsdlHelper
+
 class EsdlHelperFunctions:
     
     @staticmethod
@@ -9,9 +11,11 @@ class EsdlHelperFunctions:
 
         **Parameters**
 
-        - **`collection`** - Collection of esdl objs.
+        - **`collection`** - Collection of esdl objs or an EsdlHelper, in which case its type index is used.
         - **`type`** - Type of the esdl objs to find.
         """
+        if isinstance(collection, EsdlHelper):
+            return collection.get_all_esdl_objects_from_type(type)
         return [esdl_obj for esdl_obj in collection if isinstance(esdl_obj, type)]
     
     @staticmethod
@@ -21,7 +25,9 @@ class EsdlHelperFunctions:
 
         **Parameters**
 
-        - **`collection`** - Collection of esdl objs.
+        - **`collection`** - Collection of esdl objs or an EsdlHelper, in which case its id index is used.
         - **`id`** - id of the esdl obj.
         """
+        if isinstance(collection, EsdlHelper):
+            return collection.get_esdl_object_with_id(id)
         return next((esdl_obj for esdl_obj in collection if hasattr(esdl_obj, "id") and esdl_obj.id == id), None)
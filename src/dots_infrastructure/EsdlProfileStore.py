@@ -0,0 +1,158 @@
+from datetime import datetime, timedelta
+from hashlib import sha256
+import os
+import tempfile
+from typing import List, Optional, Tuple
+
+import numpy as np
+
+from dots_infrastructure.DataClasses import EsdlId, InfluxDBProfileQuery, InfluxDBProfileReference
+from dots_infrastructure.Logger import LOGGER
+from dots_infrastructure.influxdb_connector import InfluxDBConnector
+
+class ProfileCache:
+    """
+    On disk cache of the raw results of profile queries, addressed by the sha256 hash of the influx server, database and query.
+
+    Every entry is a numpy .npz file with the epoch seconds and the values of the profile, stored without pickling.
+    """
+
+    CACHE_FILE_EXTENSION = ".npz"
+
+    def __init__(self, cache_directory : str):
+        self.cache_directory = cache_directory
+        os.makedirs(self.cache_directory, exist_ok=True)
+
+    @staticmethod
+    def get_query_hash(profile_query : InfluxDBProfileQuery) -> str:
+        return sha256(f"{profile_query.host}:{profile_query.port}/{profile_query.database}\n{profile_query.query}".encode("utf-8")).hexdigest()
+
+    def _get_cache_file_path(self, profile_query : InfluxDBProfileQuery) -> str:
+        return os.path.join(self.cache_directory, f"{self.get_query_hash(profile_query)}{self.CACHE_FILE_EXTENSION}")
+
+    def load(self, profile_query : InfluxDBProfileQuery) -> Optional[Tuple[np.ndarray, np.ndarray]]:
+        cache_file_path = self._get_cache_file_path(profile_query)
+        if not os.path.exists(cache_file_path):
+            return None
+        try:
+            with np.load(cache_file_path, allow_pickle=False) as cache_entry:
+                return cache_entry["timestamps"], cache_entry["values"]
+        except Exception as e:
+            LOGGER.warning(f"Ignoring unreadable profile cache entry {cache_file_path}: {e}")
+            return None
+
+    def store(self, profile_query : InfluxDBProfileQuery, timestamps : np.ndarray, values : np.ndarray):
+        file_descriptor, temporary_file_path = tempfile.mkstemp(dir=self.cache_directory)
+        try:
+            with os.fdopen(file_descriptor, "wb") as cache_file:
+                np.savez(cache_file, timestamps=timestamps, values=values)
+            os.replace(temporary_file_path, self._get_cache_file_path(profile_query))
+        except Exception as e:
+            LOGGER.warning(f"Failed to store profile cache entry for query {profile_query.query}: {e}")
+            if os.path.exists(temporary_file_path):
+                os.remove(temporary_file_path)
+
+class EsdlProfileStore:
+    """
+    Values of the InfluxDBProfiles that are referenced by esdl objects, sampled at a fixed resolution from the simulation start time
+    through the end of the simulation.
+
+    The value at time step index i is the last value of the profile at or before start_time + i * resolution_in_seconds, times the
+    multiplier of the profile, or NaN when the profile has no value yet. With a resolution equal to the period of a calculation, the
+    index is the current_time_step_number of that calculation.
+    """
+
+    MAX_STATEMENTS_PER_REQUEST = 50
+
+    def __init__(self, start_time : datetime, simulation_duration_in_seconds : int, resolution_in_seconds : int, influx_username : str = None, influx_password : str = None, profile_cache : ProfileCache = None):
+        self.start_time = start_time
+        self.resolution_in_seconds = resolution_in_seconds
+        self.amount_of_time_steps = int(simulation_duration_in_seconds // resolution_in_seconds) + 1
+        self.influx_username = influx_username
+        self.influx_password = influx_password
+        self.profile_cache = profile_cache
+        self.profile_values : dict[EsdlId, dict[str, np.ndarray]] = {}
+
+    def _to_influx_time(self, simulation_time : datetime) -> str:
+        return simulation_time.strftime("%Y-%m-%dT%H:%M:%SZ")
+
+    def create_profile_query(self, profile : InfluxDBProfileReference) -> InfluxDBProfileQuery:
+        end_time = self.start_time + timedelta(seconds=self.amount_of_time_steps * self.resolution_in_seconds)
+        query = f'SELECT "{profile.field}" FROM "{profile.measurement}" WHERE time >= \'{self._to_influx_time(self.start_time)}\' AND time < \'{self._to_influx_time(end_time)}\''
+        if profile.filters:
+            query += f" AND ({profile.filters})"
+        return InfluxDBProfileQuery(profile.host, profile.port, profile.database, query)
+
+    def load(self, influxdb_profiles : dict[EsdlId, List[InfluxDBProfileReference]]):
+        """Loads the values of the InfluxDBProfiles per esdl id, every distinct profile query is executed once and the queries
+        to the same influx database are sent together."""
+        profile_queries = {profile : self.create_profile_query(profile) for profiles in influxdb_profiles.values() for profile in profiles}
+        query_results = self._execute_profile_queries(set(profile_queries.values()))
+        for esdl_id, profiles in influxdb_profiles.items():
+            self.profile_values[esdl_id] = {}
+            for profile in profiles:
+                query_result = query_results.get(profile_queries[profile])
+                if query_result is None:
+                    continue
+                timestamps, values = query_result
+                self.profile_values[esdl_id][profile.profile_key] = self._sample(timestamps, values) * profile.multiplier
+        LOGGER.info(f"Loaded {len(query_results)} profiles for {len(influxdb_profiles)} esdl objects")
+
+    def _execute_profile_queries(self, profile_queries : set) -> dict[InfluxDBProfileQuery, Tuple[np.ndarray, np.ndarray]]:
+        query_results = {}
+        queries_per_database : dict[Tuple[str, str, str], List[InfluxDBProfileQuery]] = {}
+        for profile_query in profile_queries:
+            cached_result = self.profile_cache.load(profile_query) if self.profile_cache else None
+            if cached_result is not None:
+                query_results[profile_query] = cached_result
+            else:
+                queries_per_database.setdefault((profile_query.host, profile_query.port, profile_query.database), []).append(profile_query)
+
+        for (host, port, database), database_queries in queries_per_database.items():
+            influx_connector = InfluxDBConnector(host, port, self.influx_username, self.influx_password, database)
+            try:
+                for i in range(0, len(database_queries), self.MAX_STATEMENTS_PER_REQUEST):
+                    query_results.update(self._execute_statements(influx_connector, database_queries[i:i + self.MAX_STATEMENTS_PER_REQUEST]))
+            except Exception as e:
+                LOGGER.error(f"Failed to load profiles from influx db {host}:{port}/{database}: {e}")
+            finally:
+                influx_connector.close()
+        return query_results
+
+    def _execute_statements(self, influx_connector : InfluxDBConnector, profile_queries : List[InfluxDBProfileQuery]) -> dict[InfluxDBProfileQuery, Tuple[np.ndarray, np.ndarray]]:
+        query_results = {profile_query : (np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float64)) for profile_query in profile_queries}
+        for query_series in influx_connector.query_arrays(";".join(profile_query.query for profile_query in profile_queries)):
+            profile_query = profile_queries[query_series.statement_id]
+            value_column_name = next(column_name for column_name in query_series.columns if column_name != "time")
+            timestamps = query_series.columns["time"].astype(np.int64)
+            values = query_series.columns[value_column_name].astype(np.float64)
+            query_results[profile_query] = (timestamps, values)
+        if self.profile_cache:
+            for profile_query, (timestamps, values) in query_results.items():
+                if len(timestamps) > 0:
+                    self.profile_cache.store(profile_query, timestamps, values)
+        return query_results
+
+    def _sample(self, timestamps : np.ndarray, values : np.ndarray) -> np.ndarray:
+        start_timestamp = int((self.start_time - datetime(1970, 1, 1)).total_seconds())
+        sample_timestamps = start_timestamp + (np.arange(self.amount_of_time_steps) * self.resolution_in_seconds).astype(np.int64)
+        sample_indices = np.searchsorted(timestamps, sample_timestamps, side="right") - 1
+        samples = np.full(self.amount_of_time_steps, np.nan)
+        has_value = sample_indices >= 0
+        samples[has_value] = values[sample_indices[has_value]]
+        return samples
+
+    def get_time_step_index(self, simulation_time : datetime) -> int:
+        return int((simulation_time - self.start_time).total_seconds() // self.resolution_in_seconds)
+
+    def get_profile_values(self, esdl_id : EsdlId, profile_key : str = None) -> np.ndarray:
+        """Returns the sampled values of a profile of an esdl object, the profile key can be omitted when the esdl object has a single profile."""
+        profile_values = self.profile_values[esdl_id]
+        if profile_key is None:
+            if len(profile_values) != 1:
+                raise KeyError(f"Esdl object {esdl_id} has {len(profile_values)} profiles, specify the profile key, one of: {list(profile_values)}")
+            return next(iter(profile_values.values()))
+        return profile_values[profile_key]
+
+    def get_profile_value(self, esdl_id : EsdlId, time_step_index : int, profile_key : str = None) -> float:
+        return self.get_profile_values(esdl_id, profile_key)[time_step_index]
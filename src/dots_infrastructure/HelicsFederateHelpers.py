@@ -1,36 +1,69 @@
-from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import Future, ThreadPoolExecutor, wait
 import dataclasses
-from datetime import timedelta
+from datetime import datetime, timedelta
+import logging
 import math
-import time
 import traceback
-from typing import List
+from typing import Any, List
 import helics as h
 from esdl import esdl
 
 from dots_infrastructure import Common
-from dots_infrastructure.Constants import TimeRequestType
-from dots_infrastructure.DataClasses import CalculationServiceInput, CalculationServiceOutput, HelicsCalculationInformation, HelicsInitMessagesFederateInformation, PublicationDescription, RunningStatus, SubscriptionDescription, TimeStepInformation
-from dots_infrastructure.EsdlHelper import EsdlHelper
+from dots_infrastructure.CalculationCache import CalculationCache
+from dots_infrastructure.CalculationProcessPool import CalculationProcessPool
+from dots_infrastructure.Constants import CalculationMode, ResultSinkType, TimeRequestType
+from dots_infrastructure.DataClasses import CalculationServiceInput, CalculationServiceOutput, EsdlId, HelicsCalculationInformation, HelicsInitMessagesFederateInformation, PublicationDescription, RunningStatus, SimulatorConfiguration, SubscriptionDescription, TimeStepInformation
+from dots_infrastructure.EsdlCache import EsdlCache
+from dots_infrastructure.EsdlHelper import Base64StreamDecoder, EsdlHelper
+from dots_infrastructure.EsdlProfileStore import EsdlProfileStore, ProfileCache
 from dots_infrastructure.Logger import LOGGER
 from dots_infrastructure import CalculationServiceHelperFunctions
 from dots_infrastructure.influxdb_connector import InfluxDBConnector
+from dots_infrastructure.parquet_connector import ParquetConnector
+from dots_infrastructure.result_sink import ColumnarPointBuffer, ResultSink, get_epoch_seconds
+
+IN_PROCESS_CORE_TYPES = [h.HelicsCoreType.INPROC]
+INITIALIZATION_CORE_TYPE = h.HelicsCoreType.ZMQ
+
+def get_shared_core_name(simulator_configuration : SimulatorConfiguration) -> str:
+    return f"{simulator_configuration.model_id}_core"
+
+def get_broker_arguments(simulator_configuration : SimulatorConfiguration) -> str:
+    if simulator_configuration.helics_core_type in IN_PROCESS_CORE_TYPES:
+        return ""
+    return f"--broker {simulator_configuration.broker_ip} --brokerport {simulator_configuration.broker_port}"
+
+def create_shared_core(simulator_configuration : SimulatorConfiguration, amount_of_federates : int) -> h.HelicsCore:
+    """Creates the core that the value federates of a calculation service attach to when the core is shared, the core
+    waits for the given amount of federates before it enters initialization."""
+    core_name = get_shared_core_name(simulator_configuration)
+    LOGGER.debug(f"Creating shared {simulator_configuration.helics_core_type.name} core {core_name} for {amount_of_federates} federates")
+    return h.helicsCreateCore(simulator_configuration.helics_core_type.name.lower(), core_name, f"-f {amount_of_federates} {get_broker_arguments(simulator_configuration)}")
 
 class HelicsFederateExecutor:
 
     def __init__(self):
         self.simulator_configuration = CalculationServiceHelperFunctions.get_simulator_configuration_from_environment()
 
-    def init_default_federate_info(self):
+    def init_default_federate_info(self, core_type : h.HelicsCoreType = None):
+        if core_type is None:
+            core_type = self.simulator_configuration.helics_core_type
         federate_info = h.helicsCreateFederateInfo()
-        h.helicsFederateInfoSetBroker(federate_info, self.simulator_configuration.broker_ip)
-        h.helicsFederateInfoSetBrokerPort(federate_info, self.simulator_configuration.broker_port)
-        h.helicsFederateInfoSetCoreType(federate_info, h.HelicsCoreType.ZMQ)
+        if core_type not in IN_PROCESS_CORE_TYPES:
+            h.helicsFederateInfoSetBroker(federate_info, self.simulator_configuration.broker_ip)
+            h.helicsFederateInfoSetBrokerPort(federate_info, self.simulator_configuration.broker_port)
+        h.helicsFederateInfoSetCoreType(federate_info, core_type)
         h.helicsFederateInfoSetIntegerProperty(federate_info, h.HelicsProperty.INT_LOG_LEVEL, h.HelicsLogLevel.NO_PRINT)
         return federate_info
 
-    def init_calculation_service_federate_info(self, info : HelicsCalculationInformation):
+    def init_value_federate_info(self):
         federate_info = self.init_default_federate_info()
+        if self.simulator_configuration.share_helics_core:
+            h.helicsFederateInfoSetCoreName(federate_info, get_shared_core_name(self.simulator_configuration))
+        return federate_info
+
+    def init_calculation_service_federate_info(self, info : HelicsCalculationInformation):
+        federate_info = self.init_value_federate_info()
         h.helicsFederateInfoSetTimeProperty(federate_info, h.HelicsProperty.TIME_PERIOD, info.federate_time_period)
         h.helicsFederateInfoSetTimeProperty(federate_info, h.HelicsProperty.TIME_DELTA, info.time_delta)
         h.helicsFederateInfoSetTimeProperty(federate_info, h.HelicsProperty.TIME_OFFSET, info.offset)
@@ -47,7 +80,8 @@ class HelicsInitializationMessagesFederateExecutor(HelicsFederateExecutor):
         self.esdl_message_enpoint = None
 
     def init_federate(self):
-        federate_info = self.init_default_federate_info()
+        # the initialization messages are exchanged with the simulation orchestrator over the network, whatever core the calculations use
+        federate_info = self.init_default_federate_info(INITIALIZATION_CORE_TYPE)
         self.message_federate = h.helicsCreateMessageFederate(f"{self.simulator_configuration.model_id}", federate_info)
         self.esdl_message_enpoint = h.helicsFederateRegisterEndpoint(self.message_federate, self.helics_message_federate_information.esdl_endpoint_name)
         self.amount_of_calculations_endpoint = h.helicsFederateRegisterEndpoint(self.message_federate, self.helics_message_federate_information.amount_of_calculations_endpoint_name)
@@ -63,19 +97,18 @@ class HelicsInitializationMessagesFederateExecutor(HelicsFederateExecutor):
         h.helicsEndpointSendMessage(self.amount_of_calculations_endpoint, amount_of_calculations_message)
 
     def wait_for_esdl_file(self) -> EsdlHelper:
-        esdl_file_base64 = ""
+        esdl_decoder = Base64StreamDecoder()
         while h.helicsFederateRequestTime(self.message_federate, h.HELICS_TIME_MAXTIME) != h.HELICS_TIME_MAXTIME:
             LOGGER.debug("Fetching an esdl message string at time")
-            esdl_file_base64_part = ""
             if h.helicsEndpointHasMessage(self.esdl_message_enpoint):
                 esdl_file_base64_part_bytes = h.helicsMessageGetBytes(h.helicsEndpointGetMessage(self.esdl_message_enpoint))
-                esdl_file_base64_part = esdl_file_base64_part_bytes.decode()
-                LOGGER.debug(f"Received part of esdl file with: {len(esdl_file_base64_part)} characters")
-            esdl_file_base64 += esdl_file_base64_part
+                LOGGER.debug(f"Received part of esdl file with: {len(esdl_file_base64_part_bytes)} characters")
+                esdl_decoder.feed(esdl_file_base64_part_bytes)
 
         LOGGER.debug("Destroying esdl message federate")
         Common.destroy_federate(self.message_federate)
-        esdl_helper = EsdlHelper(esdl_file_base64)
+        esdl_cache = EsdlCache(self.simulator_configuration.esdl_cache_directory) if self.simulator_configuration.esdl_cache_directory else None
+        esdl_helper = EsdlHelper(esdl_stream=esdl_decoder.finish(), esdl_cache=esdl_cache)
 
         return esdl_helper
 
@@ -92,6 +125,17 @@ class HelicsValueFederateExecutor(HelicsFederateExecutor):
         self.energy_system : esdl.EnergySystem = None
         self.value_federate : h.HelicsValueFederate = None
         self.running_status = RunningStatus()
+        self.completion_future : Future = None
+        self.calculation_process_pool : CalculationProcessPool = None
+        self.calculation_cache : CalculationCache = None
+        self.influx_connector : ResultSink = None
+        self.recorded_data_points = ColumnarPointBuffer()
+        self.time_step_timestamp : int = None
+        self.esdl_ids_per_sub_key : dict[str, List[EsdlId]] = {}
+        self.received_sub_keys : set[str] = set()
+        self.sub_keys_keeping_last_value : set[str] = set()
+        self.kept_input_values : dict[str, Any] = {}
+        self.amount_of_outstanding_inputs = 0
 
     def init_outputs(self, pubs : List[PublicationDescription], value_federate : h.HelicsValueFederate):
         LOGGER.debug(f"[{self.value_federate.name}] Initializing {len(pubs)} outputs for calculation service {self.helics_value_federate_info.calculation_name}")
@@ -106,115 +150,83 @@ class HelicsValueFederateExecutor(HelicsFederateExecutor):
                 pub = h.helicsFederateRegisterPublication(value_federate, key, output.output_type, output.output_unit)
                 LOGGER.debug(f"[{h.helicsFederateGetName(self.value_federate)}] Registered non global publication with key: {key}")
             output.helics_publication = pub
+            output.value_publisher = Common.get_helics_publication_publisher(output.output_type)
             if output.output_esdl_id in self.output_dict:
                 self.output_dict[output.output_esdl_id].append(output)
             else:
                 self.output_dict[output.output_esdl_id] = [output]
 
     def init_inputs(self, subs : List[SubscriptionDescription], esdl_helper : EsdlHelper, value_federate : h.HelicsValueFederate):
-        inputs : List[CalculationServiceInput] = []
+        inputs : dict[str, CalculationServiceInput] = {}
         LOGGER.debug(f"[{self.value_federate.name}] Initializing {len(subs)} inputs for calculation service {self.helics_value_federate_info.calculation_name}")
         for esdl_id in self.simulator_configuration.esdl_ids:
             inputs_for_esdl_object = esdl_helper.get_connected_input_esdl_objects(esdl_id, self.simulator_configuration.calculation_services, subs)
             LOGGER.debug(f"[{self.value_federate.name}] Initializing {len(inputs_for_esdl_object)} inputs for esdl object {esdl_id}")
             self.remove_duplicate_subscriptions_and_update_inputs(inputs, inputs_for_esdl_object)
             self.input_dict[esdl_id] = inputs_for_esdl_object
+        esdl_helper.store_cache_entry()
 
-        for input in inputs:
+        for input in inputs.values():
             LOGGER.debug(f"[{self.value_federate.name}] Subscribing to publication with key: {input.helics_sub_key}")
             sub = h.helicsFederateRegisterSubscription(value_federate, input.helics_sub_key, input.input_unit)
             input.helics_input = sub
+            input.value_getter = Common.get_helics_input_getter(input.input_type)
 
-        self.all_inputs = inputs
-        LOGGER.debug(f"Registered inputs: {inputs}")
+        self.all_inputs = list(inputs.values())
+        LOGGER.debug(f"Registered {len(self.all_inputs)} inputs")
 
-    def remove_duplicate_subscriptions_and_update_inputs(self, inputs : List[CalculationServiceInput], inputs_for_esdl_object : List[CalculationServiceInput]):
+    def remove_duplicate_subscriptions_and_update_inputs(self, inputs : dict[str, CalculationServiceInput], inputs_for_esdl_object : List[CalculationServiceInput]):
         for i, new_input in enumerate(inputs_for_esdl_object):
-            existing_input = next((input for input in inputs if input.helics_sub_key == new_input.helics_sub_key), None)
+            existing_input = inputs.get(new_input.helics_sub_key)
             if existing_input:
                 inputs_for_esdl_object[i] = existing_input
             else:
-                inputs.append(new_input)
+                inputs[new_input.helics_sub_key] = new_input
 
     def init_federate(self, esdl_helper : EsdlHelper):
         LOGGER.debug(f"[{self.simulator_configuration.model_id}/{self.helics_value_federate_info.calculation_name}] Initializing federate info")
         federate_info = self.init_calculation_service_federate_info(self.helics_value_federate_info)
         LOGGER.debug(f"[{self.simulator_configuration.model_id}/{self.helics_value_federate_info.calculation_name}] Creating HELICS value federate")
-        self.value_federate = h.helicsCreateValueFederate(f"{self.simulator_configuration.model_id}/{self.helics_value_federate_info.calculation_name}", federate_info)
+        value_federate = h.helicsCreateValueFederate(f"{self.simulator_configuration.model_id}/{self.helics_value_federate_info.calculation_name}", federate_info)
+        self.init_calculation(esdl_helper, value_federate)
+
+    def init_calculation(self, esdl_helper : EsdlHelper, value_federate : h.HelicsValueFederate):
+        self.value_federate = value_federate
         self.init_inputs(self.helics_value_federate_info.inputs, esdl_helper, self.value_federate)
         self.init_outputs(self.helics_value_federate_info.outputs, self.value_federate)
         self.energy_system = esdl_helper.energy_system
+        if self.helics_value_federate_info.memoize:
+            self._init_calculation_cache()
+
+    def _init_calculation_cache(self):
+        if self.helics_value_federate_info.calculation_mode != CalculationMode.PER_ESDL_ID:
+            LOGGER.warning(f"[{self.simulator_configuration.model_id}/{self.helics_value_federate_info.calculation_name}] Memoization is only applied to calculations with calculation mode {CalculationMode.PER_ESDL_ID.name}")
+            return
+        cache_size = self.helics_value_federate_info.memoization_cache_size
+        self.calculation_cache = CalculationCache(cache_size if cache_size else len(self.simulator_configuration.esdl_ids))
 
     def get_helics_value(self, helics_sub : CalculationServiceInput):
         ret_val = None
-        input_type = helics_sub.input_type
         sub = helics_sub.helics_input
         if h.helicsInputIsUpdated(sub):
-            LOGGER.debug(f"[{h.helicsFederateGetName(self.value_federate)}] Getting value for subscription: {helics_sub.helics_sub_key} with type: {helics_sub.input_type} updated time: {h.helicsInputLastUpdateTime(sub)}")
-            if input_type == h.HelicsDataType.BOOLEAN:
-                ret_val = h.helicsInputGetBoolean(sub)
-            elif input_type == h.HelicsDataType.COMPLEX_VECTOR:
-                ret_val = h.helicsInputGetComplexVector(sub)
-            elif input_type == h.HelicsDataType.DOUBLE:
-                ret_val = h.helicsInputGetDouble(sub)
-            elif input_type == h.HelicsDataType.COMPLEX:
-                ret_val = h.helicsInputGetComplex(sub)
-            elif input_type == h.HelicsDataType.INT:
-                ret_val = h.helicsInputGetInteger(sub)
-            elif input_type == h.HelicsDataType.JSON:
-                ret_val = h.helicsInputGetString(sub)
-            elif input_type == h.HelicsDataType.NAMED_POINT:
-                ret_val = h.helicsInputGetNamedPoint(sub)
-            elif input_type == h.HelicsDataType.STRING:
-                ret_val = h.helicsInputGetString(sub)
-            elif input_type == h.HelicsDataType.RAW:
-                ret_val = h.helicsInputGetRawValue(sub)
-            elif input_type == h.HelicsDataType.TIME:
-                ret_val = h.helicsInputGetTime(sub)
-            elif input_type == h.HelicsDataType.VECTOR:
-                ret_val = h.helicsInputGetVector(sub)
-            elif input_type == h.HelicsDataType.ANY:
-                ret_val = h.helicsInputGetBytes(sub)
-            else:
-                raise ValueError("Unsupported Helics Data Type")
-            LOGGER.debug(f"[{h.helicsFederateGetName(self.value_federate)}] Got value: {ret_val} from {helics_sub.helics_sub_key}")
-
-        if ret_val == None:
+            ret_val = helics_sub.value_getter(sub)
+            if LOGGER.isEnabledFor(logging.DEBUG):
+                LOGGER.debug(f"[{h.helicsFederateGetName(self.value_federate)}] Got value: {ret_val} for subscription: {helics_sub.helics_sub_key} with type: {helics_sub.input_type} updated time: {h.helicsInputLastUpdateTime(sub)}")
+        elif LOGGER.isEnabledFor(logging.DEBUG):
             LOGGER.debug(f"[{h.helicsFederateGetName(self.value_federate)}] No new value for input: {helics_sub.helics_sub_key}")
         return ret_val
 
     def publish_helics_value(self, helics_output : CalculationServiceOutput, value):
-        LOGGER.debug(f"[{h.helicsFederateGetName(self.value_federate)}] Publishing value: {value} for publication: {helics_output.helics_publication.name} with type: {helics_output.output_type.name}")
-        pub = helics_output.helics_publication
-        output_type = helics_output.output_type
-        if output_type == h.HelicsDataType.BOOLEAN:
-            h.helicsPublicationPublishBoolean(pub, value)
-        elif output_type == h.HelicsDataType.COMPLEX_VECTOR:
-            h.helicsPublicationPublishComplexVector(pub, value)
-        elif output_type == h.HelicsDataType.DOUBLE:
-            h.helicsPublicationPublishDouble(pub, value)
-        elif output_type == h.HelicsDataType.COMPLEX:
-            h.helicsPublicationPublishComplex(pub, value)
-        elif output_type == h.HelicsDataType.INT:
-            h.helicsPublicationPublishInteger(pub, value)
-        elif output_type == h.HelicsDataType.JSON:
-            h.helicsPublicationPublishString(pub, value)
-        elif output_type == h.HelicsDataType.NAMED_POINT:
-            h.helicsPublicationPublishNamedPoint(pub, value)
-        elif output_type == h.HelicsDataType.STRING:
-            h.helicsPublicationPublishString(pub, value)
-        elif output_type == h.HelicsDataType.RAW:
-            h.helicsPublicationPublishRaw(pub, value)
-        elif output_type == h.HelicsDataType.TIME:
-            h.helicsPublicationPublishTime(pub, value)
-        elif output_type == h.HelicsDataType.VECTOR:
-            h.helicsPublicationPublishVector(pub, value)
-        elif output_type == h.HelicsDataType.ANY:
-            h.helicsPublicationPublishBytes(pub, value)
-        else:
-            raise ValueError("Unsupported Helics Data Type")
+        if LOGGER.isEnabledFor(logging.DEBUG):
+            LOGGER.debug(f"[{h.helicsFederateGetName(self.value_federate)}] Publishing value: {value} for publication: {helics_output.helics_publication.name} with type: {helics_output.output_type.name}")
+        helics_output.value_publisher(helics_output.helics_publication, value)
+
+    def finalize_calculation(self):
+        if self.calculation_cache:
+            LOGGER.info(f"[{self.simulator_configuration.model_id}/{self.helics_value_federate_info.calculation_name}] Memoized results were reused {self.calculation_cache.hits} times and calculated {self.calculation_cache.misses} times")
 
     def finalize_simulation(self):
+        self.finalize_calculation()
         Common.destroy_federate(self.value_federate)
         self.running_status.terminated = True
 
@@ -228,10 +240,10 @@ class HelicsValueFederateExecutor(HelicsFederateExecutor):
         LOGGER.debug(f"[{self.simulator_configuration.model_id}/{self.helics_value_federate_info.calculation_name}] Starting federate")
         self.start_value_federate()
 
-    def _compute_time_step_number(self, time_of_timestep_to_compute):
+    def compute_time_step_number(self, time_of_timestep_to_compute):
         return int(math.floor(time_of_timestep_to_compute / self.helics_value_federate_info.time_period_in_seconds))
 
-    def _init_calculation_params(self):
+    def init_calculation_params(self):
         ret_val = {}
         for esdl_id in self.simulator_configuration.esdl_ids:
             ret_val[esdl_id] = {} 
@@ -242,32 +254,80 @@ class HelicsValueFederateExecutor(HelicsFederateExecutor):
                     ret_val[esdl_id][helics_input.helics_sub_key] = None
         return ret_val
     
-    def _init_input_dict(self):
-        input_dict = {}
-        for input in self.all_inputs:
-            input_dict[input.helics_sub_key] = None
-        return input_dict
+    def init_esdl_ids_per_sub_key(self):
+        self.esdl_ids_per_sub_key = {input.helics_sub_key : [] for input in self.all_inputs}
+        for esdl_id in self.simulator_configuration.esdl_ids:
+            for helics_input in self.input_dict.get(esdl_id, []):
+                self.esdl_ids_per_sub_key.setdefault(helics_input.helics_sub_key, []).append(esdl_id)
+        inputs_keeping_last_value = {(sub.esdl_type, sub.input_name) for sub in self.helics_value_federate_info.inputs if sub.keep_last_value}
+        self.sub_keys_keeping_last_value = {input.helics_sub_key for input in self.all_inputs if (input.esdl_asset_type, input.input_name) in inputs_keeping_last_value}
+
+    def _publish_output_value(self, output : CalculationServiceOutput, value):
+        if CalculationServiceHelperFunctions.is_within_tolerance(value, output.last_published_value, output.absolute_tolerance, output.relative_tolerance):
+            return
+        self.publish_helics_value(output, value)
+        output.last_published_value = value
 
     def _publish_outputs(self, esdl_id, pub_values):
         if len(self.helics_value_federate_info.outputs) > 0:
             outputs = self.output_dict[esdl_id]
             for output in outputs:
                 value_to_publish = pub_values[output.output_name]
-                self.publish_helics_value(output, value_to_publish)
+                self._publish_output_value(output, value_to_publish)
+                if output.record:
+                    self.recorded_data_points.append(esdl_id, output.output_name, self.time_step_timestamp, value_to_publish)
 
-    def _gather_new_inputs(self, calculation_params, input_dict):
+    def _publish_batch_outputs(self, pub_values):
+        if len(self.helics_value_federate_info.outputs) > 0:
+            esdl_ids = self.simulator_configuration.esdl_ids
+            output_names = list(dict.fromkeys(output_description.output_name for output_description in self.helics_value_federate_info.outputs))
+            output_columns = CalculationServiceHelperFunctions.get_batch_output_columns(pub_values, output_names, len(esdl_ids))
+            for i, esdl_id in enumerate(esdl_ids):
+                for output in self.output_dict[esdl_id]:
+                    value_to_publish = output_columns[output.output_name][i]
+                    self._publish_output_value(output, value_to_publish)
+                    if output.record:
+                        self.recorded_data_points.append(esdl_id, output.output_name, self.time_step_timestamp, value_to_publish)
+
+    def _record_outputs(self):
+        if len(self.recorded_data_points) > 0:
+            if self.influx_connector is not None:
+                self.influx_connector.set_time_step_data_points(self.recorded_data_points, self.helics_value_federate_info.calculation_name)
+            self.recorded_data_points = ColumnarPointBuffer()
+
+    def reset_received_inputs(self):
+        self.received_sub_keys = set()
+        self.amount_of_outstanding_inputs = len(self.esdl_ids_per_sub_key) - len(self.kept_input_values)
+
+    def _set_input_value(self, calculation_params, sub_key : str, value):
+        if sub_key not in self.received_sub_keys:
+            self.received_sub_keys.add(sub_key)
+            if sub_key not in self.kept_input_values:
+                self.amount_of_outstanding_inputs -= 1
+        if sub_key in self.sub_keys_keeping_last_value:
+            self.kept_input_values[sub_key] = value
+        for esdl_id in self.esdl_ids_per_sub_key[sub_key]:
+            calculation_params[esdl_id][sub_key] = value
+
+    def _set_kept_input_values(self, calculation_params):
+        for sub_key, value in self.kept_input_values.items():
+            if sub_key not in self.received_sub_keys:
+                for esdl_id in self.esdl_ids_per_sub_key[sub_key]:
+                    calculation_params[esdl_id][sub_key] = value
+
+    def gather_new_inputs(self, calculation_params):
         for input in self.all_inputs:
             new_value = self.get_helics_value(input)
             if new_value != None:
-                input_dict[input.helics_sub_key] = new_value
+                self._set_input_value(calculation_params, input.helics_sub_key, new_value)
+        if self.amount_of_outstanding_inputs == 0:
+            self._set_kept_input_values(calculation_params)
 
-        for esdl_id in self.simulator_configuration.esdl_ids:
-            if esdl_id in self.input_dict.keys():
-                inputs = self.input_dict[esdl_id]
-                for helics_input in inputs:
-                    calculation_params[esdl_id][helics_input.helics_sub_key] = input_dict[helics_input.helics_sub_key]
+    def has_new_inputs(self) -> bool:
+        """Whether all inputs of the time step are complete, when all inputs keep their last value at least one of them has to be updated."""
+        return self.amount_of_outstanding_inputs == 0 and (len(self.received_sub_keys) > 0 or len(self.kept_input_values) == 0)
 
-    def _get_request_time(self, granted_time):
+    def get_request_time(self, granted_time):
         requested_time = 0
         if self.helics_value_federate_info.time_request_type == TimeRequestType.PERIOD:
             if granted_time == 0 and self.helics_value_federate_info.offset > 0:
@@ -280,71 +340,340 @@ class HelicsValueFederateExecutor(HelicsFederateExecutor):
 
     def _gather_all_required_inputs(self, calculation_params : dict, granted_time : h.HelicsTime):
         LOGGER.debug(f"[{h.helicsFederateGetName(self.value_federate)}] Gathering all inputs")
-        input_dict = self._init_input_dict()
-        self._gather_new_inputs(calculation_params, input_dict)
+        self.reset_received_inputs()
+        self.gather_new_inputs(calculation_params)
         new_granted_time = granted_time
         
-        while not CalculationServiceHelperFunctions.dictionary_has_values_for_all_keys(input_dict):
-            LOGGER.debug(f"[{h.helicsFederateGetName(self.value_federate)}] requesting max time again to wait for new inputs")
+        while not self.has_new_inputs():
+            LOGGER.debug(f"[{h.helicsFederateGetName(self.value_federate)}] requesting max time again to wait for {self.amount_of_outstanding_inputs} new inputs")
             new_granted_time = h.helicsFederateRequestTime(self.value_federate, h.HELICS_TIME_MAXTIME)
-            self._gather_new_inputs(calculation_params, input_dict)
+            self.gather_new_inputs(calculation_params)
         return new_granted_time
 
+    def _calculate_for_esdl_id(self, param_dict : dict, simulator_time : datetime, time_step_information : TimeStepInformation, esdl_id : EsdlId):
+        calculation_function = self.helics_value_federate_info.calculation_function
+        if self.calculation_cache is None:
+            return calculation_function(param_dict, simulator_time, time_step_information, esdl_id, self.energy_system)
+        state_key = None
+        if self.helics_value_federate_info.memoization_state_key_function is not None:
+            state_key = self.helics_value_federate_info.memoization_state_key_function(simulator_time, time_step_information, esdl_id, self.energy_system)
+        elif len(self.helics_value_federate_info.inputs) == 0:
+            # without inputs and a state key every time step would reuse the result of the first time step
+            state_key = time_step_information.current_time_step_number
+        cache_key = self.calculation_cache.get_key(esdl_id, param_dict, state_key)
+        return self.calculation_cache.get_or_calculate(cache_key, lambda: calculation_function(param_dict, simulator_time, time_step_information, esdl_id, self.energy_system))
+
+    def _execute_calculation_per_esdl_id(self, calculation_params : dict, simulator_time : datetime, time_step_information : TimeStepInformation, granted_time : h.HelicsTime) -> bool:
+        terminate_requested = False
+        for esdl_id in self.simulator_configuration.esdl_ids:
+            try:
+                if not terminate_requested:
+                    LOGGER.info(f"[{h.helicsFederateGetName(self.value_federate)}] Executing calculation {self.helics_value_federate_info.calculation_name} for esdl_id {esdl_id} at time {granted_time}")
+                    pub_values = self._calculate_for_esdl_id(calculation_params[esdl_id], simulator_time, time_step_information, esdl_id)
+
+                    if dataclasses.is_dataclass(pub_values):
+                        pub_values = dataclasses.asdict(pub_values)
+
+                    LOGGER.info(f"[{h.helicsFederateGetName(self.value_federate)}] Finished calculation {self.helics_value_federate_info.calculation_name} for esdl_id {esdl_id} at time {granted_time}")
+                    self._publish_outputs(esdl_id, pub_values)
+                    calculation_params[esdl_id] = CalculationServiceHelperFunctions.clear_dictionary_values(calculation_params[esdl_id])
+            except Exception:
+                LOGGER.info(f"[{h.helicsFederateGetName(self.value_federate)}] Exception occurred for esdl_id {esdl_id} at time {granted_time} terminating simulation...")
+                traceback.print_exc()
+                terminate_requested = True
+                self.running_status.exception = True
+        return terminate_requested
+
+    def _execute_batch_calculation(self, calculation_params : dict, simulator_time : datetime, time_step_information : TimeStepInformation, granted_time : h.HelicsTime) -> bool:
+        terminate_requested = False
+        esdl_ids = self.simulator_configuration.esdl_ids
+        try:
+            LOGGER.info(f"[{h.helicsFederateGetName(self.value_federate)}] Executing batch calculation {self.helics_value_federate_info.calculation_name} for {len(esdl_ids)} esdl_ids at time {granted_time}")
+            input_names = list(dict.fromkeys(input_description.input_name for input_description in self.helics_value_federate_info.inputs))
+            input_arrays = CalculationServiceHelperFunctions.get_batch_input_arrays(calculation_params, self.input_dict, input_names, esdl_ids)
+            pub_values = self.helics_value_federate_info.calculation_function(input_arrays, simulator_time, time_step_information, esdl_ids, self.energy_system)
+
+            if dataclasses.is_dataclass(pub_values):
+                pub_values = dataclasses.asdict(pub_values)
+
+            LOGGER.info(f"[{h.helicsFederateGetName(self.value_federate)}] Finished batch calculation {self.helics_value_federate_info.calculation_name} at time {granted_time}")
+            self._publish_batch_outputs(pub_values)
+            for esdl_id in esdl_ids:
+                calculation_params[esdl_id] = CalculationServiceHelperFunctions.clear_dictionary_values(calculation_params[esdl_id])
+        except Exception:
+            LOGGER.info(f"[{h.helicsFederateGetName(self.value_federate)}] Exception occurred in batch calculation at time {granted_time} terminating simulation...")
+            traceback.print_exc()
+            terminate_requested = True
+            self.running_status.exception = True
+        return terminate_requested
+
+    def _execute_process_pool_calculation(self, calculation_params : dict, simulator_time : datetime, time_step_information : TimeStepInformation, granted_time : h.HelicsTime) -> bool:
+        terminate_requested = False
+        esdl_ids = self.simulator_configuration.esdl_ids
+        try:
+            LOGGER.info(f"[{h.helicsFederateGetName(self.value_federate)}] Executing calculation {self.helics_value_federate_info.calculation_name} for {len(esdl_ids)} esdl_ids on {self.calculation_process_pool.max_workers} processes at time {granted_time}")
+            pub_values_per_esdl_id = self.calculation_process_pool.calculate(self.helics_value_federate_info.calculation_function, esdl_ids, calculation_params, simulator_time, time_step_information)
+            LOGGER.info(f"[{h.helicsFederateGetName(self.value_federate)}] Finished calculation {self.helics_value_federate_info.calculation_name} at time {granted_time}")
+            for esdl_id, pub_values in zip(esdl_ids, pub_values_per_esdl_id):
+                self._publish_outputs(esdl_id, pub_values)
+                calculation_params[esdl_id] = CalculationServiceHelperFunctions.clear_dictionary_values(calculation_params[esdl_id])
+        except Exception:
+            LOGGER.info(f"[{h.helicsFederateGetName(self.value_federate)}] Exception occurred in process pool calculation at time {granted_time} terminating simulation...")
+            traceback.print_exc()
+            terminate_requested = True
+            self.running_status.exception = True
+        return terminate_requested
+
+    def calculate_time_step(self, calculation_params : dict, time_step_information : TimeStepInformation, granted_time : h.HelicsTime) -> bool:
+        simulator_time = self.simulator_configuration.start_time + timedelta(seconds = granted_time)
+        self.time_step_timestamp = get_epoch_seconds(simulator_time)
+        if self.influx_connector is not None:
+            self.influx_connector.set_calculation_name(self.helics_value_federate_info.calculation_name)
+
+        if self.helics_value_federate_info.calculation_mode == CalculationMode.BATCH:
+            return self._execute_batch_calculation(calculation_params, simulator_time, time_step_information, granted_time)
+        elif self.helics_value_federate_info.calculation_mode == CalculationMode.PROCESS_POOL:
+            return self._execute_process_pool_calculation(calculation_params, simulator_time, time_step_information, granted_time)
+        else:
+            return self._execute_calculation_per_esdl_id(calculation_params, simulator_time, time_step_information, granted_time)
+
+    def finish_time_step(self, time_step_information : TimeStepInformation, granted_time : h.HelicsTime) -> bool:
+        """Work of a time step after its outputs are published, this does not use the federate so it can run while a time request is pending."""
+        terminate_requested = False
+        try:
+            self._record_outputs()
+            post_time_step_function = self.helics_value_federate_info.post_time_step_function
+            if post_time_step_function is not None:
+                simulator_time = self.simulator_configuration.start_time + timedelta(seconds = granted_time)
+                post_time_step_function(simulator_time, time_step_information, self.simulator_configuration.esdl_ids, self.energy_system)
+        except Exception:
+            LOGGER.info(f"[{h.helicsFederateGetName(self.value_federate)}] Exception occurred after time step at time {granted_time} terminating simulation...")
+            traceback.print_exc()
+            terminate_requested = True
+            self.running_status.exception = True
+        return terminate_requested
+
+    def execute_time_step(self, calculation_params : dict, time_step_information : TimeStepInformation, granted_time : h.HelicsTime) -> bool:
+        terminate_requested = self.calculate_time_step(calculation_params, time_step_information, granted_time)
+        return self.finish_time_step(time_step_information, granted_time) or terminate_requested
+
+    def _requests_time_asynchronously(self) -> bool:
+        return self.helics_value_federate_info.asynchronous_time_requests and self.helics_value_federate_info.time_request_type == TimeRequestType.PERIOD and not self.helics_value_federate_info.inputs
+
     def enter_simulation_loop(self):
         LOGGER.info(f"[{h.helicsFederateGetName(self.value_federate)}] Entering HELICS execution mode {self.helics_value_federate_info.calculation_name}")
         h.helicsFederateEnterExecutingMode(self.value_federate)
         LOGGER.info(f"[{h.helicsFederateGetName(self.value_federate)}] Entered HELICS execution mode {self.helics_value_federate_info.calculation_name}")
 
         total_interval = self.simulator_configuration.simulation_duration_in_seconds
-        max_time_step_number = self._compute_time_step_number(total_interval)
+        max_time_step_number = self.compute_time_step_number(total_interval)
         granted_time = 0
         granted_time = self.request_new_granted_time(granted_time)
         terminate_requested = False
-        calculation_params = self._init_calculation_params()
+        calculation_params = self.init_calculation_params()
+        self.init_esdl_ids_per_sub_key()
         while granted_time <= total_interval and not terminate_requested:
 
-            time_step_number = self._compute_time_step_number(granted_time)
+            time_step_number = self.compute_time_step_number(granted_time)
             time_step_information = TimeStepInformation(time_step_number, max_time_step_number)
             granted_time = self._gather_all_required_inputs(calculation_params, granted_time)
-            simulator_time = self.simulator_configuration.start_time + timedelta(seconds = granted_time)
-
-            for esdl_id in self.simulator_configuration.esdl_ids:
-                try:
-                    if not terminate_requested:
-                        LOGGER.info(f"[{h.helicsFederateGetName(self.value_federate)}] Executing calculation {self.helics_value_federate_info.calculation_name} for esdl_id {esdl_id} at time {granted_time}")
-                        pub_values = self.helics_value_federate_info.calculation_function(calculation_params[esdl_id], simulator_time, time_step_information, esdl_id, self.energy_system)
-
-                        if dataclasses.is_dataclass(pub_values):
-                            pub_values = dataclasses.asdict(pub_values)
-
-                        LOGGER.info(f"[{h.helicsFederateGetName(self.value_federate)}] Finished calculation {self.helics_value_federate_info.calculation_name} for esdl_id {esdl_id} at time {granted_time}")
-                        self._publish_outputs(esdl_id, pub_values)
-                        calculation_params[esdl_id] = CalculationServiceHelperFunctions.clear_dictionary_values(calculation_params[esdl_id])
-                except Exception:
-                    LOGGER.info(f"[{h.helicsFederateGetName(self.value_federate)}] Exception occurred for esdl_id {esdl_id} at time {granted_time} terminating simulation...")
-                    traceback.print_exc()
-                    terminate_requested = True
-                    self.running_status.exception = True
-
-            LOGGER.info(f"[{h.helicsFederateGetName(self.value_federate)}] Finished {granted_time} of {total_interval} and terminate requested {terminate_requested}")
-            granted_time = self.request_new_granted_time(granted_time)
+            if self._requests_time_asynchronously():
+                terminate_requested = self.calculate_time_step(calculation_params, time_step_information, granted_time)
+                self.request_new_granted_time_async(granted_time)
+                terminate_requested = self.finish_time_step(time_step_information, granted_time) or terminate_requested
+                LOGGER.info(f"[{h.helicsFederateGetName(self.value_federate)}] Finished {granted_time} of {total_interval} and terminate requested {terminate_requested}")
+                granted_time = self.complete_time_request()
+            else:
+                terminate_requested = self.execute_time_step(calculation_params, time_step_information, granted_time)
+                LOGGER.info(f"[{h.helicsFederateGetName(self.value_federate)}] Finished {granted_time} of {total_interval} and terminate requested {terminate_requested}")
+                granted_time = self.request_new_granted_time(granted_time)
 
         LOGGER.info(f"[{h.helicsFederateGetName(self.value_federate)}] Finalizing federate at {granted_time} of {total_interval} and terminate requested {terminate_requested}")
 
     def request_new_granted_time(self, granted_time):
-        time_to_request = self._get_request_time(granted_time)
+        time_to_request = self.get_request_time(granted_time)
         LOGGER.debug(f"[{h.helicsFederateGetName(self.value_federate)}] Requesting time: {time_to_request} for calculation {self.helics_value_federate_info.calculation_name}")
         granted_time = h.helicsFederateRequestTime(self.value_federate, time_to_request)
         LOGGER.debug(f"[{h.helicsFederateGetName(self.value_federate)}] Time granted: {granted_time} for calculation {self.helics_value_federate_info.calculation_name}")
         return granted_time
 
+    def request_new_granted_time_async(self, granted_time):
+        time_to_request = self.get_request_time(granted_time)
+        LOGGER.debug(f"[{h.helicsFederateGetName(self.value_federate)}] Requesting time asynchronously: {time_to_request} for calculation {self.helics_value_federate_info.calculation_name}")
+        h.helicsFederateRequestTimeAsync(self.value_federate, time_to_request)
+
+    def complete_time_request(self):
+        granted_time = h.helicsFederateRequestTimeComplete(self.value_federate)
+        LOGGER.debug(f"[{h.helicsFederateGetName(self.value_federate)}] Time granted: {granted_time} for calculation {self.helics_value_federate_info.calculation_name}")
+        return granted_time
+
+class HelicsMultiplexedValueFederateExecutor(HelicsFederateExecutor):
+    """
+    Hosts all calculations of a calculation service in a single value federate. Instead of a federate per calculation
+    that negotiates time with the broker on its own, an internal scheduler requests the earliest next event time of
+    the calculations and dispatches to the calculations that are due at the granted time:
+
+    - A calculation without inputs is due at its offset and every period after that.
+    - A calculation with inputs is due as soon as all its inputs have received a new value, the inputs may be received
+      over multiple time grants.
+
+    Every calculation registers its own inputs and outputs in the shared federate, so a calculation sees the same
+    inputs as it would in its own federate.
+    """
+
+    FEDERATE_NAME = "calculations"
+
+    def __init__(self, calculations : List[HelicsValueFederateExecutor], simulator_configuration : SimulatorConfiguration):
+        self.simulator_configuration = simulator_configuration
+        self.calculations = calculations
+        self.value_federate : h.HelicsValueFederate = None
+        self.running_status = RunningStatus()
+
+    def init_multiplexed_federate_info(self):
+        """The federate info that is valid for every calculation: the federate is only uninterruptible when all calculations are,
+        its time delta is the smallest time delta of the calculations and its offset the smallest offset of the calculations
+        without inputs, the scheduler makes sure every calculation is only executed at its own times."""
+        federate_info = self.init_value_federate_info()
+        infos = [calculation.helics_value_federate_info for calculation in self.calculations]
+        h.helicsFederateInfoSetFlagOption(federate_info, h.HelicsFederateFlag.WAIT_FOR_CURRENT_TIME_UPDATE, any(info.wait_for_current_time_update for info in infos))
+        h.helicsFederateInfoSetFlagOption(federate_info, h.HelicsFlag.TERMINATE_ON_ERROR, any(info.terminate_on_error for info in infos))
+        h.helicsFederateInfoSetFlagOption(federate_info, h.HelicsFederateFlag.UNINTERRUPTIBLE, all(info.uninterruptible for info in infos))
+        h.helicsFederateInfoSetTimeProperty(federate_info, h.HelicsProperty.TIME_PERIOD, self._get_federate_time_period())
+        h.helicsFederateInfoSetTimeProperty(federate_info, h.HelicsProperty.TIME_DELTA, min(info.time_delta for info in infos))
+        h.helicsFederateInfoSetTimeProperty(federate_info, h.HelicsProperty.TIME_OFFSET, min((info.offset for info in infos if info.time_request_type == TimeRequestType.PERIOD), default=0))
+        return federate_info
+
+    def _get_federate_time_period(self) -> float:
+        """The greatest common divisor of the periods and offsets of the calculations, a federate with calculations that
+        are triggered by inputs or with non integer periods has no period."""
+        infos = [calculation.helics_value_federate_info for calculation in self.calculations]
+        if any(info.time_request_type == TimeRequestType.ON_INPUT for info in infos):
+            return 0
+        times = [info.time_period_in_seconds for info in infos] + [info.offset for info in infos]
+        if any(time != int(time) for time in times):
+            return 0
+        return math.gcd(*[int(time) for time in times])
+
+    def init_federate(self, esdl_helper : EsdlHelper):
+        LOGGER.debug(f"[{self.simulator_configuration.model_id}/{self.FEDERATE_NAME}] Creating HELICS value federate for {len(self.calculations)} calculations")
+        federate_info = self.init_multiplexed_federate_info()
+        self.value_federate = h.helicsCreateValueFederate(f"{self.simulator_configuration.model_id}/{self.FEDERATE_NAME}", federate_info)
+        for calculation in self.calculations:
+            calculation.init_calculation(esdl_helper, self.value_federate)
+
+    def initialize_and_start_federate(self, esdl_helper : EsdlHelper):
+        self.init_federate(esdl_helper)
+        self.enter_simulation_loop()
+        self.finalize_simulation()
+
+    def finalize_simulation(self):
+        for calculation in self.calculations:
+            calculation.finalize_calculation()
+        Common.destroy_federate(self.value_federate)
+        for calculation in self.calculations:
+            calculation.running_status.terminated = True
+        self.running_status.terminated = True
+
+    def _is_due(self, calculation : HelicsValueFederateExecutor, calculation_params : dict, next_calculation_time : float, granted_time : h.HelicsTime) -> bool:
+        if calculation.helics_value_federate_info.time_request_type == TimeRequestType.ON_INPUT:
+            calculation.gather_new_inputs(calculation_params)
+            return calculation.has_new_inputs()
+        return granted_time >= next_calculation_time
+
+    def enter_simulation_loop(self):
+        LOGGER.info(f"[{h.helicsFederateGetName(self.value_federate)}] Entering HELICS execution mode for {len(self.calculations)} calculations")
+        h.helicsFederateEnterExecutingMode(self.value_federate)
+
+        total_interval = self.simulator_configuration.simulation_duration_in_seconds
+        calculation_params = []
+        next_calculation_times = []
+        for calculation in self.calculations:
+            calculation_params.append(calculation.init_calculation_params())
+            calculation.init_esdl_ids_per_sub_key()
+            calculation.reset_received_inputs()
+            next_calculation_times.append(calculation.get_request_time(0))
+
+        granted_time = 0
+        terminate_requested = False
+        time_to_request = self._get_time_to_request(next_calculation_times)
+        while time_to_request is not None and not terminate_requested:
+            granted_time = self.request_new_granted_time(time_to_request)
+            if self._is_after_simulation(granted_time):
+                break
+            for i, calculation in enumerate(self.calculations):
+                if terminate_requested or not self._is_due(calculation, calculation_params[i], next_calculation_times[i], granted_time):
+                    continue
+                max_time_step_number = calculation.compute_time_step_number(total_interval)
+                time_step_information = TimeStepInformation(calculation.compute_time_step_number(granted_time), max_time_step_number)
+                terminate_requested = calculation.execute_time_step(calculation_params[i], time_step_information, granted_time)
+                calculation.reset_received_inputs()
+                next_calculation_times[i] = calculation.get_request_time(granted_time)
+
+            LOGGER.info(f"[{h.helicsFederateGetName(self.value_federate)}] Finished {granted_time} of {total_interval} and terminate requested {terminate_requested}")
+            time_to_request = self._get_time_to_request(next_calculation_times)
+
+        LOGGER.info(f"[{h.helicsFederateGetName(self.value_federate)}] Finalizing federate at {granted_time} of {total_interval} and terminate requested {terminate_requested}")
+
+    def _is_after_simulation(self, granted_time : h.HelicsTime) -> bool:
+        """Values that are published at the end of the simulation are received one time delta later, at least the resolution
+        of HELICS time, so calculations with inputs are still executed at that time but not after it."""
+        time_delta = min(calculation.helics_value_federate_info.time_delta for calculation in self.calculations)
+        last_time = self.simulator_configuration.simulation_duration_in_seconds + max(time_delta, h.HELICS_TIME_EPSILON)
+        return granted_time - last_time > h.HELICS_TIME_EPSILON / 2
+
+    def _get_time_to_request(self, next_calculation_times : List[float]) -> float:
+        """Returns the earliest time a calculation without inputs is due within the simulation, the maximum time when only
+        calculations with inputs are left and None when no calculation will be due anymore."""
+        total_interval = self.simulator_configuration.simulation_duration_in_seconds
+        scheduled_times = [next_calculation_time for next_calculation_time in next_calculation_times if next_calculation_time <= total_interval]
+        if len(scheduled_times) > 0:
+            return min(scheduled_times)
+        if any(calculation.helics_value_federate_info.time_request_type == TimeRequestType.ON_INPUT for calculation in self.calculations):
+            return h.HELICS_TIME_MAXTIME
+        return None
+
+    def request_new_granted_time(self, time_to_request):
+        LOGGER.debug(f"[{h.helicsFederateGetName(self.value_federate)}] Requesting time: {time_to_request}")
+        granted_time = h.helicsFederateRequestTime(self.value_federate, time_to_request)
+        LOGGER.debug(f"[{h.helicsFederateGetName(self.value_federate)}] Time granted: {granted_time}")
+        return granted_time
+
 class HelicsSimulationExecutor:
 
     def __init__(self):
         self.simulator_configuration = CalculationServiceHelperFunctions.get_simulator_configuration_from_environment()
         self.calculations: List[HelicsValueFederateExecutor] = []
         self.energy_system = None
-        self.influx_connector = InfluxDBConnector(self.simulator_configuration.influx_host, self.simulator_configuration.influx_port, self.simulator_configuration.influx_username, self.simulator_configuration.influx_password, self.simulator_configuration.influx_database_name)
+        self.esdl_helper : EsdlHelper = None
+        self.esdl_profiles : EsdlProfileStore = None
+        self.helics_core : h.HelicsCore = None
+        self.calculation_process_pool : CalculationProcessPool = None
+        self.influx_connector : ResultSink = self._create_result_sink()
+
+    def _create_result_sink(self) -> ResultSink:
+        simulator_configuration = self.simulator_configuration
+        if simulator_configuration.result_sink_type == ResultSinkType.PARQUET:
+            return ParquetConnector(
+                output_directory=simulator_configuration.result_output_directory,
+                write_queue_size=simulator_configuration.influx_write_queue_size,
+                write_queue_timeout=simulator_configuration.influx_write_queue_timeout,
+                chunk_size=simulator_configuration.parquet_chunk_size,
+            )
+        return InfluxDBConnector(
+            influx_host=simulator_configuration.influx_host,
+            influx_port=simulator_configuration.influx_port,
+            influx_user=simulator_configuration.influx_username,
+            influx_password=simulator_configuration.influx_password,
+            influx_database_name=simulator_configuration.influx_database_name,
+            write_queue_size=simulator_configuration.influx_write_queue_size,
+            write_queue_timeout=simulator_configuration.influx_write_queue_timeout,
+            spill_directory=simulator_configuration.influx_spill_directory,
+            spill_threshold_bytes=simulator_configuration.influx_spill_threshold_bytes,
+            chunk_size=simulator_configuration.influx_chunk_size,
+            gzip_compression_level=simulator_configuration.influx_gzip_compression_level,
+            health_check_interval=simulator_configuration.influx_health_check_interval,
+            recover_spilled_chunks=simulator_configuration.influx_recover_spilled_chunks,
+        )
 
     def add_calculation(self, info : HelicsCalculationInformation):
         if info.inputs == None:
@@ -355,15 +684,30 @@ class HelicsSimulationExecutor:
         if len(info.inputs) > 0:
             info.time_request_type = TimeRequestType.ON_INPUT
             info.federate_time_period = 0
+        self._validate_inputs_of_deadband_outputs([calculation.helics_value_federate_info for calculation in self.calculations] + [info])
         self.calculations.append(HelicsValueFederateExecutor(info))
 
+    def _validate_inputs_of_deadband_outputs(self, infos : List[HelicsCalculationInformation]):
+        # a subscriber of an output with a deadband only receives the changed values, without keeping the last value it would wait forever
+        deadband_outputs = {(output.esdl_type, output.output_name) : info.calculation_name
+                            for info in infos
+                            for output in info.outputs
+                            if output.absolute_tolerance is not None or output.relative_tolerance is not None}
+        if len(deadband_outputs) == 0:
+            return
+        for info in infos:
+            for sub in info.inputs:
+                if not sub.keep_last_value and (sub.esdl_type, sub.input_name) in deadband_outputs:
+                    raise ValueError(f"Input {sub.input_name} of calculation {info.calculation_name} is published with a deadband by calculation {deadband_outputs[(sub.esdl_type, sub.input_name)]}, declare it with keep_last_value=True")
+
     def _create_initialization_federate_executor(self):
         esdl_message_federate = HelicsInitializationMessagesFederateExecutor(HelicsInitMessagesFederateInformation('esdl', f'{self.simulator_configuration.model_id}'))
         esdl_message_federate.init_federate()
         return esdl_message_federate
     
     def _send_amount_of_calculations(self, init_federate_executor : HelicsInitializationMessagesFederateExecutor):
-        amount_of_calculations = len(self.calculations)
+        # the broker waits for a federate per calculation, when multiplexed all calculations share a single federate
+        amount_of_calculations = 1 if self.simulator_configuration.multiplex_calculations else len(self.calculations)
         TIME_TO_REQUEST = 1.0
         init_federate_executor.send_amount_of_calculations(amount_of_calculations, TIME_TO_REQUEST)
 
@@ -373,9 +717,39 @@ class HelicsSimulationExecutor:
 
     def _init_influxdb(self, esdl_helper : EsdlHelper):
         esdl_objects = esdl_helper.esdl_object_mapping
-        self.influx_connector.init_profile_output_data(self.simulator_configuration.simulation_id, self.simulator_configuration.model_id, self.simulator_configuration.esdl_type, esdl_objects)
+        self.influx_connector.init_profile_output_data(self.simulator_configuration.simulation_id, self.simulator_configuration.model_id, self.simulator_configuration.esdl_type, esdl_objects, self.simulator_configuration.esdl_ids)
+        for calculation in self.calculations:
+            for output in calculation.helics_value_federate_info.outputs or []:
+                if output.recording_policy is not None:
+                    self.influx_connector.set_recording_policy(output.output_name, output.recording_policy, calculation.helics_value_federate_info.calculation_name)
         self.influx_connector.connect()
 
+    def _load_esdl_profiles(self, esdl_helper : EsdlHelper):
+        simulator_configuration = self.simulator_configuration
+        resolution_in_seconds = simulator_configuration.profile_resolution_in_seconds
+        if resolution_in_seconds is None:
+            resolution_in_seconds = min((calculation.helics_value_federate_info.time_period_in_seconds for calculation in self.calculations), default=900)
+        profile_cache = ProfileCache(simulator_configuration.profile_cache_directory) if simulator_configuration.profile_cache_directory else None
+        self.esdl_profiles = EsdlProfileStore(simulator_configuration.start_time, simulator_configuration.simulation_duration_in_seconds, resolution_in_seconds, simulator_configuration.influx_username, simulator_configuration.influx_password, profile_cache)
+        try:
+            influxdb_profiles = esdl_helper.get_influxdb_profile_references(simulator_configuration.esdl_ids)
+            if influxdb_profiles:
+                self.esdl_profiles.load(influxdb_profiles)
+        except Exception:
+            LOGGER.error("Failed to load the InfluxDB profiles of the esdl objects, continuing without profiles")
+            traceback.print_exc()
+
+    def _init_calculation_process_pool(self, esdl_helper : EsdlHelper):
+        # all process pool calculations of the calculation service share a single pool of worker processes
+        process_pool_calculations = [calculation for calculation in self.calculations if calculation.helics_value_federate_info.calculation_mode == CalculationMode.PROCESS_POOL]
+        if len(process_pool_calculations) == 0:
+            return
+        process_pool_sizes = [calculation.helics_value_federate_info.process_pool_size for calculation in process_pool_calculations if calculation.helics_value_federate_info.process_pool_size]
+        LOGGER.debug(f"[{self.simulator_configuration.model_id}] Starting calculation process pool for {len(process_pool_calculations)} calculations")
+        self.calculation_process_pool = CalculationProcessPool(esdl_helper.get_esdl_bytes(), max(process_pool_sizes, default=None))
+        for calculation in process_pool_calculations:
+            calculation.calculation_process_pool = self.calculation_process_pool
+
     def init_calculation_service(self, energy_system : esdl.EnergySystem):
         pass
 
@@ -384,6 +758,8 @@ class HelicsSimulationExecutor:
         self._send_amount_of_calculations(init_federate_executor)
         esdl_helper = self._get_esdl_from_so(init_federate_executor)
         self._init_influxdb(esdl_helper)
+        self._load_esdl_profiles(esdl_helper)
+        self.esdl_helper = esdl_helper
         self.init_calculation_service(esdl_helper.energy_system)
         return esdl_helper
     
@@ -396,19 +772,79 @@ class HelicsSimulationExecutor:
     def start_simulation(self):
         self._assert_that_periods_of_calculation_are_smaller_than_simulation_duration()
         esdl_helper = self.init_simulation()
-        self.exe = ThreadPoolExecutor(len(self.calculations))
         for calculation in self.calculations:
-            self.exe.submit(calculation.initialize_and_start_federate, esdl_helper)
-
-    def stop_simulation(self):
-
-        while not all(calculation.running_status.terminated for calculation in self.calculations):
-            time.sleep(1)
+            calculation.simulator_configuration = self.simulator_configuration
+            calculation.influx_connector = self.influx_connector
+        self._init_calculation_process_pool(esdl_helper)
+        if self.simulator_configuration.share_helics_core:
+            amount_of_federates = 1 if self.simulator_configuration.multiplex_calculations else len(self.calculations)
+            self.helics_core = create_shared_core(self.simulator_configuration, amount_of_federates)
+        if self.simulator_configuration.multiplex_calculations:
+            self.exe = ThreadPoolExecutor(1)
+            multiplexed_federate_executor = HelicsMultiplexedValueFederateExecutor(self.calculations, self.simulator_configuration)
+            completion_future = self.exe.submit(self._run_federate, multiplexed_federate_executor, self.calculations, esdl_helper)
+            for calculation in self.calculations:
+                calculation.completion_future = completion_future
+        else:
+            self.exe = ThreadPoolExecutor(len(self.calculations))
+            for calculation in self.calculations:
+                calculation.completion_future = self.exe.submit(self._run_federate, calculation, [calculation], esdl_helper)
+
+    def _run_federate(self, federate_executor : HelicsValueFederateExecutor | HelicsMultiplexedValueFederateExecutor, calculations : List[HelicsValueFederateExecutor], esdl_helper : EsdlHelper):
+        try:
+            federate_executor.initialize_and_start_federate(esdl_helper)
+        except Exception:
+            calculation_names = ", ".join(calculation.helics_value_federate_info.calculation_name for calculation in calculations)
+            LOGGER.error(f"[{self.simulator_configuration.model_id}] Federate thread of calculations {calculation_names} failed: {traceback.format_exc()}")
+            for calculation in calculations:
+                calculation.running_status.exception = True
+                calculation.running_status.terminated = True
+            raise
+
+    def wait_for_completion(self, timeout : float = None) -> bool:
+        """
+        Waits until the federates of all calculations have finished, successfully or not.
+
+        **Parameters**
+
+        - **`timeout`** - Maximum amount of seconds to wait, None waits until all federates have finished.
+
+        Returns True when all federates have finished and False when the timeout expired first.
+        """
+        _, not_done = wait([calculation.completion_future for calculation in self.calculations if calculation.completion_future is not None], timeout)
+        return len(not_done) == 0
+
+    def get_unfinished_calculations(self) -> List[HelicsValueFederateExecutor]:
+        return [calculation for calculation in self.calculations if calculation.completion_future is not None and not calculation.completion_future.done()]
+
+    def stop_simulation(self, timeout : float = None):
+        """
+        Waits until the federates of all calculations have finished and writes the remaining outputs.
+
+        **Parameters**
+
+        - **`timeout`** - Maximum amount of seconds to wait for the federates, None waits until all federates have finished. The outputs
+        are written when the timeout expires as well, after that a TimeoutError with the calculations that did not finish is raised.
+        """
+        unfinished_calculation_names = []
+        if not self.wait_for_completion(timeout):
+            unfinished_calculation_names = [calculation.helics_value_federate_info.calculation_name for calculation in self.get_unfinished_calculations()]
+            LOGGER.error(f"Calculations {unfinished_calculation_names} of calculation service {self.simulator_configuration.model_id} did not finish within {timeout} seconds")
 
         self.exe.shutdown(wait=False)
+        if self.calculation_process_pool is not None:
+            self.calculation_process_pool.shutdown(wait=len(unfinished_calculation_names) == 0)
+            self.calculation_process_pool = None
+        if self.helics_core is not None:
+            h.helicsCoreFree(self.helics_core)
+            self.helics_core = None
 
         LOGGER.debug(f"Writing data to influx for calculation service {self.simulator_configuration.model_id}")
         self.influx_connector.write_output()
+        self.influx_connector.stop_writer()
         if any(calculation.running_status.exception for calculation in self.calculations):
-            failed_calulation = next((calculation for calculation in self.calculations if calculation.running_status.exception == True), None)
-            raise RuntimeError(f"Calculation service had an exception calculation: {failed_calulation.helics_value_federate_info.calculation_name} failed")
\ No newline at end of file
+            failed_calculation = next((calculation for calculation in self.calculations if calculation.running_status.exception == True), None)
+            failed_calculation_exception = failed_calculation.completion_future.exception() if failed_calculation.completion_future.done() else None
+            raise RuntimeError(f"Calculation service had an exception calculation: {failed_calculation.helics_value_federate_info.calculation_name} failed") from failed_calculation_exception
+        if unfinished_calculation_names:
+            raise TimeoutError(f"Calculations {unfinished_calculation_names} did not finish within {timeout} seconds")
\ No newline at end of file
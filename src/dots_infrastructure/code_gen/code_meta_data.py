@@ -19,6 +19,7 @@ class CalculationServiceOutputData(DataClassJsonMixin):
     description : str
     unit : str
     data_type : str
+    record : bool = False
     python_data_type : str | None = None
     python_name : str | None = None
 
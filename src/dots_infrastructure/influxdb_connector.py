@@ -12,19 +12,162 @@
 #  Manager:
 #      TNO
 
+from contextlib import closing
+import gzip
+import json
+import time
 import typing
 
-from datetime import datetime
+from numbers import Real
 from dots_infrastructure.DataClasses import EsdlId
 from dots_infrastructure.Logger import LOGGER
+from dots_infrastructure.result_sink import ColumnarPointBuffer, ResultSink
+from dots_infrastructure.spill_buffer import SpillBuffer
 from influxdb import InfluxDBClient
+from influxdb.exceptions import InfluxDBClientError
+import numpy as np
 
 from esdl import esdl
 
+EPOCH_TO_DATETIME64_UNIT = {"h": "h", "m": "m", "s": "s", "ms": "ms", "u": "us", "ns": "ns"}
 
 
-class InfluxDBConnector:
-    """A connector writes data to an InfluxDB database."""
+def escape_tag(tag) -> str:
+    return str(tag).replace("\\", "\\\\").replace(" ", "\\ ").replace(",", "\\,").replace("=", "\\=").replace("\n", "\\n")
+
+def is_supported_field_value(value) -> bool:
+    """Returns whether the value can be written as an influx field: None, text, bytes, a boolean or a number."""
+    if value is None or isinstance(value, (str, bytes, bool, np.bool_, Real)):
+        return True
+    try:
+        float(value)
+        return True
+    except (TypeError, ValueError):
+        return False
+
+def format_field_value(value) -> str:
+    """Renders a field value like influxdb.line_protocol does, raises a TypeError for values that are not supported."""
+    if value is None:
+        return ""
+    if isinstance(value, bytes):
+        value = value.decode("utf-8")
+    if isinstance(value, str):
+        return '"{}"'.format(value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n"))
+    if isinstance(value, (bool, np.bool_)):
+        return str(bool(value))
+    if isinstance(value, int):
+        return f"{value}i"
+    if isinstance(value, Real):
+        return repr(float(value))
+    try:
+        return repr(float(value))
+    except (TypeError, ValueError):
+        raise TypeError(f"Unsupported influx field value of type {type(value).__name__}: {value!r}")
+
+
+def to_line_protocol(data_points: ColumnarPointBuffer, get_line_prefix: typing.Callable[[EsdlId], str]) -> bytes:
+    """Serializes the data points to influx line protocol with second precision, the outputs of an
+    esdl id with the same timestamp are merged into a single point with a field per output.
+
+    **Parameters**
+
+    - **`data_points`** - Data points to serialize.
+    - **`get_line_prefix`** - Returns the escaped measurement and tags of an esdl id.
+    """
+    field_keys = {}
+    fields_per_point : dict[tuple[EsdlId, int], dict[str, str]] = {}
+    for esdl_id, output_name, timestamp, value in zip(data_points.esdl_ids, data_points.output_names, data_points.timestamps, data_points.values):
+        field_value = format_field_value(value)
+        if field_value == "":
+            continue
+        field_key = field_keys.get(output_name)
+        if field_key is None:
+            field_key = field_keys[output_name] = escape_tag(output_name)
+        point_fields = fields_per_point.get((esdl_id, timestamp))
+        if point_fields is None:
+            point_fields = fields_per_point[(esdl_id, timestamp)] = {}
+        point_fields[field_key] = field_value
+
+    line_prefixes = {}
+    lines = []
+    for (esdl_id, timestamp), point_fields in fields_per_point.items():
+        line_prefix = line_prefixes.get(esdl_id)
+        if line_prefix is None:
+            line_prefix = line_prefixes[esdl_id] = get_line_prefix(esdl_id)
+        rendered_fields = ",".join([f"{field_key}={field_value}" for field_key, field_value in point_fields.items()])
+        lines.append(f"{line_prefix} {rendered_fields} {timestamp}\n")
+    return "".join(lines).encode("utf-8")
+
+
+class QuerySeries:
+    """The values of a (chunk of a) series of a query result with a numpy array per column, the time column
+    holds datetime64 values, numeric columns float64 values with NaN for missing values and other columns objects."""
+
+    def __init__(self, name: str, tags: typing.Optional[dict], columns: dict[str, np.ndarray], statement_id: int = 0):
+        self.name = name
+        self.tags = tags
+        self.columns = columns
+        self.statement_id = statement_id
+
+    def __len__(self):
+        return len(self.columns["time"]) if "time" in self.columns else 0
+
+
+def to_column_array(column_values: typing.Sequence) -> np.ndarray:
+    try:
+        return np.array(column_values, dtype=np.float64)
+    except (TypeError, ValueError):
+        return np.array(column_values, dtype=object)
+
+
+def concatenate_column_chunks(chunks: typing.List[np.ndarray]) -> np.ndarray:
+    if len(chunks) == 1:
+        return chunks[0]
+    if any(chunk.dtype != chunks[0].dtype for chunk in chunks):
+        chunks = [chunk.astype(object) for chunk in chunks]
+    return np.concatenate(chunks)
+
+
+def parse_series_chunk(series: dict, datetime64_unit: str, statement_id: int = 0) -> QuerySeries:
+    """Converts a series of an influx query response with epoch timestamps to a QuerySeries, column by column."""
+    column_names = series["columns"]
+    rows = series.get("values", [])
+    column_values = list(zip(*rows)) if rows else [() for _ in column_names]
+    columns = {}
+    for column_name, values in zip(column_names, column_values):
+        if column_name == "time":
+            columns[column_name] = np.array(values, dtype=np.int64).astype(f"datetime64[{datetime64_unit}]")
+        else:
+            columns[column_name] = to_column_array(values)
+    return QuerySeries(series["name"], series.get("tags"), columns, statement_id)
+
+
+RETRYABLE_CLIENT_ERROR_CODES = [408, 429]
+
+def is_rejected_write(error: Exception) -> bool:
+    """Returns whether influx db permanently rejected a write (a 4xx response, e.g. malformed line protocol or a field
+    type conflict), which fails again when it is retried. Connection errors, timeouts and 5xx responses are retryable."""
+    return isinstance(error, InfluxDBClientError) and isinstance(error.code, int) and 400 <= error.code < 500 and error.code not in RETRYABLE_CLIENT_ERROR_CODES
+
+class InfluxDBConnector(ResultSink):
+    """A connector writes data to an InfluxDB database.
+
+    Chunks that can not be written, because InfluxDB is slow or unreachable, are kept in a spill buffer that
+    holds at most spill_threshold_bytes in memory and appends the rest to segment files in the spill directory.
+    The spilled chunks are replayed in order with exponential backoff until InfluxDB accepts them again, new
+    chunks are spilled as well as long as older chunks are pending so the order of the writes is kept. With
+    recover_spilled_chunks the segments that an earlier run left in the spill directory are replayed first.
+    Chunks that influx db rejects with a 4xx response are logged and dropped instead of retried.
+
+
+    The connector keeps a single client, and with that a single keep-alive http session, for its lifetime. Before
+    a write the client is pinged when the last health check is more than health_check_interval seconds ago or a
+    write failed, a client that does not respond is replaced. Write requests are gzip compressed with
+    gzip_compression_level, 0 sends them uncompressed.
+    """
+
+    RETRY_BACKOFF_INITIAL_SECONDS = 1.0
+    RETRY_BACKOFF_MAX_SECONDS = 60.0
 
     def __init__(
         self,
@@ -33,24 +176,39 @@ class InfluxDBConnector:
         influx_user: str,
         influx_password: str,
         influx_database_name: str,
+        write_queue_size: int = 16,
+        write_queue_timeout: typing.Optional[float] = None,
+        spill_directory: typing.Optional[str] = None,
+        spill_threshold_bytes: int = 64 * 1024 * 1024,
+        chunk_size: typing.Optional[int] = None,
+        gzip_compression_level: int = 1,
+        health_check_interval: float = 30.0,
+        recover_spilled_chunks: bool = False,
     ):
+        super().__init__(write_queue_size, write_queue_timeout, chunk_size)
         self.influx_host: str = influx_host.split("//")[-1]
         self.influx_port: str = influx_port
         self.influx_database_name: str = influx_database_name
         self.influx_user: str = influx_user
         self.influx_password: str = influx_password
+        self.gzip_compression_level = gzip_compression_level
+        self.health_check_interval = health_check_interval
 
         LOGGER.debug("influx server: {}".format(self.influx_host))
         LOGGER.debug("influx port: {}".format(self.influx_port))
         LOGGER.debug("influx database: {}".format(self.influx_database_name))
 
         self.client: typing.Optional[InfluxDBClient] = None
-        self.simulation_id: typing.Optional[str] = None
-        self.model_id: typing.Optional[str] = None
-        self.esdl_type: typing.Optional[str] = None
-        self.esdl_objects: typing.Optional[dict[EsdlId, esdl]] = None
+        self.line_prefixes: dict[EsdlId, str] = {}
+        self.spill_buffer = SpillBuffer(spill_directory, spill_threshold_bytes, recover_existing_segments=recover_spilled_chunks)
+        self.retry_backoff_seconds = 0.0
+        self.next_retry_time = 0.0
+        self.next_health_check_time = 0.0
+        self.rejected_chunks = 0
 
     def connect(self) -> InfluxDBClient:
+        """Creates the client of this connector and checks the connection with a ping, returns None when InfluxDB can not be reached."""
+        self.close()
         client = None
         try:
             LOGGER.debug("Connecting InfluxDBClient")
@@ -63,32 +221,126 @@ class InfluxDBConnector:
             )
             LOGGER.debug("InfluxDBClient ping: {}".format(client.ping()))
         except Exception as e:
-            LOGGER.debug("Failed to connect to influx db: {}".format(e))
+            LOGGER.warning("Failed to connect to influx db at {}:{}: {}".format(self.influx_host, self.influx_port, e))
             if client:
                 client.close()
+            client = None
+        self.client = client
         return client
 
-    def query(self, query):
+    def get_client(self) -> InfluxDBClient:
+        """Returns the client of this connector, the client is (re)connected when it is missing or fails its health check."""
+        if self.client is not None and time.monotonic() >= self.next_health_check_time:
+            try:
+                self.client.ping()
+                self.next_health_check_time = time.monotonic() + self.health_check_interval
+            except Exception as e:
+                LOGGER.warning("Influx db health check failed, reconnecting: {}".format(e))
+                self.close()
         if self.client is None:
             self.client = self.connect()
+            if self.client is None:
+                raise ConnectionError(f"No connection to influx db at {self.influx_host}:{self.influx_port}")
+            self.next_health_check_time = time.monotonic() + self.health_check_interval
+        return self.client
 
-        return self.client.query(query)
+    def query(self, query):
+        return self.get_client().query(query)
+
+    def iter_query_chunks(self, query: str, chunk_size: int = 10000, epoch: str = "s") -> typing.Iterator[QuerySeries]:
+        """Streams the result of a query in chunks of at most chunk_size rows per series, only a single chunk
+        is parsed at a time so memory use does not depend on the size of the result.
+
+        **Parameters**
+
+        - **`query`** - The InfluxQL query, multiple statements are separated by semicolons.
+        - **`chunk_size`** - Maximum amount of rows in a chunk, as returned by InfluxDB.
+        - **`epoch`** - Precision of the timestamps, one of h, m, s, ms, u or ns.
+        """
+        datetime64_unit = EPOCH_TO_DATETIME64_UNIT[epoch]
+        response = self.get_client().request(
+            url="query",
+            method="GET",
+            params={"q": query, "db": self.influx_database_name, "epoch": epoch, "chunked": "true", "chunk_size": chunk_size},
+            stream=True,
+            expected_response_code=200,
+        )
+        with closing(response):
+            for line in response.iter_lines():
+                if not line:
+                    continue
+                response_chunk = json.loads(line)
+                if "error" in response_chunk:
+                    raise InfluxDBClientError(response_chunk["error"])
+                for result in response_chunk.get("results", []):
+                    if "error" in result:
+                        raise InfluxDBClientError(result["error"])
+                    for series in result.get("series", []):
+                        yield parse_series_chunk(series, datetime64_unit, result.get("statement_id", 0))
+
+    def query_arrays(self, query: str, chunk_size: int = 10000, epoch: str = "s") -> typing.List[QuerySeries]:
+        """Returns the result of a query as a QuerySeries per series, the chunks are streamed and concatenated
+        per column so the rows of the result are never held as Python objects."""
+        column_chunks_per_series: dict[str, typing.Tuple[QuerySeries, dict[str, typing.List[np.ndarray]]]] = {}
+        for series_chunk in self.iter_query_chunks(query, chunk_size, epoch):
+            series_key = json.dumps([series_chunk.statement_id, series_chunk.name, series_chunk.tags], sort_keys=True)
+            if series_key not in column_chunks_per_series:
+                column_chunks_per_series[series_key] = (series_chunk, {column_name : [] for column_name in series_chunk.columns})
+            column_chunks = column_chunks_per_series[series_key][1]
+            for column_name, column_values in series_chunk.columns.items():
+                column_chunks.setdefault(column_name, []).append(column_values)
+
+        query_series = []
+        for first_series_chunk, column_chunks in column_chunks_per_series.values():
+            columns = {column_name : concatenate_column_chunks(chunks) for column_name, chunks in column_chunks.items()}
+            query_series.append(QuerySeries(first_series_chunk.name, first_series_chunk.tags, columns, first_series_chunk.statement_id))
+        return query_series
+
+    def query_dataframe(self, query: str, chunk_size: int = 10000, epoch: str = "s"):
+        """Returns the result of a query as a pandas DataFrame indexed by time, with the series name in the
+        measurement column and a column per tag when the query groups by tags. Requires pandas, which is
+        imported on first use."""
+        try:
+            import pandas as pd
+        except ImportError:
+            raise ImportError("query_dataframe requires pandas, install it with: pip install dots_infrastructure[dataframe]")
+        dataframes = []
+        for query_series in self.query_arrays(query, chunk_size, epoch):
+            dataframe = pd.DataFrame({column_name : column_values for column_name, column_values in query_series.columns.items() if column_name != "time"}, index=pd.Index(query_series.columns.get("time"), name="time"))
+            dataframe.insert(0, "measurement", query_series.name)
+            for tag_key, tag_value in (query_series.tags or {}).items():
+                dataframe[tag_key] = tag_value
+            dataframes.append(dataframe)
+        if not dataframes:
+            return pd.DataFrame()
+        return pd.concat(dataframes)
 
     def create_database(self):
-        if self.client is None:
-            self.client = self.connect()
-        self.client.create_database(self.influx_database_name)
+        self.get_client().create_database(self.influx_database_name)
 
     def write(self, msgs):
-        if self.client is None:
-            self.client = self.connect()
+        client = self.get_client()
 
         # Send message to database.
-        chunk_size = 100000
+        chunk_size = self.chunk_size
         for i in range(0, len(msgs), chunk_size):
             chunk = msgs[i:i + chunk_size]
-            self.client.write_points(chunk, database=self.influx_database_name, time_precision="s")
-        
+            client.write_points(chunk, database=self.influx_database_name, time_precision="s")
+
+    def write_line_protocol(self, data: bytes):
+        headers = {"Content-Type": "application/octet-stream"}
+        if self.gzip_compression_level > 0:
+            data = gzip.compress(data, compresslevel=self.gzip_compression_level)
+            headers["Content-Encoding"] = "gzip"
+
+        self.get_client().request(
+            url="write",
+            method="POST",
+            params={"db": self.influx_database_name, "precision": "s"},
+            data=data,
+            expected_response_code=204,
+            headers=headers,
+        )
 
     def close(self):
         if self.client:
@@ -101,46 +353,85 @@ class InfluxDBConnector:
         model_id: str,
         esdl_type: str,
         esdl_objects: dict[EsdlId, esdl],
+        esdl_ids: typing.Optional[typing.List[EsdlId]] = None,
     ):
-        self.simulation_id = simulation_id
-        self.esdl_type = esdl_type
-        self.model_id = model_id
-        self.data_points : typing.List[dict] = []
-        self.esdl_objects = esdl_objects
-
-    def set_time_step_data_point(
-        self, esdl_id: EsdlId, output_name: str, simulation_datetime: datetime, value: float
-    ):
-        fields = {
-            output_name : value
+        """The line prefixes of esdl_ids are rendered up front, the prefixes of other esdl ids when they are first written."""
+        super().init_profile_output_data(simulation_id, model_id, esdl_type, esdl_objects, esdl_ids)
+        self.line_prefixes = {esdl_id : self._render_line_prefix(esdl_id) for esdl_id in esdl_ids or []}
+
+    def check_value(self, output_name: str, value):
+        if not is_supported_field_value(value):
+            raise TypeError(f"Output {output_name} has a value of type {type(value).__name__} that can not be written to influx db: {value!r}")
+
+    def _render_line_prefix(self, esdl_id: EsdlId) -> str:
+        tags = {
+            "esdl_id": esdl_id,
+            "esdl_name": self.get_esdl_name(esdl_id),
+            "model_id": self.model_id,
+            "simulation_id": self.simulation_id,
         }
-        self.data_points.append(self.add_measurement(esdl_id, simulation_datetime, fields))
-        MAX_AMOUNT_OF_DB_POINTS = 100000
-        if len(self.data_points) >= MAX_AMOUNT_OF_DB_POINTS:
-            LOGGER.debug(f"Writing {len(self.data_points)} data points to InfluxDB")
-            self.write_output()
-            self.data_points.clear()
+        rendered_tags = [f"{tag_key}={escape_tag(tag_value)}" for tag_key, tag_value in tags.items() if tag_value is not None and escape_tag(tag_value) != ""]
+        return ",".join([escape_tag(self.esdl_type)] + rendered_tags)
 
-    def write_output(self):
-        self.write(self.data_points)
+    def get_line_prefix(self, esdl_id: EsdlId) -> str:
+        line_prefix = self.line_prefixes.get(esdl_id)
+        if line_prefix is None:
+            line_prefix = self.line_prefixes[esdl_id] = self._render_line_prefix(esdl_id)
+        return line_prefix
 
-    def add_measurement(self, esdl_id, timestamp, fields):
-        try:
-            if hasattr(self.esdl_objects[esdl_id], "name"):
-                esdl_name = self.esdl_objects[esdl_id].name
-            else:
-                esdl_name = self.esdl_type
-            item = {
-                "measurement": f"{self.esdl_type}",
-                "tags": {
-                    "simulation_id": self.simulation_id,
-                    "model_id": self.model_id,
-                    "esdl_id": esdl_id,
-                    "esdl_name": esdl_name,
-                },
-                "time": timestamp,
-                "fields": fields,
-            }
-            return item
-        except Exception as e:
-            LOGGER.debug(f"Exception: {e} {e.args}")
+    def write_data_points(self, data_points: ColumnarPointBuffer):
+        data = to_line_protocol(data_points, self.get_line_prefix)
+        if len(self.spill_buffer) == 0 and time.monotonic() >= self.next_retry_time:
+            try:
+                self.write_line_protocol(data)
+                return
+            except Exception as e:
+                if is_rejected_write(e):
+                    self._drop_rejected_chunk(data, e)
+                    return
+                self._register_write_failure(e)
+        self.spill_buffer.append(data)
+        self.retry_pending_writes()
+
+    def get_retry_timeout(self) -> typing.Optional[float]:
+        if len(self.spill_buffer) == 0:
+            return None
+        return max(0.0, self.next_retry_time - time.monotonic())
+
+    def retry_pending_writes(self):
+        if len(self.spill_buffer) > 0 and time.monotonic() >= self.next_retry_time:
+            self._replay_spilled_chunks()
+
+    def finish_pending_writes(self):
+        if len(self.spill_buffer) > 0:
+            self._replay_spilled_chunks()
+        if len(self.spill_buffer) > 0:
+            LOGGER.error(f"Could not write {len(self.spill_buffer)} chunks to influx db, they are kept in {self.spill_buffer.spill_directory}")
+        self.spill_buffer.close()
+
+    def _replay_spilled_chunks(self):
+        amount_of_chunks = len(self.spill_buffer)
+        while len(self.spill_buffer) > 0:
+            data = self.spill_buffer.peek()
+            try:
+                self.write_line_protocol(data)
+            except Exception as e:
+                if not is_rejected_write(e):
+                    self._register_write_failure(e)
+                    return
+                self._drop_rejected_chunk(data, e)
+            self.spill_buffer.pop()
+        LOGGER.info(f"Replayed {amount_of_chunks} spilled chunks to influx db")
+        self.retry_backoff_seconds = 0.0
+        self.next_retry_time = 0.0
+
+    def _drop_rejected_chunk(self, data: bytes, error: InfluxDBClientError):
+        self.rejected_chunks += 1
+        amount_of_lines = data.count(b"\n")
+        LOGGER.error(f"Influx db rejected a chunk of {amount_of_lines} lines with status {error.code}, the chunk is dropped: {error.content}")
+
+    def _register_write_failure(self, error: Exception):
+        self.next_health_check_time = 0.0
+        self.retry_backoff_seconds = min(max(self.retry_backoff_seconds * 2, self.RETRY_BACKOFF_INITIAL_SECONDS), self.RETRY_BACKOFF_MAX_SECONDS)
+        self.next_retry_time = time.monotonic() + self.retry_backoff_seconds
+        LOGGER.warning(f"Failed to write to influx db, {len(self.spill_buffer)} chunks pending, retrying in {self.retry_backoff_seconds:.1f} s: {error}")
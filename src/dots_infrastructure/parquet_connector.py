@@ -0,0 +1,94 @@
+import os
+import typing
+
+from numbers import Real
+from dots_infrastructure.Logger import LOGGER
+from dots_infrastructure.result_sink import ColumnarPointBuffer, ResultSink
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = None
+    pq = None
+
+
+class ParquetConnector(ResultSink):
+    """A connector that writes data to a local parquet file per model id, every chunk of data points is written as a row group.
+
+    The time column holds the (UTC) simulation time without time zone, like the simulation start time. Numeric values are
+    stored in the value column, other values (e.g. strings or vectors) as text in the value_text column.
+    """
+
+    def __init__(
+        self,
+        output_directory: str,
+        write_queue_size: int = 16,
+        write_queue_timeout: typing.Optional[float] = None,
+        chunk_size: typing.Optional[int] = None,
+    ):
+        if pa is None:
+            raise ImportError("The parquet result sink requires pyarrow, install it with: pip install dots_infrastructure[parquet]")
+        super().__init__(write_queue_size, write_queue_timeout, chunk_size)
+        self.output_directory = output_directory
+        self.parquet_writer: typing.Optional["pq.ParquetWriter"] = None
+        self.esdl_names: dict[str, str] = {}
+        self.schema = pa.schema([
+            ("time", pa.timestamp("s")),
+            ("esdl_id", pa.string()),
+            ("esdl_name", pa.string()),
+            ("output_name", pa.string()),
+            ("value", pa.float64()),
+            ("value_text", pa.string()),
+        ])
+
+        LOGGER.debug("parquet output directory: {}".format(self.output_directory))
+
+    def get_output_file_path(self) -> str:
+        return os.path.join(self.output_directory, f"{self.simulation_id}", f"{self.model_id}.parquet")
+
+    def connect(self):
+        os.makedirs(os.path.dirname(self.get_output_file_path()), exist_ok=True)
+
+    def close(self):
+        if self.parquet_writer is not None:
+            self.parquet_writer.close()
+            self.parquet_writer = None
+
+    def stop_writer(self):
+        super().stop_writer()
+        self.close()
+
+    def _get_esdl_names(self, esdl_ids: typing.List[str]) -> typing.List[str]:
+        esdl_names = []
+        for esdl_id in esdl_ids:
+            esdl_name = self.esdl_names.get(esdl_id)
+            if esdl_name is None:
+                esdl_name = self.esdl_names[esdl_id] = self.get_esdl_name(esdl_id)
+            esdl_names.append(esdl_name)
+        return esdl_names
+
+    def _get_value_columns(self, values: typing.List) -> typing.Tuple["pa.Array", "pa.Array"]:
+        try:
+            return pa.array(values, type=pa.float64()), pa.nulls(len(values), type=pa.string())
+        except (pa.ArrowInvalid, pa.ArrowTypeError):
+            numeric_values = [float(value) if isinstance(value, Real) and not isinstance(value, bool) else None for value in values]
+            text_values = [None if numeric_value is not None or value is None else str(value) for value, numeric_value in zip(values, numeric_values)]
+            return pa.array(numeric_values, type=pa.float64()), pa.array(text_values, type=pa.string())
+
+    def write_data_points(self, data_points: ColumnarPointBuffer):
+        values, text_values = self._get_value_columns(data_points.values)
+        table = pa.Table.from_arrays([
+            pa.array(data_points.timestamps, type=pa.timestamp("s")),
+            pa.array(data_points.esdl_ids, type=pa.string()),
+            pa.array(self._get_esdl_names(data_points.esdl_ids), type=pa.string()),
+            pa.array(data_points.output_names, type=pa.string()),
+            values,
+            text_values,
+        ], schema=self.schema)
+
+        if self.parquet_writer is None:
+            self.connect()
+            schema = self.schema.with_metadata({"simulation_id": f"{self.simulation_id}", "model_id": f"{self.model_id}", "esdl_type": f"{self.esdl_type}"})
+            self.parquet_writer = pq.ParquetWriter(self.get_output_file_path(), schema)
+        self.parquet_writer.write_table(table, row_group_size=len(data_points))
@@ -0,0 +1,395 @@
+from abc import ABC, abstractmethod
+import calendar
+import queue
+import threading
+import typing
+
+from datetime import datetime
+from dots_infrastructure.Constants import RecordingAggregation
+from dots_infrastructure.DataClasses import EsdlId, RecordingPolicy
+from dots_infrastructure.Logger import LOGGER
+
+from esdl import esdl
+
+
+def get_epoch_seconds(simulation_datetime: datetime) -> int:
+    return calendar.timegm(simulation_datetime.utctimetuple())
+
+
+class ColumnarPointBuffer:
+    """Data points stored as one list per column, with timestamps as epoch seconds."""
+
+    def __init__(self):
+        self.esdl_ids : typing.List[EsdlId] = []
+        self.output_names : typing.List[str] = []
+        self.timestamps : typing.List[int] = []
+        self.values : typing.List = []
+
+    def __len__(self):
+        return len(self.esdl_ids)
+
+    def append(self, esdl_id: EsdlId, output_name: str, timestamp: int, value):
+        self.esdl_ids.append(esdl_id)
+        self.output_names.append(output_name)
+        self.timestamps.append(timestamp)
+        self.values.append(value)
+
+    def extend(self, data_points: "ColumnarPointBuffer"):
+        self.esdl_ids.extend(data_points.esdl_ids)
+        self.output_names.extend(data_points.output_names)
+        self.timestamps.extend(data_points.timestamps)
+        self.values.extend(data_points.values)
+
+    def take(self, amount: int) -> "ColumnarPointBuffer":
+        """Removes the first amount data points from this buffer and returns them."""
+        data_points = ColumnarPointBuffer()
+        data_points.esdl_ids, self.esdl_ids = self.esdl_ids[:amount], self.esdl_ids[amount:]
+        data_points.output_names, self.output_names = self.output_names[:amount], self.output_names[amount:]
+        data_points.timestamps, self.timestamps = self.timestamps[:amount], self.timestamps[amount:]
+        data_points.values, self.values = self.values[:amount], self.values[amount:]
+        return data_points
+
+
+class SeriesAggregate:
+    """Aggregation state of the data points of a single esdl id and output name."""
+
+    __slots__ = ("window_start", "amount_of_values", "value")
+
+    def __init__(self, window_start: int):
+        self.window_start = window_start
+        self.amount_of_values = 0
+        self.value = None
+
+    def add(self, aggregation: RecordingAggregation, value):
+        if self.amount_of_values == 0 or aggregation == RecordingAggregation.LAST:
+            self.value = value
+        elif aggregation == RecordingAggregation.MEAN:
+            self.value += value
+        elif aggregation == RecordingAggregation.MIN:
+            self.value = min(self.value, value)
+        elif aggregation == RecordingAggregation.MAX:
+            self.value = max(self.value, value)
+        self.amount_of_values += 1
+
+
+class RecordingAggregator:
+    """Applies the recording policies of the outputs of calculations to the data points of those outputs.
+
+    A policy is set for an output name of a calculation, a policy without calculation name applies to that output
+    name of every calculation that has no policy of its own. Every series (esdl id, calculation name and output name)
+    keeps a single SeriesAggregate, the aggregate of a window is emitted, timestamped with the start of the window,
+    when the first data point of a later window arrives or on flush. Windows are aligned to whole multiples of
+    window_in_seconds since the epoch. The MEAN, MIN and MAX aggregations require numeric values.
+    """
+
+    def __init__(self):
+        self.recording_policies: dict[typing.Tuple[typing.Optional[str], str], RecordingPolicy] = {}
+        self.output_names_with_recording_policy: typing.Set[str] = set()
+        self.series: dict[typing.Tuple[EsdlId, typing.Optional[str], str], typing.Tuple[SeriesAggregate, RecordingPolicy]] = {}
+        self.lock = threading.Lock()
+
+    def set_recording_policy(self, output_name: str, recording_policy: RecordingPolicy, calculation_name: typing.Optional[str] = None):
+        if recording_policy.aggregation == RecordingAggregation.EVERY_NTH:
+            if recording_policy.every_nth < 1:
+                raise ValueError(f"every_nth of the recording policy of {output_name} should be at least 1")
+        elif recording_policy.window_in_seconds <= 0:
+            raise ValueError(f"window_in_seconds of the recording policy of {output_name} should be larger than 0")
+        self.recording_policies[(calculation_name, output_name)] = recording_policy
+        self.output_names_with_recording_policy.add(output_name)
+
+    def get_recording_policy(self, calculation_name: typing.Optional[str], output_name: str) -> typing.Optional[RecordingPolicy]:
+        if output_name not in self.output_names_with_recording_policy:
+            return None
+        recording_policy = self.recording_policies.get((calculation_name, output_name))
+        if recording_policy is None:
+            recording_policy = self.recording_policies.get((None, output_name))
+        return recording_policy
+
+    def add(self, esdl_id: EsdlId, calculation_name: typing.Optional[str], output_name: str, timestamp: int, value, recording_policy: RecordingPolicy, aggregated_data_points: ColumnarPointBuffer):
+        """Adds a data point of an output with a recording policy, the data points to record are appended to aggregated_data_points."""
+        series_key = (esdl_id, calculation_name, output_name)
+        with self.lock:
+            series = self.series.get(series_key)
+            series_aggregate = series[0] if series is not None else None
+            if recording_policy.aggregation == RecordingAggregation.EVERY_NTH:
+                if series_aggregate is None:
+                    series_aggregate = SeriesAggregate(timestamp)
+                    self.series[series_key] = (series_aggregate, recording_policy)
+                if series_aggregate.amount_of_values % recording_policy.every_nth == 0:
+                    aggregated_data_points.append(esdl_id, output_name, timestamp, value)
+                series_aggregate.amount_of_values += 1
+                return
+
+            window_start = timestamp - timestamp % recording_policy.window_in_seconds
+            if series_aggregate is None or series_aggregate.window_start != window_start:
+                if series_aggregate is not None:
+                    self._emit(esdl_id, output_name, series_aggregate, recording_policy, aggregated_data_points)
+                series_aggregate = SeriesAggregate(window_start)
+                self.series[series_key] = (series_aggregate, recording_policy)
+            series_aggregate.add(recording_policy.aggregation, value)
+
+    def flush(self, aggregated_data_points: ColumnarPointBuffer):
+        """Emits the aggregates of all windows that are not complete yet."""
+        with self.lock:
+            for (esdl_id, _, output_name), (series_aggregate, recording_policy) in self.series.items():
+                if recording_policy.aggregation != RecordingAggregation.EVERY_NTH:
+                    self._emit(esdl_id, output_name, series_aggregate, recording_policy, aggregated_data_points)
+            self.series = {series_key : series for series_key, series in self.series.items() if series[1].aggregation == RecordingAggregation.EVERY_NTH}
+
+    def _emit(self, esdl_id: EsdlId, output_name: str, series_aggregate: SeriesAggregate, recording_policy: RecordingPolicy, aggregated_data_points: ColumnarPointBuffer):
+        if series_aggregate.amount_of_values == 0:
+            return
+        value = series_aggregate.value
+        if recording_policy.aggregation == RecordingAggregation.MEAN:
+            value = value / series_aggregate.amount_of_values
+        aggregated_data_points.append(esdl_id, output_name, series_aggregate.window_start, value)
+
+
+class StagingBuffer:
+    """Data points of a single thread that are not yet handed over to the writer thread."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.data_points = ColumnarPointBuffer()
+        self.last_datetime : typing.Optional[datetime] = None
+        self.last_timestamp : typing.Optional[int] = None
+        self.calculation_name : typing.Optional[str] = None
+
+
+class ResultSink(ABC):
+    """Base class of the sinks that store the outputs of a calculation service.
+
+    Data points are staged per thread and handed over in batches to a bounded queue, a dedicated writer
+    thread takes the batches from the queue and passes them to write_data_points in chunks of chunk_size data points. When the queue is
+    full the calling thread blocks, or drops the batch when a write queue timeout is set and expires.
+
+    Outputs with a recording policy are aggregated before they are staged, only the aggregates are written. The
+    aggregates of windows that are not complete yet are written when the writer is stopped.
+    """
+
+    MAX_AMOUNT_OF_DB_POINTS = 100000
+    STAGING_BUFFER_SIZE = 10000
+    FLUSH = object()
+    STOP = object()
+
+    def __init__(
+        self,
+        write_queue_size: int = 16,
+        write_queue_timeout: typing.Optional[float] = None,
+        chunk_size: typing.Optional[int] = None,
+    ):
+        self.simulation_id: typing.Optional[str] = None
+        self.model_id: typing.Optional[str] = None
+        self.esdl_type: typing.Optional[str] = None
+        self.esdl_objects: typing.Optional[dict[EsdlId, esdl]] = None
+
+        self.chunk_size = chunk_size if chunk_size else self.MAX_AMOUNT_OF_DB_POINTS
+        self.write_queue_timeout = write_queue_timeout
+        self.write_queue: queue.Queue = queue.Queue(maxsize=write_queue_size)
+        self.writer_thread: typing.Optional[threading.Thread] = None
+        self.writer_thread_lock = threading.Lock()
+        self.thread_staging = threading.local()
+        self.staging_buffers: typing.List[StagingBuffer] = []
+        self.staging_buffers_lock = threading.Lock()
+        self.recording_aggregator = RecordingAggregator()
+
+    def connect(self):
+        pass
+
+    def close(self):
+        pass
+
+    def init_profile_output_data(
+        self,
+        simulation_id: str,
+        model_id: str,
+        esdl_type: str,
+        esdl_objects: dict[EsdlId, esdl],
+        esdl_ids: typing.Optional[typing.List[EsdlId]] = None,
+    ):
+        """Sets the tags of the data points, esdl_ids are the esdl ids of the calculation service whose outputs are stored."""
+        self.simulation_id = simulation_id
+        self.esdl_type = esdl_type
+        self.model_id = model_id
+        self.esdl_objects = esdl_objects
+
+    def get_esdl_name(self, esdl_id: EsdlId) -> str:
+        esdl_obj = self.esdl_objects.get(esdl_id) if self.esdl_objects else None
+        if esdl_obj is not None and hasattr(esdl_obj, "name"):
+            return esdl_obj.name
+        return self.esdl_type
+
+    def set_recording_policy(self, output_name: str, recording_policy: RecordingPolicy, calculation_name: typing.Optional[str] = None):
+        """Aggregates the data points of the output with output_name according to recording_policy from now on, only those
+        of the calculation with calculation_name when it is given."""
+        self.recording_aggregator.set_recording_policy(output_name, recording_policy, calculation_name)
+
+    def set_calculation_name(self, calculation_name: typing.Optional[str]):
+        """Sets the calculation whose recording policies apply to the data points that the calling thread adds
+        without calculation name."""
+        self._get_staging_buffer().calculation_name = calculation_name
+
+    def check_value(self, output_name: str, value):
+        """Raises a TypeError when the sink can not store the value, called when a data point is added."""
+        pass
+
+    @abstractmethod
+    def write_data_points(self, data_points: ColumnarPointBuffer):
+        """Stores a chunk of data points, called from the writer thread only."""
+
+    def get_retry_timeout(self) -> typing.Optional[float]:
+        """Seconds until retry_pending_writes should be called when no data points arrive, None to wait for data points."""
+        return None
+
+    def retry_pending_writes(self):
+        """Retries writes that failed before, called from the writer thread only."""
+        pass
+
+    def finish_pending_writes(self):
+        """Makes a last attempt to write everything that failed before, called from the writer thread when it stops."""
+        pass
+
+    def set_time_step_data_point(
+        self, esdl_id: EsdlId, output_name: str, simulation_datetime: datetime, value: float, calculation_name: typing.Optional[str] = None
+    ):
+        self.check_value(output_name, value)
+        staging_buffer = self._get_staging_buffer()
+        data_points_to_write = None
+        with staging_buffer.lock:
+            if simulation_datetime != staging_buffer.last_datetime:
+                staging_buffer.last_datetime = simulation_datetime
+                staging_buffer.last_timestamp = get_epoch_seconds(simulation_datetime)
+            if calculation_name is None:
+                calculation_name = staging_buffer.calculation_name
+            recording_policy = self.recording_aggregator.get_recording_policy(calculation_name, output_name)
+            if recording_policy is not None:
+                self.recording_aggregator.add(esdl_id, calculation_name, output_name, staging_buffer.last_timestamp, value, recording_policy, staging_buffer.data_points)
+            else:
+                staging_buffer.data_points.append(esdl_id, output_name, staging_buffer.last_timestamp, value)
+            if len(staging_buffer.data_points) >= self.STAGING_BUFFER_SIZE:
+                data_points_to_write = staging_buffer.data_points
+                staging_buffer.data_points = ColumnarPointBuffer()
+        if data_points_to_write:
+            self._enqueue_data_points(data_points_to_write)
+
+    def set_time_step_data_points(self, data_points: ColumnarPointBuffer, calculation_name: typing.Optional[str] = None):
+        """Stages a batch of data points at once, e.g. all recorded outputs of a time step of the calculation with calculation_name."""
+        for output_name, value in zip(data_points.output_names, data_points.values):
+            self.check_value(output_name, value)
+        staging_buffer = self._get_staging_buffer()
+        data_points_to_write = None
+        with staging_buffer.lock:
+            if calculation_name is None:
+                calculation_name = staging_buffer.calculation_name
+            if self.recording_aggregator.recording_policies:
+                self._stage_data_points_with_recording_policies(data_points, calculation_name, staging_buffer)
+            else:
+                staging_buffer.data_points.extend(data_points)
+            if len(staging_buffer.data_points) >= self.STAGING_BUFFER_SIZE:
+                data_points_to_write = staging_buffer.data_points
+                staging_buffer.data_points = ColumnarPointBuffer()
+        if data_points_to_write:
+            self._enqueue_data_points(data_points_to_write)
+
+    def write_output(self):
+        """Hands the data points of all threads over to the writer thread and waits until they are written."""
+        self._flush_staging_buffers()
+        self._put_in_write_queue(self.FLUSH)
+        self.write_queue.join()
+
+    def stop_writer(self):
+        """Writes all remaining data points, including the aggregates of incomplete windows, and waits for the writer thread to finish."""
+        self._flush_staging_buffers()
+        aggregated_data_points = ColumnarPointBuffer()
+        self.recording_aggregator.flush(aggregated_data_points)
+        if aggregated_data_points:
+            self._put_in_write_queue(aggregated_data_points)
+        if self.writer_thread is not None:
+            self._put_in_write_queue(self.STOP)
+            self.writer_thread.join()
+            self.writer_thread = None
+
+    def _stage_data_points_with_recording_policies(self, data_points: ColumnarPointBuffer, calculation_name: typing.Optional[str], staging_buffer: StagingBuffer):
+        recording_policies = {}
+        for esdl_id, output_name, timestamp, value in zip(data_points.esdl_ids, data_points.output_names, data_points.timestamps, data_points.values):
+            if output_name not in recording_policies:
+                recording_policies[output_name] = self.recording_aggregator.get_recording_policy(calculation_name, output_name)
+            recording_policy = recording_policies[output_name]
+            if recording_policy is not None:
+                self.recording_aggregator.add(esdl_id, calculation_name, output_name, timestamp, value, recording_policy, staging_buffer.data_points)
+            else:
+                staging_buffer.data_points.append(esdl_id, output_name, timestamp, value)
+
+    def _get_staging_buffer(self) -> StagingBuffer:
+        staging_buffer = getattr(self.thread_staging, "buffer", None)
+        if staging_buffer is None:
+            staging_buffer = StagingBuffer()
+            self.thread_staging.buffer = staging_buffer
+            with self.staging_buffers_lock:
+                self.staging_buffers.append(staging_buffer)
+        return staging_buffer
+
+    def _flush_staging_buffers(self):
+        with self.staging_buffers_lock:
+            staging_buffers = list(self.staging_buffers)
+        for staging_buffer in staging_buffers:
+            with staging_buffer.lock:
+                data_points_to_write = staging_buffer.data_points
+                staging_buffer.data_points = ColumnarPointBuffer()
+            if data_points_to_write:
+                self._put_in_write_queue(data_points_to_write)
+
+    def _enqueue_data_points(self, data_points: ColumnarPointBuffer):
+        try:
+            self._put_in_write_queue(data_points, self.write_queue_timeout)
+        except queue.Full:
+            LOGGER.warning(f"Write queue of {type(self).__name__} is full, dropping {len(data_points)} data points")
+
+    def _put_in_write_queue(self, item, timeout: typing.Optional[float] = None):
+        self._start_writer_thread()
+        self.write_queue.put(item, timeout=timeout)
+
+    def _start_writer_thread(self):
+        with self.writer_thread_lock:
+            if self.writer_thread is None:
+                self.writer_thread = threading.Thread(target=self._write_data_points_from_queue, name=f"{type(self).__name__}-writer", daemon=True)
+                self.writer_thread.start()
+
+    def _write_data_points_from_queue(self):
+        pending_data_points = ColumnarPointBuffer()
+        running = True
+        while running:
+            try:
+                item = self.write_queue.get(timeout=self.get_retry_timeout())
+            except queue.Empty:
+                self._retry_pending_writes()
+                continue
+            try:
+                if item is self.FLUSH or item is self.STOP:
+                    running = item is not self.STOP
+                    minimum_amount_to_write = 1
+                else:
+                    pending_data_points.extend(item)
+                    minimum_amount_to_write = self.chunk_size
+                while len(pending_data_points) >= minimum_amount_to_write:
+                    if len(pending_data_points) > self.chunk_size:
+                        data_points_to_write = pending_data_points.take(self.chunk_size)
+                    else:
+                        data_points_to_write = pending_data_points
+                        pending_data_points = ColumnarPointBuffer()
+                    LOGGER.debug(f"Writing {len(data_points_to_write)} data points with {type(self).__name__}")
+                    self.write_data_points(data_points_to_write)
+                if item is self.FLUSH:
+                    self.retry_pending_writes()
+                elif item is self.STOP:
+                    self.finish_pending_writes()
+            except Exception as e:
+                LOGGER.error(f"Failed to write data points with {type(self).__name__}: {e}")
+            finally:
+                self.write_queue.task_done()
+
+    def _retry_pending_writes(self):
+        try:
+            self.retry_pending_writes()
+        except Exception as e:
+            LOGGER.error(f"Failed to retry pending writes of {type(self).__name__}: {e}")
@@ -0,0 +1,158 @@
+import collections
+import os
+import struct
+import tempfile
+import time
+import typing
+import uuid
+
+from dots_infrastructure.Logger import LOGGER
+
+
+class SpillBuffer:
+    """First in first out buffer of serialized chunks that could not be written yet.
+
+    Chunks are kept in memory until their total size passes the memory threshold, then all chunks in memory are
+    appended to a segment file on disk. Segment files are append-only, every record is the length of the chunk
+    followed by the chunk itself, a new segment is started once a segment passes the maximum segment size.
+    Segments are replayed oldest first and removed once all their chunks are taken out of the buffer.
+
+    Segment files get a unique name, so a buffer never appends to the segments of an earlier run in the same spill
+    directory. Those segments are only taken into the buffer, ahead of new chunks, with recover_existing_segments,
+    otherwise they are left untouched.
+    """
+
+    RECORD_HEADER = struct.Struct("<Q")
+    SEGMENT_FILE_EXTENSION = ".segment"
+
+    def __init__(
+        self,
+        spill_directory: typing.Optional[str] = None,
+        memory_threshold_bytes: int = 64 * 1024 * 1024,
+        max_segment_bytes: int = 256 * 1024 * 1024,
+        recover_existing_segments: bool = False,
+    ):
+        self.spill_directory = spill_directory
+        self.memory_threshold_bytes = memory_threshold_bytes
+        self.max_segment_bytes = max_segment_bytes
+
+        self.chunks_in_memory: typing.Deque[bytes] = collections.deque()
+        self.bytes_in_memory = 0
+        self.segment_paths: typing.Deque[str] = collections.deque()
+        self.open_segment: typing.Optional[typing.BinaryIO] = None
+        self.replay_segment: typing.Optional[typing.BinaryIO] = None
+        self.spilled_chunks = 0
+
+        existing_segment_paths = self._find_existing_segments()
+        if recover_existing_segments:
+            self._recover_segments(existing_segment_paths)
+        elif existing_segment_paths:
+            LOGGER.warning(f"Spill directory {self.spill_directory} contains {len(existing_segment_paths)} segments of an earlier run, they are left untouched")
+
+    def __len__(self):
+        return len(self.chunks_in_memory) + self.spilled_chunks
+
+    def append(self, chunk: bytes):
+        self.chunks_in_memory.append(chunk)
+        self.bytes_in_memory += len(chunk)
+        if self.bytes_in_memory > self.memory_threshold_bytes:
+            self.spill()
+
+    def spill(self):
+        """Appends all chunks in memory to the open segment file."""
+        if not self.chunks_in_memory:
+            return
+        if self.open_segment is None:
+            self._open_new_segment()
+        LOGGER.debug(f"Spilling {len(self.chunks_in_memory)} chunks ({self.bytes_in_memory} bytes) to {self.segment_paths[-1]}")
+        while self.chunks_in_memory:
+            chunk = self.chunks_in_memory.popleft()
+            self.open_segment.write(self.RECORD_HEADER.pack(len(chunk)))
+            self.open_segment.write(chunk)
+            self.spilled_chunks += 1
+        self.bytes_in_memory = 0
+        self.open_segment.flush()
+        if self.open_segment.tell() >= self.max_segment_bytes:
+            self.open_segment.close()
+            self.open_segment = None
+
+    def peek(self) -> bytes:
+        """Returns the oldest chunk without taking it out of the buffer."""
+        if self.spilled_chunks > 0:
+            if self.replay_segment is None:
+                self.replay_segment = open(self.segment_paths[0], "rb")
+            offset = self.replay_segment.tell()
+            chunk_length, = self.RECORD_HEADER.unpack(self.replay_segment.read(self.RECORD_HEADER.size))
+            chunk = self.replay_segment.read(chunk_length)
+            self.replay_segment.seek(offset)
+            return chunk
+        return self.chunks_in_memory[0]
+
+    def pop(self):
+        """Takes the oldest chunk out of the buffer, a segment is removed once all its chunks are taken out."""
+        if self.spilled_chunks == 0:
+            chunk = self.chunks_in_memory.popleft()
+            self.bytes_in_memory -= len(chunk)
+            return
+
+        if self.replay_segment is None:
+            self.replay_segment = open(self.segment_paths[0], "rb")
+        chunk_length, = self.RECORD_HEADER.unpack(self.replay_segment.read(self.RECORD_HEADER.size))
+        self.replay_segment.seek(chunk_length, os.SEEK_CUR)
+        self.spilled_chunks -= 1
+
+        if self.replay_segment.tell() >= os.path.getsize(self.segment_paths[0]):
+            self.replay_segment.close()
+            self.replay_segment = None
+            if len(self.segment_paths) == 1 and self.open_segment is not None:
+                self.open_segment.close()
+                self.open_segment = None
+            os.remove(self.segment_paths.popleft())
+
+    def close(self):
+        """Writes the chunks in memory to disk and closes the segment files, the segments are kept on disk."""
+        self.spill()
+        for segment in [self.open_segment, self.replay_segment]:
+            if segment is not None:
+                segment.close()
+        self.open_segment = None
+        self.replay_segment = None
+
+    def _find_existing_segments(self) -> typing.List[str]:
+        if self.spill_directory is None or not os.path.isdir(self.spill_directory):
+            return []
+        segment_file_names = sorted(file_name for file_name in os.listdir(self.spill_directory) if file_name.endswith(self.SEGMENT_FILE_EXTENSION))
+        return [os.path.join(self.spill_directory, file_name) for file_name in segment_file_names]
+
+    def _recover_segments(self, segment_paths: typing.List[str]):
+        """Takes the chunks of existing segments into the buffer, an incomplete last record (e.g. of a crashed run) is cut off."""
+        for segment_path in segment_paths:
+            amount_of_chunks = 0
+            with open(segment_path, "r+b") as segment:
+                segment_size = os.path.getsize(segment_path)
+                offset = 0
+                while offset + self.RECORD_HEADER.size <= segment_size:
+                    chunk_length, = self.RECORD_HEADER.unpack(segment.read(self.RECORD_HEADER.size))
+                    if offset + self.RECORD_HEADER.size + chunk_length > segment_size:
+                        break
+                    offset += self.RECORD_HEADER.size + chunk_length
+                    segment.seek(offset)
+                    amount_of_chunks += 1
+                if offset < segment_size:
+                    LOGGER.warning(f"Cutting off an incomplete record at the end of spill segment {segment_path}")
+                    segment.truncate(offset)
+            if amount_of_chunks == 0:
+                os.remove(segment_path)
+                continue
+            self.segment_paths.append(segment_path)
+            self.spilled_chunks += amount_of_chunks
+        if self.spilled_chunks > 0:
+            LOGGER.info(f"Recovered {self.spilled_chunks} spilled chunks from {len(self.segment_paths)} segments in {self.spill_directory}")
+
+    def _open_new_segment(self):
+        if self.spill_directory is None:
+            self.spill_directory = tempfile.mkdtemp(prefix="dots-spill-")
+        os.makedirs(self.spill_directory, exist_ok=True)
+        segment_path = os.path.join(self.spill_directory, f"{time.time_ns():020d}-{uuid.uuid4().hex}{self.SEGMENT_FILE_EXTENSION}")
+        self.open_segment = open(segment_path, "xb")
+        self.segment_paths.append(segment_path)
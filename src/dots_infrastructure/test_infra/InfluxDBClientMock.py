@@ -4,6 +4,8 @@ class InfluxDBClientMock:
     def __init__(self, *args, **kwargs):
         # Use MagicMock to mock all methods
         self.write_points = MagicMock(return_value=True)
+        self.request = MagicMock()
+        self.ping = MagicMock(return_value="1.8.10")
         self.query = MagicMock(return_value=MagicMock(raw={"series": [{"name": "mock_series", "values": [[1, "mock_value"]], "columns": ["time", "value"]}]}))
         self.switch_database = MagicMock()
         self.create_database = MagicMock()
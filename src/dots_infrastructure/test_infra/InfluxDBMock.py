@@ -14,7 +14,7 @@
 
 import typing
 
-from datetime import datetime
+from datetime import datetime, timezone
 from dots_infrastructure.DataClasses import EsdlId, SimulaitonDataPoint
 from dots_infrastructure.Logger import LOGGER
 from influxdb import InfluxDBClient
@@ -22,6 +22,7 @@ from influxdb import InfluxDBClient
 from esdl import esdl
 
 from dots_infrastructure.influxdb_connector import InfluxDBConnector
+from dots_infrastructure.result_sink import ColumnarPointBuffer
 
 
 
@@ -53,6 +54,7 @@ class InfluxDBMock(InfluxDBConnector):
         model_id: str,
         esdl_type: str,
         esdl_objects: dict[EsdlId, esdl],
+        esdl_ids: typing.Optional[typing.List[EsdlId]] = None,
     ):
         self.simulation_id = simulation_id
         self.esdl_type = esdl_type
@@ -60,12 +62,14 @@ class InfluxDBMock(InfluxDBConnector):
         self.esdl_objects = esdl_objects
 
     def set_time_step_data_point(
-        self, esdl_id: EsdlId, output_name: str, simulation_datetime: datetime, value: float
+        self, esdl_id: EsdlId, output_name: str, simulation_datetime: datetime, value: float, calculation_name: typing.Optional[str] = None
     ):
         self.data_points.append(SimulaitonDataPoint(output_name, simulation_datetime, value, esdl_id))
 
+    def set_time_step_data_points(self, data_points: ColumnarPointBuffer, calculation_name: typing.Optional[str] = None):
+        for esdl_id, output_name, timestamp, value in zip(data_points.esdl_ids, data_points.output_names, data_points.timestamps, data_points.values):
+            simulation_datetime = datetime.fromtimestamp(timestamp, timezone.utc).replace(tzinfo=None)
+            self.data_points.append(SimulaitonDataPoint(output_name, simulation_datetime, value, esdl_id))
+
     def write_output(self):
         LOGGER.info("write output")
-
-    def add_measurement(self, points, esdl_id, timestamp, fields):
-        LOGGER.info("add measurement")
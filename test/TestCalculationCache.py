@@ -0,0 +1,58 @@
+import unittest
+from unittest.mock import MagicMock
+
+import numpy as np
+
+from dots_infrastructure.CalculationCache import CalculationCache
+
+class TestCalculationCache(unittest.TestCase):
+
+    def test_least_recently_used_result_is_evicted_when_cache_is_full(self):
+        # Arrange
+        cache = CalculationCache(2)
+        calculate = MagicMock(side_effect=lambda: {"output" : calculate.call_count})
+        key_a = cache.get_key("esdl-id", {"input" : 1.0})
+        key_b = cache.get_key("esdl-id", {"input" : 2.0})
+        key_c = cache.get_key("esdl-id", {"input" : 3.0})
+
+        # Execute
+        cache.get_or_calculate(key_a, calculate)
+        cache.get_or_calculate(key_b, calculate)
+        cache.get_or_calculate(key_a, calculate)
+        cache.get_or_calculate(key_c, calculate)
+        result_a = cache.get_or_calculate(key_a, calculate)
+        result_b = cache.get_or_calculate(key_b, calculate)
+
+        # Assert
+        self.assertEqual(result_a, {"output" : 1})
+        self.assertEqual(result_b, {"output" : 4})
+        self.assertEqual(cache.hits, 2)
+        self.assertEqual(cache.misses, 4)
+
+    def test_keys_compare_vector_inputs_and_state_key_by_content(self):
+        # Arrange
+        cache = CalculationCache(1)
+
+        # Execute and assert
+        self.assertEqual(cache.get_key("esdl-id", {"input" : [1.0, 2.0]}), cache.get_key("esdl-id", {"input" : [1.0, 2.0]}))
+        self.assertEqual(cache.get_key("esdl-id", {"input" : np.array([1.0, 2.0])}), cache.get_key("esdl-id", {"input" : np.array([1.0, 2.0])}))
+        self.assertNotEqual(cache.get_key("esdl-id", {"input" : 1.0}, 1), cache.get_key("esdl-id", {"input" : 1.0}, 2))
+        self.assertNotEqual(cache.get_key("esdl-id", {"input" : 1.0}), cache.get_key("other-esdl-id", {"input" : 1.0}))
+
+    def test_result_is_not_cached_when_inputs_can_not_be_hashed(self):
+        # Arrange
+        cache = CalculationCache(2)
+        calculate = MagicMock(return_value={})
+        key = cache.get_key("esdl-id", {"input" : {1.0}})
+
+        # Execute
+        cache.get_or_calculate(key, calculate)
+        cache.get_or_calculate(key, calculate)
+
+        # Assert
+        self.assertIsNone(key)
+        self.assertEqual(calculate.call_count, 2)
+        self.assertEqual(cache.misses, 2)
+
+if __name__ == '__main__':
+    unittest.main()
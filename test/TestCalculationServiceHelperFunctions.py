@@ -1,6 +1,10 @@
+import os
 import unittest
+from unittest.mock import patch
 
-from dots_infrastructure.CalculationServiceHelperFunctions import get_single_param_with_name, get_vector_param_with_name
+import helics as h
+
+from dots_infrastructure.CalculationServiceHelperFunctions import get_simulator_configuration_from_environment, get_single_param_with_name, get_vector_param_with_name, is_within_tolerance
 
 class TestLogicAddingCalculations(unittest.TestCase):
 
@@ -35,5 +39,39 @@ class TestLogicAddingCalculations(unittest.TestCase):
         # Assert
         self.assertEqual(result, expected_result)
 
+    def test_is_within_tolerance(self):
+        # Execute and assert
+        self.assertTrue(is_within_tolerance(1.05, 1.0, absolute_tolerance=0.1))
+        self.assertFalse(is_within_tolerance(1.2, 1.0, absolute_tolerance=0.1))
+        self.assertTrue(is_within_tolerance(104.0, 100.0, relative_tolerance=0.05))
+        self.assertTrue(is_within_tolerance(104.0, 100.0, absolute_tolerance=1.0, relative_tolerance=0.05))
+        self.assertTrue(is_within_tolerance(0.0, 0.0, absolute_tolerance=0.0))
+        self.assertFalse(is_within_tolerance(1.0, 1.0))
+        self.assertFalse(is_within_tolerance(1.0, None, absolute_tolerance=0.1))
+        self.assertFalse(is_within_tolerance([1.0], [1.0], absolute_tolerance=0.1))
+
+    def test_helics_core_type_and_core_sharing_are_read_from_environment(self):
+        # Arrange
+        environment = {"calculation_services" : "PVInstallation;EConnection", "helics_core_type" : "zmq_ss", "share_helics_core" : "true", "log_level" : "info"}
+
+        # Execute
+        with patch.dict(os.environ, environment):
+            result = get_simulator_configuration_from_environment()
+
+        # Assert
+        self.assertEqual(result.helics_core_type, h.HelicsCoreType.ZMQ_SS)
+        self.assertTrue(result.share_helics_core)
+
+    def test_parquet_chunk_size_is_read_from_environment(self):
+        # Arrange
+        environment = {"calculation_services" : "PVInstallation;EConnection", "parquet_chunk_size" : "5000", "log_level" : "info"}
+
+        # Execute
+        with patch.dict(os.environ, environment):
+            result = get_simulator_configuration_from_environment()
+
+        # Assert
+        self.assertEqual(result.parquet_chunk_size, 5000)
+
 if __name__ == '__main__':
     unittest.main()
\ No newline at end of file
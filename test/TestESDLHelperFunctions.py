@@ -1,6 +1,9 @@
+import base64
+from io import BytesIO
 import unittest
 import esdl
 
+from dots_infrastructure.EsdlHelper import Base64StreamDecoder, EsdlHelper
 from dots_infrastructure.EsdlHelperFunctions import EsdlHelperFunctions
 from esdl.esdl_handler import EnergySystemHandler
 
@@ -9,6 +12,8 @@ class TestLogicAddingCalculations(unittest.TestCase):
     def setUp(self):
         energy_system_handler = EnergySystemHandler()
         self.energy_system = energy_system_handler.load_file("test.esdl")
+        with open("test.esdl", mode="r") as esdl_file:
+            self.esdl_helper = EsdlHelper(base64.b64encode(esdl_file.read().encode('utf-8')).decode('utf-8'))
 
     def test_find_all_esdl_objects_of_type(self):
         # Arrange
@@ -31,5 +36,52 @@ class TestLogicAddingCalculations(unittest.TestCase):
         self.assertEqual(market.id, market_id)
         self.assertIsInstance(market, esdl.EnergyMarket)
 
+    def test_find_objects_using_esdl_helper_index_matches_scan(self):
+        # Arrange
+        market_id = "b612fc89-a752-4a30-84bb-81ebffc56b50"
+
+        # Execute
+        all_pv_installations = EsdlHelperFunctions.get_all_esdl_objects_from_type(self.esdl_helper, esdl.PVInstallation)
+        all_assets = EsdlHelperFunctions.get_all_esdl_objects_from_type(self.esdl_helper, esdl.EnergyAsset)
+        market = EsdlHelperFunctions.get_esdl_object_with_id(self.esdl_helper, market_id)
+
+        # Assert
+        self.assertEqual([pv.id for pv in all_pv_installations], [pv.id for pv in EsdlHelperFunctions.get_all_esdl_objects_from_type(self.energy_system.eAllContents(), esdl.PVInstallation)])
+        self.assertEqual([asset.id for asset in all_assets], [asset.id for asset in EsdlHelperFunctions.get_all_esdl_objects_from_type(self.energy_system.eAllContents(), esdl.EnergyAsset)])
+        self.assertEqual(market.id, market_id)
+        self.assertIsNone(EsdlHelperFunctions.get_esdl_object_with_id(self.esdl_helper, "non-existing-id"))
+
+    def test_esdl_file_decoded_from_unaligned_base64_chunks_equals_whole_file(self):
+        # Arrange
+        with open("test.esdl", mode="rb") as esdl_file:
+            esdl_bytes = esdl_file.read()
+        esdl_base64 = base64.b64encode(esdl_bytes).rstrip(b"=")
+        decoder = Base64StreamDecoder()
+
+        # Execute
+        for i in range(0, len(esdl_base64), 1001):
+            decoder.feed(esdl_base64[i:i + 1001])
+        esdl_stream = decoder.finish()
+        esdl_helper = EsdlHelper(esdl_stream=BytesIO(esdl_stream.getvalue()))
+
+        # Assert
+        self.assertEqual(esdl_stream.getvalue(), esdl_bytes)
+        self.assertEqual(esdl_helper.esdl_object_mapping.keys(), self.esdl_helper.esdl_object_mapping.keys())
+
+    def test_esdl_file_decoded_from_base64_chunks_with_line_breaks_equals_whole_file(self):
+        # Arrange
+        with open("test.esdl", mode="rb") as esdl_file:
+            esdl_bytes = esdl_file.read()
+        esdl_base64 = base64.encodebytes(esdl_bytes).replace(b"\n", b"\r\n ")
+        decoder = Base64StreamDecoder()
+
+        # Execute
+        for i in range(0, len(esdl_base64), 1001):
+            decoder.feed(esdl_base64[i:i + 1001])
+        esdl_stream = decoder.finish()
+
+        # Assert
+        self.assertEqual(esdl_stream.getvalue(), esdl_bytes)
+
 if __name__ == '__main__':
     unittest.main()
\ No newline at end of file
@@ -0,0 +1,143 @@
+import base64
+from datetime import datetime
+import tempfile
+import unittest
+from unittest.mock import MagicMock, patch
+
+import esdl
+from esdl.esdl_handler import EnergySystemHandler
+import numpy as np
+
+from dots_infrastructure.EsdlCache import EsdlCache
+from dots_infrastructure.EsdlHelper import EsdlHelper
+from dots_infrastructure.EsdlProfileStore import EsdlProfileStore, ProfileCache
+from dots_infrastructure.influxdb_connector import QuerySeries
+
+PV_INSTALLATION_IDS = ['176af591-6d9d-4751-bb0f-fac7e99b1c3d', 'b8766109-5328-416f-9991-e81a5cada8a6']
+START_TIME = datetime(2024, 1, 1)
+START_TIMESTAMP = int((START_TIME - datetime(1970, 1, 1)).total_seconds())
+
+class TestEsdlProfileStore(unittest.TestCase):
+
+    def setUp(self):
+        energy_system_handler = EnergySystemHandler()
+        energy_system_handler.load_file("test.esdl")
+        for pv_installation_id in PV_INSTALLATION_IDS:
+            pv_installation = energy_system_handler.get_by_id(pv_installation_id)
+            pv_installation.port[0].profile.append(esdl.InfluxDBProfile(id=f"solar-{pv_installation_id}", host="http://profiles-host", port=8086, database="profiles", measurement="solar", field="irradiance", multiplier=2.0))
+        pv_installation.port[0].profile.append(esdl.InfluxDBProfile(id="temperature", host="http://profiles-host", port=8086, database="profiles", measurement="weather", field="temperature", filters="\"location\"='Delft'"))
+        self.esdl_base64 = base64.b64encode(energy_system_handler.to_string().encode('utf-8')).decode('utf-8')
+        self.esdl_helper = EsdlHelper(self.esdl_base64)
+
+    def _query_series(self, statement_id, timestamps, values, field):
+        return QuerySeries("measurement", None, {"time" : np.array(timestamps, dtype=np.int64).astype("datetime64[s]"), field : np.array(values, dtype=np.float64)}, statement_id)
+
+    def _query_arrays(self, query):
+        statements = query.split(";")
+        query_series = []
+        for statement_id, statement in enumerate(statements):
+            if '"irradiance"' in statement:
+                query_series.append(self._query_series(statement_id, [START_TIMESTAMP + 600, START_TIMESTAMP + 2000], [100.0, 300.0], "irradiance"))
+            else:
+                query_series.append(self._query_series(statement_id, [START_TIMESTAMP, START_TIMESTAMP + 3600], [5.0, 7.5], "temperature"))
+        return query_series
+
+    def test_profiles_of_assets_are_found_including_profiles_of_ports(self):
+        # Execute
+        influxdb_profiles = self.esdl_helper.get_influxdb_profile_references(PV_INSTALLATION_IDS + ["f006d594-0743-4de5-a589-a6c2350898da"])
+
+        # Assert
+        self.assertListEqual(list(influxdb_profiles), PV_INSTALLATION_IDS)
+        self.assertListEqual([profile.profile_key for profile in influxdb_profiles[PV_INSTALLATION_IDS[1]]], [f"solar-{PV_INSTALLATION_IDS[1]}", "temperature"])
+        self.assertEqual(influxdb_profiles[PV_INSTALLATION_IDS[0]][0].host, "profiles-host")
+        self.assertEqual(influxdb_profiles[PV_INSTALLATION_IDS[0]][0].multiplier, 2.0)
+
+    def test_profiles_without_host_are_skipped(self):
+        # Arrange
+        pv_installation = self.esdl_helper.esdl_object_mapping[PV_INSTALLATION_IDS[0]]
+        pv_installation.port[0].profile.append(esdl.InfluxDBProfile(id="no-host", database="profiles", measurement="solar", field="irradiance"))
+
+        # Execute
+        influxdb_profiles = self.esdl_helper.get_influxdb_profile_references(PV_INSTALLATION_IDS)
+
+        # Assert
+        self.assertListEqual([profile.profile_key for profile in influxdb_profiles[PV_INSTALLATION_IDS[0]]], [f"solar-{PV_INSTALLATION_IDS[0]}"])
+
+    def test_only_profiles_of_given_assets_are_searched_and_stored_in_esdl_cache(self):
+        # Arrange
+        cache_directory = tempfile.TemporaryDirectory()
+        self.addCleanup(cache_directory.cleanup)
+        esdl_helper = EsdlHelper(self.esdl_base64, esdl_cache=EsdlCache(cache_directory.name))
+
+        # Execute
+        influxdb_profiles = esdl_helper.get_influxdb_profile_references(PV_INSTALLATION_IDS[:1])
+        warm_esdl_helper = EsdlHelper(self.esdl_base64, esdl_cache=EsdlCache(cache_directory.name))
+
+        # Assert
+        self.assertListEqual(list(influxdb_profiles), PV_INSTALLATION_IDS[:1])
+        self.assertListEqual(list(warm_esdl_helper.cache_entry.influxdb_profiles), PV_INSTALLATION_IDS[:1])
+        with patch.object(warm_esdl_helper, "_find_influxdb_profile_references", wraps=warm_esdl_helper._find_influxdb_profile_references) as find_influxdb_profile_references:
+            self.assertDictEqual(warm_esdl_helper.get_influxdb_profile_references(PV_INSTALLATION_IDS), self.esdl_helper.get_influxdb_profile_references(PV_INSTALLATION_IDS))
+        find_influxdb_profile_references.assert_called_once_with(PV_INSTALLATION_IDS[1])
+
+    @patch("dots_infrastructure.EsdlProfileStore.InfluxDBConnector")
+    def test_distinct_profiles_are_loaded_in_one_request_and_sampled_per_time_step(self, influx_connector_class):
+        # Arrange
+        influx_connector = influx_connector_class.return_value
+        influx_connector.query_arrays = MagicMock(side_effect=self._query_arrays)
+        profile_store = EsdlProfileStore(START_TIME, 3600, 900)
+
+        # Execute
+        profile_store.load(self.esdl_helper.get_influxdb_profile_references(PV_INSTALLATION_IDS))
+
+        # Assert
+        influx_connector_class.assert_called_once_with("profiles-host", "8086", None, None, "profiles")
+        influx_connector.query_arrays.assert_called_once()
+        statements = influx_connector.query_arrays.call_args.args[0].split(";")
+        self.assertEqual(len(statements), 2)
+        self.assertIn("WHERE time >= '2024-01-01T00:00:00Z' AND time < '2024-01-01T01:15:00Z' AND (\"location\"='Delft')", next(statement for statement in statements if '"temperature"' in statement))
+        for pv_installation_id in PV_INSTALLATION_IDS:
+            np.testing.assert_array_equal(profile_store.get_profile_values(pv_installation_id, f"solar-{pv_installation_id}"), np.array([np.nan, 200.0, 200.0, 600.0, 600.0]))
+        self.assertEqual(profile_store.get_profile_value(PV_INSTALLATION_IDS[0], 3), 600.0)
+        self.assertEqual(profile_store.get_profile_value(PV_INSTALLATION_IDS[1], profile_store.get_time_step_index(datetime(2024, 1, 1, 1)), "temperature"), 7.5)
+        with self.assertRaises(KeyError):
+            profile_store.get_profile_values(PV_INSTALLATION_IDS[1])
+
+    @patch("dots_infrastructure.EsdlProfileStore.InfluxDBConnector")
+    def test_cached_profile_queries_are_not_executed_again(self, influx_connector_class):
+        # Arrange
+        influx_connector_class.return_value.query_arrays = MagicMock(side_effect=self._query_arrays)
+        cache_directory = tempfile.TemporaryDirectory()
+        self.addCleanup(cache_directory.cleanup)
+        influxdb_profiles = self.esdl_helper.get_influxdb_profile_references(PV_INSTALLATION_IDS)
+        EsdlProfileStore(START_TIME, 3600, 900, profile_cache=ProfileCache(cache_directory.name)).load(influxdb_profiles)
+        influx_connector_class.reset_mock()
+        profile_store = EsdlProfileStore(START_TIME, 3600, 900, profile_cache=ProfileCache(cache_directory.name))
+
+        # Execute
+        profile_store.load(influxdb_profiles)
+
+        # Assert
+        influx_connector_class.assert_not_called()
+        np.testing.assert_array_equal(profile_store.get_profile_values(PV_INSTALLATION_IDS[1], "temperature"), np.array([5.0, 5.0, 5.0, 5.0, 7.5]))
+
+    @patch("dots_infrastructure.EsdlProfileStore.InfluxDBConnector")
+    def test_empty_query_results_are_not_cached(self, influx_connector_class):
+        # Arrange
+        influx_connector_class.return_value.query_arrays = MagicMock(return_value=[])
+        cache_directory = tempfile.TemporaryDirectory()
+        self.addCleanup(cache_directory.cleanup)
+        influxdb_profiles = self.esdl_helper.get_influxdb_profile_references(PV_INSTALLATION_IDS)
+        EsdlProfileStore(START_TIME, 3600, 900, profile_cache=ProfileCache(cache_directory.name)).load(influxdb_profiles)
+        influx_connector_class.return_value.query_arrays = MagicMock(side_effect=self._query_arrays)
+        profile_store = EsdlProfileStore(START_TIME, 3600, 900, profile_cache=ProfileCache(cache_directory.name))
+
+        # Execute
+        profile_store.load(influxdb_profiles)
+
+        # Assert
+        influx_connector_class.return_value.query_arrays.assert_called_once()
+        np.testing.assert_array_equal(profile_store.get_profile_values(PV_INSTALLATION_IDS[1], "temperature"), np.array([5.0, 5.0, 5.0, 5.0, 7.5]))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,17 +1,21 @@
 import base64
 from dataclasses import dataclass
-from datetime import datetime
+from datetime import datetime, timezone
+import threading
+import time
 from typing import List
 import unittest
-from unittest.mock import MagicMock, call, ANY
+from unittest.mock import MagicMock, call, ANY, patch
 
 from esdl import EnergySystem
 import helics as h
+import numpy as np
 
 from dots_infrastructure import CalculationServiceHelperFunctions, Common
-from dots_infrastructure.Constants import TimeRequestType
+from dots_infrastructure.Constants import CalculationMode, TimeRequestType
 from dots_infrastructure.DataClasses import CalculationServiceInput, CalculationServiceOutput, EsdlId, HelicsCalculationInformation, HelicsInitMessagesFederateInformation, PublicationDescription, SimulatorConfiguration, SubscriptionDescription, TimeStepInformation
-from dots_infrastructure.HelicsFederateHelpers import HelicsInitializationMessagesFederateExecutor, HelicsValueFederateExecutor, HelicsSimulationExecutor
+from dots_infrastructure.EsdlHelper import EsdlHelper
+from dots_infrastructure.HelicsFederateHelpers import HelicsInitializationMessagesFederateExecutor, HelicsMultiplexedValueFederateExecutor, HelicsValueFederateExecutor, HelicsSimulationExecutor
 from dots_infrastructure.Logger import LOGGER
 from dots_infrastructure.test_infra.HelicsMocks import HelicsEndpointMock, HelicsFederateMock
 
@@ -20,6 +24,25 @@ LOGGER.disabled = True
 def simulator_environment_e_logic_test():
     return SimulatorConfiguration("LogicTest", ["f006d594-0743-4de5-a589-a6c2350898da"], "Mock-LogicTest", "127.0.0.1", 2000, "test-id", 5, datetime(2024,1,1), "test-host", "test-port", "test-username", "test-password", "test-database-name", h.HelicsLogLevel.DEBUG, ["PVInstallation", "EConnection"])
 
+def create_calculation_information(**overrides) -> HelicsCalculationInformation:
+    calculation_information = dict(time_period_in_seconds=5,
+                                   offset=0,
+                                   wait_for_current_time_update=False,
+                                   uninterruptible=False,
+                                   terminate_on_error=True,
+                                   calculation_name="EConnectionSchedule",
+                                   inputs=[],
+                                   outputs=[],
+                                   calculation_function=MagicMock())
+    calculation_information.update(overrides)
+    return HelicsCalculationInformation(**calculation_information)
+
+def process_pool_calculation(param_dict : dict, simulation_time : datetime, time_step_number : TimeStepInformation, esdl_id : EsdlId, energy_system : EnergySystem):
+    return {"test-output" : f"{esdl_id}/{energy_system.id}"}
+
+def other_process_pool_calculation(param_dict : dict, simulation_time : datetime, time_step_number : TimeStepInformation, esdl_id : EsdlId, energy_system : EnergySystem):
+    return {"test-output" : f"{energy_system.name}/{esdl_id}"}
+
 @dataclass
 class TestDataClass:
     output1 : str
@@ -105,6 +128,8 @@ class TestLogicRunningSimulation(unittest.TestCase):
         self.fed_eneter_executing_mode = h.helicsFederateEnterExecutingMode
         self.get_time_property = h.helicsFederateGetTimeProperty 
         self.request_time = h.helicsFederateRequestTime
+        self.request_time_async = h.helicsFederateRequestTimeAsync
+        self.request_time_complete = h.helicsFederateRequestTimeComplete
         self.helics_endpoint_has_message = h.helicsEndpointHasMessage
         self.helics_message_get_bytes = h.helicsMessageGetBytes
         self.helics_endpoint_get_message = h.helicsEndpointGetMessage
@@ -141,6 +166,8 @@ class TestLogicRunningSimulation(unittest.TestCase):
         h.helicsFederateEnterExecutingMode = self.fed_eneter_executing_mode
         h.helicsFederateGetTimeProperty = self.get_time_property
         h.helicsFederateRequestTime = self.request_time
+        h.helicsFederateRequestTimeAsync = self.request_time_async
+        h.helicsFederateRequestTimeComplete = self.request_time_complete
         h.helicsEndpointHasMessage = self.helics_endpoint_has_message
         h.helicsMessageGetBytes = self.helics_message_get_bytes
         h.helicsCreateMessageFederate = self.helics_create_message_federate 
@@ -153,15 +180,7 @@ class TestLogicRunningSimulation(unittest.TestCase):
         Common.destroy_federate = self.common_destroy_federate
 
     def test_helics_simulation_loop_started_correctly(self):
-        calculation_information_schedule = HelicsCalculationInformation(time_period_in_seconds=5,
-                                                                        offset=0,
-                                                                        wait_for_current_time_update=False, 
-                                                                        uninterruptible=False, 
-                                                                        terminate_on_error=True, 
-                                                                        calculation_name="EConnectionSchedule", 
-                                                                        inputs=[], 
-                                                                        outputs=[], 
-                                                                        calculation_function=MagicMock(return_value=5))
+        calculation_information_schedule = create_calculation_information(calculation_function=MagicMock(return_value=5))
         self.federate_executor = HelicsValueFederateExecutor(calculation_information_schedule)
 
         # Execute
@@ -173,16 +192,7 @@ class TestLogicRunningSimulation(unittest.TestCase):
 
     def test_when_calculation_has_period_bigger_than_simulation_duration_then_exception_is_raised(self):
         # arrange
-        calculation_information_schedule = HelicsCalculationInformation(time_period_in_seconds=10,
-                                                                        offset=0,
-                                                                        wait_for_current_time_update=False, 
-                                                                        uninterruptible=False, 
-                                                                        terminate_on_error=True, 
-                                                                        calculation_name="EConnectionSchedule", 
-                                                                        inputs=[], 
-                                                                        outputs=[], 
-                                                                        calculation_function=MagicMock(return_value=5),
-                                                                        time_delta=0)
+        calculation_information_schedule = create_calculation_information(time_period_in_seconds=10, calculation_function=MagicMock(return_value=5), time_delta=0)
         
         executor = HelicsSimulationExecutor()
         executor.init_simulation = MagicMock()
@@ -193,18 +203,132 @@ class TestLogicRunningSimulation(unittest.TestCase):
         with self.assertRaises(RuntimeError):
             executor.start_simulation()
     
+    def test_when_loading_esdl_profiles_fails_then_simulation_continues_without_profiles(self):
+        # arrange
+        executor = HelicsSimulationExecutor()
+        esdl_helper = MagicMock()
+        esdl_helper.get_influxdb_profile_references = MagicMock(side_effect=ConnectionError("Test-exception"))
+
+        # Execute
+        executor._load_esdl_profiles(esdl_helper)
+
+        # Assert
+        esdl_helper.get_influxdb_profile_references.assert_called_once_with(executor.simulator_configuration.esdl_ids)
+        self.assertDictEqual(executor.esdl_profiles.profile_values, {})
+
+    def test_multiplexed_federate_info_is_valid_for_every_calculation(self):
+        # arrange
+        calculations = [
+            HelicsValueFederateExecutor(create_calculation_information(
+                time_period_in_seconds=10,
+                offset=4,
+                uninterruptible=True,
+                calculation_name="Calculation0",
+                time_delta=2)),
+            HelicsValueFederateExecutor(create_calculation_information(time_period_in_seconds=6, offset=2, calculation_name="Calculation1", time_delta=1)),
+        ]
+        multiplexed_executor = HelicsMultiplexedValueFederateExecutor(calculations, simulator_environment_e_logic_test())
+
+        # Execute
+        with patch.object(h, "helicsFederateInfoSetFlagOption") as set_flag_option, patch.object(h, "helicsFederateInfoSetTimeProperty") as set_time_property:
+            multiplexed_executor.init_multiplexed_federate_info()
+
+        # Assert
+        set_flag_option.assert_any_call(ANY, h.HelicsFederateFlag.UNINTERRUPTIBLE, False)
+        set_time_property.assert_any_call(ANY, h.HelicsProperty.TIME_PERIOD, 2)
+        set_time_property.assert_any_call(ANY, h.HelicsProperty.TIME_DELTA, 1)
+        set_time_property.assert_any_call(ANY, h.HelicsProperty.TIME_OFFSET, 2)
+
+    def test_multiplexed_calculation_with_inputs_is_not_executed_after_simulation_duration(self):
+        # arrange
+        calculation = HelicsValueFederateExecutor(create_calculation_information(
+            calculation_name="Calculation0",
+            inputs=[SubscriptionDescription("test-type", "test-input", "W", h.HelicsDataType.DOUBLE)],
+            time_request_type=TimeRequestType.ON_INPUT))
+        calculation.gather_new_inputs = MagicMock()
+        calculation.has_new_inputs = MagicMock(return_value=True)
+        calculation.execute_time_step = MagicMock(return_value=False)
+        multiplexed_executor = HelicsMultiplexedValueFederateExecutor([calculation], simulator_environment_e_logic_test())
+        granted_times = iter([3, 6])
+        h.helicsFederateRequestTime = MagicMock(side_effect=lambda federate, requested_time: next(granted_times, h.HELICS_TIME_MAXTIME))
+
+        # Execute
+        multiplexed_executor.enter_simulation_loop()
+
+        # Assert
+        calculation.execute_time_step.assert_called_once_with(ANY, ANY, 3)
+        self.assertEqual(h.helicsFederateRequestTime.call_count, 2)
+
+    def _create_simulation_executor_with_calculations(self, amount_of_calculations):
+        executor = HelicsSimulationExecutor()
+        executor.init_simulation = MagicMock()
+        executor.influx_connector = MagicMock()
+        for i in range(amount_of_calculations):
+            executor.add_calculation(create_calculation_information(calculation_name=f"Calculation{i}"))
+        return executor
+
+    def test_wait_for_completion_returns_as_soon_as_last_federate_finishes(self):
+        # arrange
+        executor = self._create_simulation_executor_with_calculations(2)
+        finish_last_federate = threading.Event()
+        executor.calculations[0].initialize_and_start_federate = MagicMock()
+        executor.calculations[1].initialize_and_start_federate = MagicMock(side_effect=lambda esdl_helper: finish_last_federate.wait(5))
+        executor.start_simulation()
+
+        # Execute
+        completed_before_last_federate_finished = executor.wait_for_completion(0.05)
+        finish_last_federate.set()
+        start = time.perf_counter()
+        completed = executor.wait_for_completion(5)
+        wait_duration = time.perf_counter() - start
+        executor.stop_simulation()
+
+        # Assert
+        self.assertFalse(completed_before_last_federate_finished)
+        self.assertTrue(completed)
+        self.assertLess(wait_duration, 0.5)
+        self.assertTrue(all(calculation.completion_future.done() for calculation in executor.calculations))
+
+    def test_when_federate_does_not_finish_within_timeout_then_stop_simulation_writes_output_and_reports_it(self):
+        # arrange
+        executor = self._create_simulation_executor_with_calculations(2)
+        finish_last_federate = threading.Event()
+        self.addCleanup(finish_last_federate.set)
+        executor.calculations[0].initialize_and_start_federate = MagicMock()
+        executor.calculations[1].initialize_and_start_federate = MagicMock(side_effect=lambda esdl_helper: finish_last_federate.wait(5))
+        executor.start_simulation()
+
+        # Execute
+        with self.assertRaises(TimeoutError) as raised:
+            executor.stop_simulation(0.05)
+
+        # Assert
+        self.assertIn("Calculation1", str(raised.exception))
+        self.assertNotIn("Calculation0", str(raised.exception))
+        executor.influx_connector.write_output.assert_called_once()
+        executor.influx_connector.stop_writer.assert_called_once()
+
+    def test_when_federate_thread_raises_outside_calculation_loop_then_stop_simulation_raises(self):
+        # arrange
+        executor = self._create_simulation_executor_with_calculations(2)
+        executor.calculations[0].initialize_and_start_federate = MagicMock()
+        executor.calculations[1].initialize_and_start_federate = MagicMock(side_effect=ValueError("federate could not be created"))
+        executor.start_simulation()
+
+        # Execute
+        with self.assertRaises(RuntimeError) as raised:
+            executor.stop_simulation()
+
+        # Assert
+        self.assertIsInstance(raised.exception.__cause__, ValueError)
+        self.assertTrue(executor.calculations[1].running_status.exception)
+        self.assertTrue(executor.calculations[1].running_status.terminated)
+        self.assertFalse(executor.calculations[0].running_status.exception)
+        executor.influx_connector.stop_writer.assert_called_once()
+
     def test_when_time_request_type_period_helicsFederateRequestTime_called_with_period(self):
         # arrange
-        calculation_information_schedule = HelicsCalculationInformation(time_period_in_seconds=5,
-                                                                        offset=0,
-                                                                        wait_for_current_time_update=False, 
-                                                                        uninterruptible=False, 
-                                                                        terminate_on_error=True, 
-                                                                        calculation_name="EConnectionSchedule", 
-                                                                        inputs=[], 
-                                                                        outputs=[], 
-                                                                        calculation_function=MagicMock(return_value=5),
-                                                                        time_delta=0)
+        calculation_information_schedule = create_calculation_information(calculation_function=MagicMock(return_value=5), time_delta=0)
         self.federate_executor = HelicsValueFederateExecutor(calculation_information_schedule)
 
         # Execute
@@ -213,19 +337,81 @@ class TestLogicRunningSimulation(unittest.TestCase):
         # Assert
         h.helicsFederateRequestTime.assert_has_calls([call(None, 5), call(None, 10)])
 
+    def test_when_asynchronous_time_requests_then_post_publish_work_runs_while_time_request_is_pending(self):
+        # arrange
+        calls = MagicMock()
+        calls.calculation_function = MagicMock(return_value={"test-output" : 7.0})
+        calls.helicsFederateRequestTimeAsync = MagicMock()
+        calls.set_time_step_data_points = MagicMock()
+        calls.post_time_step_function = MagicMock()
+        calls.helicsFederateRequestTimeComplete = MagicMock(side_effect=[10])
+        calculation_information_schedule = create_calculation_information(
+            outputs=[PublicationDescription(True, "test-type", "test-output", "W", h.HelicsDataType.DOUBLE, record=True)],
+            calculation_function=calls.calculation_function,
+            asynchronous_time_requests=True,
+            post_time_step_function=calls.post_time_step_function)
+        self.federate_executor = HelicsValueFederateExecutor(calculation_information_schedule)
+        esdl_id = "f006d594-0743-4de5-a589-a6c2350898da"
+        self.federate_executor.output_dict[esdl_id] = [CalculationServiceOutput(True, "test-type", "test-output", esdl_id, h.HelicsDataType.DOUBLE, "W", record=True)]
+        self.federate_executor.publish_helics_value = MagicMock()
+        self.federate_executor.influx_connector = MagicMock()
+        self.federate_executor.influx_connector.set_time_step_data_points = MagicMock(side_effect=calls.set_time_step_data_points)
+
+        h.helicsFederateRequestTimeAsync = calls.helicsFederateRequestTimeAsync
+        h.helicsFederateRequestTimeComplete = calls.helicsFederateRequestTimeComplete
+
+        # Execute
+        self.federate_executor.enter_simulation_loop()
+
+        # Assert
+        h.helicsFederateRequestTime.assert_called_once_with(None, 5)
+        self.assertListEqual([name for name, _, _ in calls.mock_calls], ["calculation_function", "helicsFederateRequestTimeAsync", "set_time_step_data_points", "post_time_step_function", "helicsFederateRequestTimeComplete"])
+        calls.helicsFederateRequestTimeAsync.assert_called_once_with(None, 10)
+        calls.post_time_step_function.assert_called_once_with(datetime(2024, 1, 1, 0, 0, 5), TimeStepInformation(1, 1), [esdl_id], None)
+
+    def test_when_post_time_step_function_raises_then_simulation_is_terminated(self):
+        # arrange
+        calculation_information_schedule = create_calculation_information(
+            time_period_in_seconds=2,
+            calculation_function=MagicMock(return_value={}),
+            post_time_step_function=MagicMock(side_effect=ValueError("Test-exception")))
+        self.federate_executor = HelicsValueFederateExecutor(calculation_information_schedule)
+
+        # Execute
+        self.federate_executor.enter_simulation_loop()
+
+        # Assert
+        calculation_information_schedule.calculation_function.assert_called_once()
+        self.assertTrue(self.federate_executor.running_status.exception)
+
+    def test_when_recording_outputs_raises_then_simulation_is_terminated(self):
+        # arrange
+        calculation_information_schedule = create_calculation_information(
+            time_period_in_seconds=2,
+            outputs=[PublicationDescription(True, "test-type", "test-output", "W", h.HelicsDataType.DOUBLE, record=True)],
+            calculation_function=MagicMock(return_value={"test-output" : 7.0}))
+        self.federate_executor = HelicsValueFederateExecutor(calculation_information_schedule)
+        esdl_id = "f006d594-0743-4de5-a589-a6c2350898da"
+        self.federate_executor.output_dict[esdl_id] = [CalculationServiceOutput(True, "test-type", "test-output", esdl_id, h.HelicsDataType.DOUBLE, "W", record=True)]
+        self.federate_executor.publish_helics_value = MagicMock()
+        self.federate_executor.influx_connector = MagicMock()
+        self.federate_executor.influx_connector.set_time_step_data_points = MagicMock(side_effect=TypeError("Test-exception"))
+
+        # Execute
+        self.federate_executor.enter_simulation_loop()
+
+        # Assert
+        calculation_information_schedule.calculation_function.assert_called_once()
+        self.federate_executor.influx_connector.set_time_step_data_points.assert_called_once_with(ANY, "EConnectionSchedule")
+        self.assertTrue(self.federate_executor.running_status.exception)
+
     def test_when_time_request_type_on_input_helicsFederateRequestTime_called_with_helics_max_time(self):
         # arrange
-        calculation_information_schedule = HelicsCalculationInformation(time_period_in_seconds=60,
-                                                                        offset=0,
-                                                                        wait_for_current_time_update=False, 
-                                                                        uninterruptible=False, 
-                                                                        terminate_on_error=True, 
-                                                                        calculation_name="EConnectionSchedule", 
-                                                                        inputs=[], 
-                                                                        outputs=[], 
-                                                                        calculation_function=MagicMock(return_value=5),
-                                                                        time_request_type=TimeRequestType.ON_INPUT,
-                                                                        time_delta=5)
+        calculation_information_schedule = create_calculation_information(
+            time_period_in_seconds=60,
+            calculation_function=MagicMock(return_value=5),
+            time_request_type=TimeRequestType.ON_INPUT,
+            time_delta=5)
         self.federate_executor = HelicsValueFederateExecutor(calculation_information_schedule)
 
         # Execute
@@ -236,17 +422,12 @@ class TestLogicRunningSimulation(unittest.TestCase):
 
     def test_when_time_request_type_period_and_has_offset_helicsFederateRequestTime_called_with_offset(self):
 
-        calculation_information_schedule = HelicsCalculationInformation(time_period_in_seconds=2,
-                                                                        offset=1,
-                                                                        wait_for_current_time_update=False, 
-                                                                        uninterruptible=False, 
-                                                                        terminate_on_error=True, 
-                                                                        calculation_name="EConnectionSchedule", 
-                                                                        inputs=[], 
-                                                                        outputs=[], 
-                                                                        calculation_function=MagicMock(return_value=5),
-                                                                        time_request_type=TimeRequestType.PERIOD,
-                                                                        time_delta=0)
+        calculation_information_schedule = create_calculation_information(
+            time_period_in_seconds=2,
+            offset=1,
+            calculation_function=MagicMock(return_value=5),
+            time_request_type=TimeRequestType.PERIOD,
+            time_delta=0)
         self.federate_executor = HelicsValueFederateExecutor(calculation_information_schedule)
 
         # Execute
@@ -259,15 +440,7 @@ class TestLogicRunningSimulation(unittest.TestCase):
 
         calculation_function = MagicMock()
         # arrange
-        calculation_information_schedule = HelicsCalculationInformation(time_period_in_seconds=5,
-                                                                        offset=0,
-                                                                        wait_for_current_time_update=False, 
-                                                                        uninterruptible=False, 
-                                                                        terminate_on_error=True, 
-                                                                        calculation_name="EConnectionSchedule", 
-                                                                        inputs=[], 
-                                                                        outputs=[], 
-                                                                        calculation_function=calculation_function)
+        calculation_information_schedule = create_calculation_information(calculation_function=calculation_function)
 
         self.federate_executor = HelicsValueFederateExecutor(calculation_information_schedule)
         inputs = [
@@ -297,15 +470,7 @@ class TestLogicRunningSimulation(unittest.TestCase):
     def test_calculation_is_executed_when_all_inputs_are_present(self):
         calculation_function = MagicMock()
         # arrange
-        calculation_information_schedule = HelicsCalculationInformation(time_period_in_seconds=5,
-                                                                        offset=0,
-                                                                        wait_for_current_time_update=False, 
-                                                                        uninterruptible=False, 
-                                                                        terminate_on_error=True, 
-                                                                        calculation_name="EConnectionSchedule", 
-                                                                        inputs=[], 
-                                                                        outputs=[], 
-                                                                        calculation_function=calculation_function)
+        calculation_information_schedule = create_calculation_information(calculation_function=calculation_function)
 
         self.federate_executor = HelicsValueFederateExecutor(calculation_information_schedule)
         test_input_key = "test-input-key"
@@ -329,18 +494,157 @@ class TestLogicRunningSimulation(unittest.TestCase):
         # Assert
         calculation_function.assert_called_once_with(param_dict, datetime(2024, 1, 1, 0, 0, 5), TimeStepInformation(1, 1), 'f006d594-0743-4de5-a589-a6c2350898da', None)
 
+    def test_calculation_is_executed_with_kept_value_when_input_keeping_last_value_is_not_updated(self):
+        calculation_function = MagicMock()
+        # arrange
+        calculation_information_schedule = create_calculation_information(
+            time_period_in_seconds=1,
+            inputs=[SubscriptionDescription("test-type", "test-input", "W", h.HelicsDataType.DOUBLE),
+                    SubscriptionDescription("test-type2", "test-input2", "W", h.HelicsDataType.DOUBLE, keep_last_value=True)],
+            calculation_function=calculation_function)
+
+        self.federate_executor = HelicsValueFederateExecutor(calculation_information_schedule)
+        inputs = [
+            CalculationServiceInput("test-type", "test-input", "test-input-id", "W", h.HelicsDataType.DOUBLE, "test-id", "test-input-key"),
+            CalculationServiceInput("test-type2", "test-input2", "test-input-id2", "W", h.HelicsDataType.DOUBLE, "test-id", "test-input-key2")
+        ]
+        self.federate_executor.input_dict["f006d594-0743-4de5-a589-a6c2350898da"] = inputs
+        self.federate_executor.all_inputs = inputs
+        kept_input_values = iter([3, None])
+        self.federate_executor.get_helics_value = MagicMock(side_effect=lambda helics_input: 5 if helics_input == inputs[0] else next(kept_input_values, None))
+
+        # Execute
+        self.federate_executor.enter_simulation_loop()
+
+        # Assert
+        self.assertEqual(calculation_function.call_count, 5)
+        for calculation_call in calculation_function.call_args_list:
+            self.assertDictEqual(calculation_call.args[0], {"test-input-key" : 5, "test-input-key2" : 3})
+
+    def test_calculation_with_only_kept_inputs_waits_for_an_updated_input(self):
+        calculation_function = MagicMock()
+        # arrange
+        calculation_information_schedule = create_calculation_information(
+            time_period_in_seconds=1,
+            inputs=[SubscriptionDescription("test-type", "test-input", "W", h.HelicsDataType.DOUBLE, keep_last_value=True)],
+            calculation_function=calculation_function,
+            time_request_type=TimeRequestType.ON_INPUT)
+
+        self.federate_executor = HelicsValueFederateExecutor(calculation_information_schedule)
+        inputs = [CalculationServiceInput("test-type", "test-input", "test-input-id", "W", h.HelicsDataType.DOUBLE, "test-id", "test-input-key")]
+        self.federate_executor.input_dict["f006d594-0743-4de5-a589-a6c2350898da"] = inputs
+        self.federate_executor.all_inputs = inputs
+        input_values = iter([5, None, 7])
+        self.federate_executor.get_helics_value = MagicMock(side_effect=lambda input: next(input_values, None))
+        granted_times = iter([1, 2, 3])
+        h.helicsFederateRequestTime = MagicMock(side_effect=lambda federate, requested_time: next(granted_times, 6))
+
+        # Execute
+        self.federate_executor.enter_simulation_loop()
+
+        # Assert
+        self.assertListEqual([calculation_call.args[1] for calculation_call in calculation_function.call_args_list], [datetime(2024, 1, 1, 0, 0, 1), datetime(2024, 1, 1, 0, 0, 3)])
+        self.assertListEqual([calculation_call.args[0]["test-input-key"] for calculation_call in calculation_function.call_args_list], [5, 7])
+
+    def test_adding_calculation_that_does_not_keep_the_last_value_of_a_deadband_output_raises(self):
+        # arrange
+        calculation_information_publisher = create_calculation_information(outputs=[PublicationDescription(True, "EConnection", "Schedule", "W", h.HelicsDataType.DOUBLE, absolute_tolerance=0.1)])
+        calculation_information_subscriber = create_calculation_information(
+            calculation_name="EConnectionDispatch",
+            inputs=[SubscriptionDescription("EConnection", "Schedule", "W", h.HelicsDataType.DOUBLE)])
+        simulation_executor = HelicsSimulationExecutor()
+        simulation_executor.add_calculation(calculation_information_publisher)
+
+        # Execute and assert
+        with self.assertRaisesRegex(ValueError, "keep_last_value"):
+            simulation_executor.add_calculation(calculation_information_subscriber)
+
+        calculation_information_subscriber.inputs = [SubscriptionDescription("EConnection", "Schedule", "W", h.HelicsDataType.DOUBLE, keep_last_value=True)]
+        self.assertEqual(len(simulation_executor.calculations), 1)
+        simulation_executor.add_calculation(calculation_information_subscriber)
+        self.assertEqual(len(simulation_executor.calculations), 2)
+
+    def test_output_values_within_tolerance_of_last_published_value_are_not_published_but_recorded(self):
+        calculation_function = MagicMock(side_effect=[{"test-output" : value} for value in [1.0, 1.05, 1.2, 1.12, 5.0]])
+        # arrange
+        calculation_information_schedule = create_calculation_information(
+            time_period_in_seconds=1,
+            outputs=[PublicationDescription(True, "test-type", "test-output", "W", h.HelicsDataType.DOUBLE, record=True, absolute_tolerance=0.1)],
+            calculation_function=calculation_function)
+
+        self.federate_executor = HelicsValueFederateExecutor(calculation_information_schedule)
+        esdl_id = "f006d594-0743-4de5-a589-a6c2350898da"
+        output = CalculationServiceOutput(True, "test-type", "test-output", esdl_id, h.HelicsDataType.DOUBLE, "W", record=True, absolute_tolerance=0.1)
+        self.federate_executor.output_dict[esdl_id] = [output]
+        self.federate_executor.publish_helics_value = MagicMock()
+        self.federate_executor.influx_connector = MagicMock()
+
+        # Execute
+        self.federate_executor.enter_simulation_loop()
+
+        # Assert
+        self.federate_executor.publish_helics_value.assert_has_calls([call(output, 1.0), call(output, 1.2), call(output, 5.0)])
+        self.assertEqual(self.federate_executor.publish_helics_value.call_count, 3)
+        self.assertEqual(self.federate_executor.influx_connector.set_time_step_data_points.call_count, 5)
+
+    def test_memoized_calculation_reuses_result_when_inputs_did_not_change(self):
+        calculation_function = MagicMock(side_effect=lambda param_dict, *args: {"test-output" : param_dict["test-input-key"] * 2})
+        # arrange
+        calculation_information_schedule = create_calculation_information(
+            time_period_in_seconds=1,
+            inputs=[SubscriptionDescription("test-type", "test-input", "W", h.HelicsDataType.DOUBLE)],
+            outputs=[PublicationDescription(True, "test-type", "test-output", "W", h.HelicsDataType.DOUBLE)],
+            calculation_function=calculation_function,
+            memoize=True)
+
+        self.federate_executor = HelicsValueFederateExecutor(calculation_information_schedule)
+        esdl_id = "f006d594-0743-4de5-a589-a6c2350898da"
+        inputs = [CalculationServiceInput("test-type", "test-input", "test-input-id", "W", h.HelicsDataType.DOUBLE, "test-id", "test-input-key")]
+        output = CalculationServiceOutput(True, "test-type", "test-output", esdl_id, h.HelicsDataType.DOUBLE, "W")
+        self.federate_executor.input_dict[esdl_id] = inputs
+        self.federate_executor.output_dict[esdl_id] = [output]
+        self.federate_executor.all_inputs = inputs
+        self.federate_executor.get_helics_value = MagicMock(side_effect=[5, 5, 5, 6, 6])
+        self.federate_executor.publish_helics_value = MagicMock()
+        self.federate_executor._init_calculation_cache()
+
+        # Execute
+        self.federate_executor.enter_simulation_loop()
+
+        # Assert
+        self.assertEqual(calculation_function.call_count, 2)
+        self.federate_executor.publish_helics_value.assert_has_calls([call(output, 10), call(output, 10), call(output, 10), call(output, 12), call(output, 12)])
+        self.assertEqual(self.federate_executor.calculation_cache.hits, 3)
+        self.assertEqual(self.federate_executor.calculation_cache.misses, 2)
+
+    def test_memoized_calculation_without_inputs_is_calculated_every_time_step(self):
+        calculation_function = MagicMock(side_effect=lambda param_dict, simulation_time, *args: {"test-output" : simulation_time.second})
+        # arrange
+        calculation_information_schedule = create_calculation_information(
+            time_period_in_seconds=1,
+            outputs=[PublicationDescription(True, "test-type", "test-output", "W", h.HelicsDataType.DOUBLE)],
+            calculation_function=calculation_function,
+            memoize=True)
+
+        self.federate_executor = HelicsValueFederateExecutor(calculation_information_schedule)
+        esdl_id = "f006d594-0743-4de5-a589-a6c2350898da"
+        output = CalculationServiceOutput(True, "test-type", "test-output", esdl_id, h.HelicsDataType.DOUBLE, "W")
+        self.federate_executor.output_dict[esdl_id] = [output]
+        self.federate_executor.publish_helics_value = MagicMock()
+        self.federate_executor._init_calculation_cache()
+
+        # Execute
+        self.federate_executor.enter_simulation_loop()
+
+        # Assert
+        self.assertEqual(calculation_function.call_count, 5)
+        self.federate_executor.publish_helics_value.assert_has_calls([call(output, 1), call(output, 2), call(output, 3), call(output, 4), call(output, 5)])
+        self.assertEqual(self.federate_executor.calculation_cache.hits, 0)
+
     def test_calculation_can_provide_dataclasses_as_output(self):
         calculation_function = MagicMock(return_value=TestDataClass(output1="test", output2=5, output3=[1, 2, 3]))
         # arrange
-        calculation_information_schedule = HelicsCalculationInformation(time_period_in_seconds=5,
-                                                                        offset=0,
-                                                                        wait_for_current_time_update=False, 
-                                                                        uninterruptible=False, 
-                                                                        terminate_on_error=True, 
-                                                                        calculation_name="EConnectionSchedule", 
-                                                                        inputs=[], 
-                                                                        outputs=[], 
-                                                                        calculation_function=calculation_function)
+        calculation_information_schedule = create_calculation_information(calculation_function=calculation_function)
 
         self.federate_executor = HelicsValueFederateExecutor(calculation_information_schedule)
         self.federate_executor._publish_outputs = MagicMock()
@@ -356,28 +660,169 @@ class TestLogicRunningSimulation(unittest.TestCase):
         }
         self.federate_executor._publish_outputs.assert_called_once_with('f006d594-0743-4de5-a589-a6c2350898da', expected_output_dict)
 
+    def test_batch_calculation_is_called_once_with_input_arrays_and_publishes_per_esdl_id(self):
+        calculation_function = MagicMock(return_value={"test-output" : np.array([7.0])})
+        # arrange
+        calculation_information_schedule = create_calculation_information(
+            inputs=[SubscriptionDescription("test-type", "test-input", "W", h.HelicsDataType.DOUBLE)],
+            outputs=[PublicationDescription(True, "test-type", "test-output", "W", h.HelicsDataType.DOUBLE)],
+            calculation_function=calculation_function,
+            calculation_mode=CalculationMode.BATCH)
+
+        self.federate_executor = HelicsValueFederateExecutor(calculation_information_schedule)
+        inputs = [
+            CalculationServiceInput("test-type", "test-input", "test-input-id", "W", h.HelicsDataType.DOUBLE, "test-id", "test-input-key"),
+            CalculationServiceInput("test-type", "test-input", "test-input-id2", "W", h.HelicsDataType.DOUBLE, "test-id", "test-input-key2")
+        ]
+        output = CalculationServiceOutput(True, "test-type", "test-output", "f006d594-0743-4de5-a589-a6c2350898da", h.HelicsDataType.DOUBLE, "W")
+        self.federate_executor.input_dict["f006d594-0743-4de5-a589-a6c2350898da"] = inputs
+        self.federate_executor.output_dict["f006d594-0743-4de5-a589-a6c2350898da"] = [output]
+        self.federate_executor.all_inputs = inputs
+        self.federate_executor.get_helics_value = MagicMock(return_value=5)
+        self.federate_executor.publish_helics_value = MagicMock()
+
+        # Execute
+        self.federate_executor.enter_simulation_loop()
+
+        # Assert
+        calculation_function.assert_called_once()
+        input_arrays, simulation_time, time_step_information, esdl_ids, energy_system = calculation_function.call_args.args
+        self.assertListEqual(list(input_arrays.keys()), ["test-input"])
+        self.assertEqual(input_arrays["test-input"][0], [5, 5])
+        self.assertEqual(simulation_time, datetime(2024, 1, 1, 0, 0, 5))
+        self.assertEqual(time_step_information, TimeStepInformation(1, 1))
+        self.assertListEqual(esdl_ids, ['f006d594-0743-4de5-a589-a6c2350898da'])
+        self.federate_executor.publish_helics_value.assert_called_once_with(output, 7.0)
+
+    def test_recorded_outputs_of_time_step_are_forwarded_to_connector_in_one_batch(self):
+        calculation_function = MagicMock(return_value={"test-output" : 7.0, "test-output2" : 3.0})
+        # arrange
+        calculation_information_schedule = create_calculation_information(
+            outputs=[PublicationDescription(True, "test-type", "test-output", "W", h.HelicsDataType.DOUBLE, record=True),
+                     PublicationDescription(True, "test-type", "test-output2", "W", h.HelicsDataType.DOUBLE)],
+            calculation_function=calculation_function)
+
+        self.federate_executor = HelicsValueFederateExecutor(calculation_information_schedule)
+        esdl_id = "f006d594-0743-4de5-a589-a6c2350898da"
+        self.federate_executor.output_dict[esdl_id] = [
+            CalculationServiceOutput(True, "test-type", "test-output", esdl_id, h.HelicsDataType.DOUBLE, "W", record=True),
+            CalculationServiceOutput(True, "test-type", "test-output2", esdl_id, h.HelicsDataType.DOUBLE, "W")
+        ]
+        self.federate_executor.publish_helics_value = MagicMock()
+        self.federate_executor.influx_connector = MagicMock()
+        recorded_data_points = []
+        self.federate_executor.influx_connector.set_time_step_data_points = MagicMock(side_effect=lambda data_points, calculation_name: recorded_data_points.append(list(zip(data_points.esdl_ids, data_points.output_names, data_points.timestamps, data_points.values))))
+
+        # Execute
+        self.federate_executor.enter_simulation_loop()
+
+        # Assert
+        self.assertEqual(self.federate_executor.publish_helics_value.call_count, 2)
+        self.assertListEqual(recorded_data_points, [[(esdl_id, "test-output", int(datetime(2024, 1, 1, 0, 0, 5).replace(tzinfo=timezone.utc).timestamp()), 7.0)]])
+        self.federate_executor.influx_connector.set_time_step_data_point.assert_not_called()
+
+    def test_process_pool_calculations_share_a_pool_with_energy_system_loaded_in_worker(self):
+        # arrange
+        calculation_information_schedule = create_calculation_information(
+            calculation_function=process_pool_calculation,
+            calculation_mode=CalculationMode.PROCESS_POOL,
+            process_pool_size=1)
+        calculation_information_dispatch = create_calculation_information(
+            calculation_name="EConnectionDispatch",
+            calculation_function=other_process_pool_calculation,
+            calculation_mode=CalculationMode.PROCESS_POOL,
+            process_pool_size=2)
+
+        esdl_helper = EsdlHelper(self.encoded_base64_esdl)
+        simulation_executor = HelicsSimulationExecutor()
+        simulation_executor.add_calculation(calculation_information_schedule)
+        simulation_executor.add_calculation(calculation_information_dispatch)
+
+        # Execute
+        simulation_executor._init_calculation_process_pool(esdl_helper)
+        for calculation in simulation_executor.calculations:
+            calculation._publish_outputs = MagicMock()
+            calculation.enter_simulation_loop()
+            calculation.finalize_simulation()
+        simulation_executor.calculation_process_pool.shutdown()
+
+        # Assert
+        esdl_id = 'f006d594-0743-4de5-a589-a6c2350898da'
+        self.assertEqual(simulation_executor.calculation_process_pool.max_workers, 2)
+        self.assertIs(simulation_executor.calculations[0].calculation_process_pool, simulation_executor.calculation_process_pool)
+        self.assertIs(simulation_executor.calculations[1].calculation_process_pool, simulation_executor.calculation_process_pool)
+        simulation_executor.calculations[0]._publish_outputs.assert_called_once_with(esdl_id, {"test-output" : f"{esdl_id}/{esdl_helper.energy_system.id}"})
+        simulation_executor.calculations[1]._publish_outputs.assert_called_once_with(esdl_id, {"test-output" : f"{esdl_helper.energy_system.name}/{esdl_id}"})
+        self.assertFalse(any(calculation.running_status.exception for calculation in simulation_executor.calculations))
+
+    def test_get_helics_value_calls_getter_bound_at_registration(self):
+        # arrange
+        calculation_information = create_calculation_information()
+        self.federate_executor = HelicsValueFederateExecutor(calculation_information)
+        helics_input = CalculationServiceInput("test-type", "test-input", "test-input-id", "W", h.HelicsDataType.DOUBLE, "test-id", "test-input-key", helics_input="test-sub")
+        helics_input.value_getter = MagicMock(return_value=5.0)
+
+        # Execute
+        with patch("dots_infrastructure.HelicsFederateHelpers.h.helicsInputIsUpdated", MagicMock(return_value=True)):
+            value = self.federate_executor.get_helics_value(helics_input)
+
+        # Assert
+        self.assertEqual(value, 5.0)
+        helics_input.value_getter.assert_called_once_with("test-sub")
+        self.assertIs(Common.get_helics_input_getter(h.HelicsDataType.VECTOR), h.helicsInputGetVector)
+        self.assertIs(Common.get_helics_publication_publisher(h.HelicsDataType.VECTOR), h.helicsPublicationPublishVector)
+
+    def test_input_shared_by_esdl_ids_is_set_for_all_of_them_and_counted_once(self):
+        # arrange
+        calculation_information = create_calculation_information()
+        self.federate_executor = HelicsValueFederateExecutor(calculation_information)
+        self.federate_executor.simulator_configuration.esdl_ids = ["esdl-id-1", "esdl-id-2"]
+        shared_input = CalculationServiceInput("test-type", "test-input", "test-input-id", "W", h.HelicsDataType.DOUBLE, "esdl-id-1", "test-input-key")
+        other_input = CalculationServiceInput("test-type", "test-input", "test-input-id2", "W", h.HelicsDataType.DOUBLE, "esdl-id-2", "test-input-key2")
+        self.federate_executor.input_dict = {"esdl-id-1" : [shared_input], "esdl-id-2" : [shared_input, other_input]}
+        self.federate_executor.all_inputs = [shared_input, other_input]
+        calculation_params = self.federate_executor.init_calculation_params()
+        self.federate_executor.init_esdl_ids_per_sub_key()
+        self.federate_executor.reset_received_inputs()
+
+        # Execute
+        self.federate_executor._set_input_value(calculation_params, "test-input-key", 1.0)
+        self.federate_executor._set_input_value(calculation_params, "test-input-key", 2.0)
+
+        # Assert
+        self.assertEqual(self.federate_executor.amount_of_outstanding_inputs, 1)
+        self.assertDictEqual(calculation_params, {"esdl-id-1" : {"test-input-key" : 2.0}, "esdl-id-2" : {"test-input-key" : 2.0, "test-input-key2" : None}})
+
+    def test_duplicate_subscriptions_are_replaced_by_registered_input(self):
+        # arrange
+        calculation_information = create_calculation_information()
+        self.federate_executor = HelicsValueFederateExecutor(calculation_information)
+        registered_input = CalculationServiceInput("test-type", "test-input", "test-input-id", "W", h.HelicsDataType.DOUBLE, "esdl-id-1", "test-input-key")
+        inputs = {registered_input.helics_sub_key : registered_input}
+        inputs_for_esdl_object = [
+            CalculationServiceInput("test-type", "test-input", "test-input-id", "W", h.HelicsDataType.DOUBLE, "esdl-id-2", "test-input-key"),
+            CalculationServiceInput("test-type", "test-input", "test-input-id2", "W", h.HelicsDataType.DOUBLE, "esdl-id-2", "test-input-key2")
+        ]
+
+        # Execute
+        self.federate_executor.remove_duplicate_subscriptions_and_update_inputs(inputs, inputs_for_esdl_object)
+
+        # Assert
+        self.assertIs(inputs_for_esdl_object[0], registered_input)
+        self.assertListEqual(list(inputs.keys()), ["test-input-key", "test-input-key2"])
+        self.assertIs(inputs["test-input-key2"], inputs_for_esdl_object[1])
+
     def test_add_calculation_sets_correct_delta_and_period_values(self):
         calculation_function = MagicMock()
         # arrange
-        calculation_information_schedule = HelicsCalculationInformation(time_period_in_seconds=5,
-                                                                        offset=0,
-                                                                        wait_for_current_time_update=False, 
-                                                                        uninterruptible=False, 
-                                                                        terminate_on_error=True, 
-                                                                        calculation_name="EConnectionSchedule", 
-                                                                        inputs=[CalculationServiceInput("test-type", "test-input", "test-input-id", "W", h.HelicsDataType.DOUBLE, "test-id", "test-input-key"),], 
-                                                                        outputs=[], 
-                                                                        calculation_function=calculation_function)
+        calculation_information_schedule = create_calculation_information(
+            inputs=[CalculationServiceInput("test-type", "test-input", "test-input-id", "W", h.HelicsDataType.DOUBLE, "test-id", "test-input-key"),],
+            calculation_function=calculation_function)
         
-        calculation_information_dispatch = HelicsCalculationInformation(time_period_in_seconds=5,
-                                                                        offset=0,
-                                                                        wait_for_current_time_update=False, 
-                                                                        uninterruptible=False, 
-                                                                        terminate_on_error=True, 
-                                                                        calculation_name="EConnectionDispatch", 
-                                                                        inputs=[], 
-                                                                        outputs=[CalculationServiceOutput(True, "test-type", "test-output", "test-output-id", h.HelicsDataType.DOUBLE, "W")], 
-                                                                        calculation_function=calculation_function)
+        calculation_information_dispatch = create_calculation_information(
+            calculation_name="EConnectionDispatch",
+            outputs=[CalculationServiceOutput(True, "test-type", "test-output", "test-output-id", h.HelicsDataType.DOUBLE, "W")],
+            calculation_function=calculation_function)
 
         simulation_executor = HelicsSimulationExecutor()
 
@@ -396,6 +841,34 @@ class TestLogicRunningSimulation(unittest.TestCase):
         self.assertEqual(simulation_executor.calculations[1].helics_value_federate_info.time_period_in_seconds, 5)
         self.assertEqual(simulation_executor.calculations[1].helics_value_federate_info.federate_time_period, 5)
 
+    def test_federates_connect_to_broker_address_unless_core_is_in_process(self):
+        # arrange
+        calculation_executor = HelicsValueFederateExecutor(create_calculation_information(calculation_name="Calculation0"))
+
+        for core_type, broker_address_set in [(h.HelicsCoreType.IPC, True), (h.HelicsCoreType.INTERPROCESS, True), (h.HelicsCoreType.INPROC, False)]:
+            calculation_executor.simulator_configuration.helics_core_type = core_type
+
+            # Execute
+            with patch.object(h, "helicsFederateInfoSetBroker") as set_broker, patch.object(h, "helicsFederateInfoSetCoreType") as set_core_type:
+                calculation_executor.init_value_federate_info()
+
+            # Assert
+            self.assertEqual(set_broker.called, broker_address_set)
+            set_core_type.assert_called_once_with(ANY, core_type)
+
+    def test_initialization_federate_uses_networked_core_when_calculations_use_in_process_core(self):
+        # arrange
+        esdl_message_federate = HelicsInitializationMessagesFederateExecutor(HelicsInitMessagesFederateInformation('esdl', 'amount_of_calculations'))
+        esdl_message_federate.simulator_configuration.helics_core_type = h.HelicsCoreType.INPROC
+
+        # Execute
+        with patch.object(h, "helicsFederateInfoSetBroker") as set_broker, patch.object(h, "helicsFederateInfoSetCoreType") as set_core_type:
+            esdl_message_federate.init_federate()
+
+        # Assert
+        set_broker.assert_called_once_with(ANY, "127.0.0.1")
+        set_core_type.assert_called_once_with(ANY, h.HelicsCoreType.ZMQ)
+
     def test_given_waiting_for_esdl_when_full_esdl_is_received_esdl_helper_is_correctly_constructed(self):
         # arrange
         esdl_message_federate = HelicsInitializationMessagesFederateExecutor(HelicsInitMessagesFederateInformation('esdl', 'amount_of_calculations'))
@@ -442,25 +915,14 @@ class TestLogicRunningSimulation(unittest.TestCase):
         calculation_function = MagicMock()
 
         # arrange
-        calculation_information_schedule = HelicsCalculationInformation(time_period_in_seconds=5,
-                                                                        offset=0,
-                                                                        wait_for_current_time_update=False, 
-                                                                        uninterruptible=False, 
-                                                                        terminate_on_error=True, 
-                                                                        calculation_name="EConnectionSchedule", 
-                                                                        inputs=[CalculationServiceInput("test-type", "test-input", "test-input-id", "W", h.HelicsDataType.DOUBLE, "test-id", "test-input-key"),], 
-                                                                        outputs=[], 
-                                                                        calculation_function=calculation_function)
+        calculation_information_schedule = create_calculation_information(
+            inputs=[CalculationServiceInput("test-type", "test-input", "test-input-id", "W", h.HelicsDataType.DOUBLE, "test-id", "test-input-key"),],
+            calculation_function=calculation_function)
         
-        calculation_information_dispatch = HelicsCalculationInformation(time_period_in_seconds=5,
-                                                                        offset=0,
-                                                                        wait_for_current_time_update=False, 
-                                                                        uninterruptible=False, 
-                                                                        terminate_on_error=True, 
-                                                                        calculation_name="EConnectionDispatch", 
-                                                                        inputs=[], 
-                                                                        outputs=[CalculationServiceOutput(True, "test-type", "test-output", "test-output-id", h.HelicsDataType.DOUBLE, "W")], 
-                                                                        calculation_function=calculation_function)
+        calculation_information_dispatch = create_calculation_information(
+            calculation_name="EConnectionDispatch",
+            outputs=[CalculationServiceOutput(True, "test-type", "test-output", "test-output-id", h.HelicsDataType.DOUBLE, "W")],
+            calculation_function=calculation_function)
         simulation_executor = HelicsSimulationExecutor()
         simulation_executor.add_calculation(calculation_information_schedule)
         simulation_executor.add_calculation(calculation_information_dispatch)
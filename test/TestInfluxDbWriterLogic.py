@@ -1,18 +1,34 @@
-from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+import gzip
+import json
+import os
+import tempfile
 import unittest
 from unittest.mock import MagicMock, call
 import uuid
 
 from esdl import Battery
 from influxdb import InfluxDBClient
+from influxdb.exceptions import InfluxDBClientError
+from influxdb.line_protocol import make_line
+import numpy as np
+try:
+    import pandas as pd
+except ImportError:
+    pd = None
 from dots_infrastructure.test_infra.InfluxDBClientMock import InfluxDBClientMock
 
+from dots_infrastructure.Constants import RecordingAggregation
+from dots_infrastructure.DataClasses import RecordingPolicy
 from dots_infrastructure.influxdb_connector import InfluxDBConnector
+from dots_infrastructure.result_sink import ColumnarPointBuffer, ResultSink, get_epoch_seconds
+from dots_infrastructure.spill_buffer import SpillBuffer
 
 class TestInfluxDBWriterLogic(unittest.TestCase):
 
     def setUp(self):
-        self.influx_connector = InfluxDBConnector("test-host", "test-port", "test-user", "test-pwd", "test-db-name")
+        self.influx_connector = InfluxDBConnector("test-host", "test-port", "test-user", "test-pwd", "test-db-name", gzip_compression_level=0)
         self.influx_connector.connect = MagicMock(return_value=InfluxDBClientMock())
 
     def test_writing_to_influx_happens_in_chunks(self):
@@ -25,26 +41,410 @@ class TestInfluxDBWriterLogic(unittest.TestCase):
         self.influx_connector.init_profile_output_data("test-sim-id", "test-model-id", "Battery", {test_battery_id : battery})
         data_items = []
         for i in range(0,200100):
-            self.influx_connector.set_time_step_data_point(test_battery_id, "test-output", datetime(2024,1,1), i)
-            data_items.append({
-                "measurement": "Battery",
-                "tags": {
-                    "simulation_id": "test-sim-id",
-                    "model_id": "test-model-id",
-                    "esdl_id": test_battery_id,
-                    "esdl_name": 'battery_test',
-                },
-                "time": datetime(2024,1,1),
-                "fields": {"test-output" : i},
-            })
+            self.influx_connector.set_time_step_data_point(test_battery_id, "test-output", datetime(2024,1,1) + timedelta(seconds=i), i)
+            data_items.append(make_line("Battery", {"simulation_id": "test-sim-id", "model_id": "test-model-id", "esdl_id": test_battery_id, "esdl_name": 'battery_test'}, {"test-output" : i}, datetime(2024,1,1) + timedelta(seconds=i), "s") + "\n")
 
         # Execute
         self.influx_connector.write_output()
 
         # Assert
-        calls = [call(data_items[0:100000], database="test-db-name", time_precision="s"), call(data_items[100000:200000], database="test-db-name", time_precision="s"), call(data_items[200000:200100], database="test-db-name", time_precision="s")]
-        self.influx_connector.client.write_points.assert_has_calls(calls)
+        calls = [self._line_protocol_write_call(data_items[0:100000]), self._line_protocol_write_call(data_items[100000:200000]), self._line_protocol_write_call(data_items[200000:200100])]
+        self.influx_connector.client.request.assert_has_calls(calls)
+        self.influx_connector.client.write_points.assert_not_called()
 
+    def _line_protocol_write_call(self, lines):
+        return call(url="write", method="POST", params={"db": "test-db-name", "precision": "s"}, data="".join(lines).encode("utf-8"), expected_response_code=204, headers={"Content-Type": "application/octet-stream"})
+
+    def test_data_points_from_multiple_threads_are_written_by_writer_thread(self):
+        # Arrange
+        battery_ids = [str(uuid.uuid4()) for _ in range(4)]
+        batteries = {battery_id : Battery(name=f'battery_{i}', id=battery_id) for i, battery_id in enumerate(battery_ids)}
+        self.influx_connector.init_profile_output_data("test-sim-id", "test-model-id", "Battery", batteries)
+        amount_of_data_points_per_thread = 25005
+
+        def write_data_points(battery_id):
+            for i in range(amount_of_data_points_per_thread):
+                self.influx_connector.set_time_step_data_point(battery_id, "test-output", datetime(2024,1,1) + timedelta(seconds=i), i)
+
+        # Execute
+        with ThreadPoolExecutor(len(battery_ids)) as executor:
+            list(executor.map(write_data_points, battery_ids))
+        self.influx_connector.write_output()
+        self.influx_connector.stop_writer()
+
+        # Assert
+        written_lines = [line for written_call in self.influx_connector.client.request.call_args_list for line in written_call.kwargs["data"].decode("utf-8").splitlines()]
+        self.assertEqual(len(written_lines), len(battery_ids) * amount_of_data_points_per_thread)
+        for battery_id in battery_ids:
+            values = [int(line.split("test-output=")[1].split("i ")[0]) for line in written_lines if f"esdl_id={battery_id}," in line]
+            self.assertListEqual(values, list(range(amount_of_data_points_per_thread)))
+        self.assertIsNone(self.influx_connector.writer_thread)
+
+    def test_outputs_of_esdl_id_with_same_timestamp_are_merged_into_one_point(self):
+        # Arrange
+        test_battery_id = str(uuid.uuid4())
+        battery = Battery(name='battery_test', id=test_battery_id)
+        self.influx_connector.init_profile_output_data("test-sim-id", "test-model-id", "Battery", {test_battery_id : battery})
+        expected_lines = []
+        for i in range(3):
+            simulation_datetime = datetime(2024,1,1) + timedelta(seconds=900 * i)
+            self.influx_connector.set_time_step_data_point(test_battery_id, "active_power", simulation_datetime, 1.5 * i)
+            self.influx_connector.set_time_step_data_point(test_battery_id, "reactive_power", simulation_datetime, 0.5 * i)
+            self.influx_connector.set_time_step_data_point(test_battery_id, "state_of_charge", simulation_datetime, i)
+            expected_lines.append(make_line("Battery", {"simulation_id": "test-sim-id", "model_id": "test-model-id", "esdl_id": test_battery_id, "esdl_name": 'battery_test'}, {"active_power" : 1.5 * i, "reactive_power" : 0.5 * i, "state_of_charge" : i}, simulation_datetime, "s") + "\n")
+
+        # Execute
+        self.influx_connector.write_output()
+
+        # Assert
+        self.influx_connector.client.request.assert_called_once_with(**self._line_protocol_write_call(expected_lines).kwargs)
+
+    def test_numpy_scalars_are_written_as_by_influxdb_client(self):
+        # Arrange
+        test_battery_id = str(uuid.uuid4())
+        self.influx_connector.init_profile_output_data("test-sim-id", "test-model-id", "Battery", {test_battery_id : Battery(name='battery_test', id=test_battery_id)})
+        simulation_datetime = datetime(2024,1,1)
+        fields = {"float64" : np.float64(1.5), "float32" : np.float32(0.25), "int64" : np.int64(3), "int" : 3}
+        for output_name, value in fields.items():
+            self.influx_connector.set_time_step_data_point(test_battery_id, output_name, simulation_datetime, value)
+        self.influx_connector.set_time_step_data_point(test_battery_id, "bool", simulation_datetime, np.bool_(True))
+        expected_line = make_line("Battery", {"simulation_id": "test-sim-id", "model_id": "test-model-id", "esdl_id": test_battery_id, "esdl_name": 'battery_test'}, fields, simulation_datetime, "s")
+
+        # Execute
+        self.influx_connector.write_output()
+
+        # Assert
+        written_line = self.influx_connector.client.request.call_args.kwargs["data"].decode("utf-8")
+        written_fields = dict(field.split("=") for field in written_line.split(" ")[1].split(","))
+        expected_fields = dict(field.split("=") for field in expected_line.split(" ")[1].split(","))
+        self.assertDictEqual(written_fields, {**expected_fields, "bool" : "True"})
+        self.assertDictEqual(expected_fields, {"float64" : "1.5", "float32" : "0.25", "int64" : "3.0", "int" : "3i"})
+
+    def test_bytes_values_are_written_as_text_like_influxdb_client(self):
+        # Arrange
+        test_battery_id = str(uuid.uuid4())
+        self.influx_connector.init_profile_output_data("test-sim-id", "test-model-id", "Battery", {test_battery_id : Battery(name='battery_test', id=test_battery_id)})
+        simulation_datetime = datetime(2024,1,1)
+        self.influx_connector.set_time_step_data_point(test_battery_id, "state", simulation_datetime, b'charging "fast"')
+        expected_line = make_line("Battery", {"simulation_id": "test-sim-id", "model_id": "test-model-id", "esdl_id": test_battery_id, "esdl_name": 'battery_test'}, {"state" : b'charging "fast"'}, simulation_datetime, "s")
+
+        # Execute
+        self.influx_connector.write_output()
+
+        # Assert
+        written_line = self.influx_connector.client.request.call_args.kwargs["data"].decode("utf-8")
+        self.assertEqual(written_line.split(" ", 1)[1], expected_line.split(" ", 1)[1] + "\n")
+
+    def test_unsupported_values_are_rejected_when_data_point_is_added(self):
+        # Arrange
+        test_battery_id = str(uuid.uuid4())
+        self.influx_connector.init_profile_output_data("test-sim-id", "test-model-id", "Battery", {test_battery_id : Battery(name='battery_test', id=test_battery_id)})
+        data_points = ColumnarPointBuffer()
+        data_points.append(test_battery_id, "test-output", 0, {"value" : 1.0})
+
+        # Execute / Assert
+        with self.assertRaises(TypeError):
+            self.influx_connector.set_time_step_data_point(test_battery_id, "test-output", datetime(2024,1,1), [1.0, 2.0])
+        with self.assertRaises(TypeError):
+            self.influx_connector.set_time_step_data_points(data_points)
+        self.assertEqual(len(self.influx_connector._get_staging_buffer().data_points), 0)
+
+    def test_line_prefixes_are_rendered_up_front_for_esdl_ids_of_service_only(self):
+        # Arrange
+        batteries = {battery_id : Battery(name=f'battery_{battery_id}', id=battery_id) for battery_id in ["battery-1", "battery-2"]}
+
+        # Execute
+        self.influx_connector.init_profile_output_data("test-sim-id", "test-model-id", "Battery", batteries, ["battery-1"])
+
+        # Assert
+        self.assertListEqual(list(self.influx_connector.line_prefixes), ["battery-1"])
+        self.assertEqual(self.influx_connector.get_line_prefix("battery-2"), "Battery,esdl_id=battery-2,esdl_name=battery_battery-2,model_id=test-model-id,simulation_id=test-sim-id")
+
+    def test_data_points_are_spilled_to_disk_and_replayed_when_influx_recovers(self):
+        # Arrange
+        spill_directory = tempfile.TemporaryDirectory()
+        self.addCleanup(spill_directory.cleanup)
+        influx_connector = InfluxDBConnector("test-host", "test-port", "test-user", "test-pwd", "test-db-name", spill_directory=spill_directory.name, spill_threshold_bytes=0, gzip_compression_level=0)
+        influx_connector.connect = MagicMock(return_value=InfluxDBClientMock())
+        influx_connector.RETRY_BACKOFF_INITIAL_SECONDS = 0.0
+        test_battery_id = str(uuid.uuid4())
+        influx_connector.init_profile_output_data("test-sim-id", "test-model-id", "Battery", {test_battery_id : Battery(name='battery_test', id=test_battery_id)})
+        influx_available = False
+        written_data = []
+        def request(**kwargs):
+            if not influx_available:
+                raise ConnectionError("influx db unreachable")
+            written_data.append(kwargs["data"])
+        influx_connector.connect.return_value.request.side_effect = request
+        expected_lines = []
+        for i in range(250000):
+            influx_connector.set_time_step_data_point(test_battery_id, "test-output", datetime(2024,1,1) + timedelta(seconds=i), i)
+            expected_lines.append(make_line("Battery", {"simulation_id": "test-sim-id", "model_id": "test-model-id", "esdl_id": test_battery_id, "esdl_name": 'battery_test'}, {"test-output" : i}, datetime(2024,1,1) + timedelta(seconds=i), "s") + "\n")
+
+        # Execute
+        influx_connector.write_output()
+        spilled_chunks = len(influx_connector.spill_buffer)
+        segment_files = os.listdir(spill_directory.name)
+        influx_available = True
+        influx_connector.stop_writer()
+
+        # Assert
+        self.assertEqual(spilled_chunks, 3)
+        self.assertEqual(influx_connector.spill_buffer.bytes_in_memory, 0)
+        self.assertEqual(len(segment_files), 1)
+        self.assertEqual(b"".join(written_data), "".join(expected_lines).encode("utf-8"))
+        self.assertEqual(len(written_data), 3)
+        self.assertListEqual(os.listdir(spill_directory.name), [])
+
+    def _write_chunks_with_responses(self, responses):
+        influx_connector = InfluxDBConnector("test-host", "test-port", "test-user", "test-pwd", "test-db-name", spill_threshold_bytes=0, gzip_compression_level=0)
+        influx_connector.connect = MagicMock(return_value=InfluxDBClientMock())
+        influx_connector.RETRY_BACKOFF_INITIAL_SECONDS = 0.0
+        influx_connector.init_profile_output_data("test-sim-id", "test-model-id", "Battery", {"battery-1" : Battery(name='battery_test', id="battery-1")})
+        written_data = []
+        def request(**kwargs):
+            response = responses.pop(0)
+            if isinstance(response, Exception):
+                raise response
+            written_data.append(kwargs["data"])
+        influx_connector.connect.return_value.request.side_effect = request
+        for i, value in enumerate(["rejected", 2.0]):
+            data_points = ColumnarPointBuffer()
+            data_points.append("battery-1", "test-output", 1704067200 + i, value)
+            influx_connector.write_data_points(data_points)
+        return influx_connector, written_data
+
+    def test_chunk_rejected_by_influx_is_dropped_and_later_chunks_are_written(self):
+        # Execute
+        influx_connector, written_data = self._write_chunks_with_responses([InfluxDBClientError("field type conflict", 400), None])
+
+        # Assert
+        self.assertEqual(len(written_data), 1)
+        self.assertIn(b"test-output=2.0", written_data[0])
+        self.assertEqual(len(influx_connector.spill_buffer), 0)
+        self.assertEqual(influx_connector.rejected_chunks, 1)
+
+    def test_spilled_chunk_rejected_by_influx_on_replay_is_dropped(self):
+        # Execute
+        influx_connector, written_data = self._write_chunks_with_responses([ConnectionError("influx db unreachable"), InfluxDBClientError("field type conflict", 400), None])
+
+        # Assert
+        self.assertEqual(len(written_data), 1)
+        self.assertIn(b"test-output=2.0", written_data[0])
+        self.assertEqual(len(influx_connector.spill_buffer), 0)
+        self.assertEqual(influx_connector.rejected_chunks, 1)
+
+    def _take_all_chunks(self, spill_buffer):
+        chunks = []
+        while len(spill_buffer) > 0:
+            chunks.append(spill_buffer.peek())
+            spill_buffer.pop()
+        return chunks
+
+    def test_spill_buffer_does_not_append_to_segments_of_earlier_run(self):
+        # Arrange
+        spill_directory = tempfile.TemporaryDirectory()
+        self.addCleanup(spill_directory.cleanup)
+        earlier_run_buffer = SpillBuffer(spill_directory.name, memory_threshold_bytes=0)
+        earlier_run_buffer.append(b"old-run-chunk")
+        earlier_run_buffer.close()
+        earlier_run_segments = os.listdir(spill_directory.name)
+
+        # Execute
+        spill_buffer = SpillBuffer(spill_directory.name, memory_threshold_bytes=0)
+        spill_buffer.append(b"new-chunk-1")
+        spill_buffer.append(b"new-chunk-2")
+        chunks = self._take_all_chunks(spill_buffer)
+
+        # Assert
+        self.assertListEqual(chunks, [b"new-chunk-1", b"new-chunk-2"])
+        self.assertListEqual(os.listdir(spill_directory.name), earlier_run_segments)
+
+    def test_spill_buffer_recovers_segments_of_earlier_run_before_new_chunks(self):
+        # Arrange
+        spill_directory = tempfile.TemporaryDirectory()
+        self.addCleanup(spill_directory.cleanup)
+        earlier_run_buffer = SpillBuffer(spill_directory.name, memory_threshold_bytes=0)
+        earlier_run_buffer.append(b"old-run-chunk")
+        earlier_run_buffer.close()
+        with open(os.path.join(spill_directory.name, os.listdir(spill_directory.name)[0]), "ab") as segment:
+            segment.write(SpillBuffer.RECORD_HEADER.pack(100) + b"incomplete")
+
+        # Execute
+        spill_buffer = SpillBuffer(spill_directory.name, memory_threshold_bytes=0, recover_existing_segments=True)
+        spill_buffer.append(b"new-chunk-1")
+        chunks = self._take_all_chunks(spill_buffer)
+
+        # Assert
+        self.assertListEqual(chunks, [b"old-run-chunk", b"new-chunk-1"])
+        self.assertListEqual(os.listdir(spill_directory.name), [])
+
+    def test_write_requests_are_gzip_compressed_in_configured_chunks(self):
+        # Arrange
+        influx_connector = InfluxDBConnector("test-host", "test-port", "test-user", "test-pwd", "test-db-name", chunk_size=1000, gzip_compression_level=1)
+        influx_connector.connect = MagicMock(return_value=InfluxDBClientMock())
+        test_battery_id = str(uuid.uuid4())
+        influx_connector.init_profile_output_data("test-sim-id", "test-model-id", "Battery", {test_battery_id : Battery(name='battery_test', id=test_battery_id)})
+        expected_lines = []
+        for i in range(2500):
+            influx_connector.set_time_step_data_point(test_battery_id, "test-output", datetime(2024,1,1) + timedelta(seconds=i), i)
+            expected_lines.append(make_line("Battery", {"simulation_id": "test-sim-id", "model_id": "test-model-id", "esdl_id": test_battery_id, "esdl_name": 'battery_test'}, {"test-output" : i}, datetime(2024,1,1) + timedelta(seconds=i), "s") + "\n")
+
+        # Execute
+        influx_connector.write_output()
+        influx_connector.stop_writer()
+
+        # Assert
+        request_calls = influx_connector.client.request.call_args_list
+        self.assertEqual(len(request_calls), 3)
+        for request_call in request_calls:
+            self.assertEqual(request_call.kwargs["headers"]["Content-Encoding"], "gzip")
+        self.assertListEqual([gzip.decompress(request_call.kwargs["data"]) for request_call in request_calls], ["".join(expected_lines[i:i + 1000]).encode("utf-8") for i in range(0, 2500, 1000)])
+        influx_connector.connect.assert_called_once()
+
+    def test_client_is_replaced_when_health_check_fails(self):
+        # Arrange
+        influx_connector = InfluxDBConnector("test-host", "test-port", "test-user", "test-pwd", "test-db-name", gzip_compression_level=0, health_check_interval=0.0)
+        unhealthy_client = InfluxDBClientMock()
+        unhealthy_client.ping.side_effect = ConnectionError("influx db unreachable")
+        healthy_client = InfluxDBClientMock()
+        influx_connector.connect = MagicMock(side_effect=[unhealthy_client, healthy_client])
+
+        # Execute
+        influx_connector.write_line_protocol(b"first")
+        influx_connector.write_line_protocol(b"second")
+        influx_connector.write_line_protocol(b"third")
+
+        # Assert
+        self.assertEqual(influx_connector.connect.call_count, 2)
+        unhealthy_client.close.assert_called_once()
+        self.assertListEqual([request_call.kwargs["data"] for request_call in unhealthy_client.request.call_args_list], [b"first"])
+        self.assertListEqual([request_call.kwargs["data"] for request_call in healthy_client.request.call_args_list], [b"second", b"third"])
+        healthy_client.ping.assert_called_once()
+
+    def test_outputs_with_recording_policy_are_aggregated_before_writing(self):
+        # Arrange
+        battery_ids = [str(uuid.uuid4()) for _ in range(2)]
+        self.influx_connector.init_profile_output_data("test-sim-id", "test-model-id", "Battery", {battery_id : Battery(name=f'battery_{i}', id=battery_id) for i, battery_id in enumerate(battery_ids)})
+        self.influx_connector.set_recording_policy("active_power", RecordingPolicy(RecordingAggregation.MEAN, window_in_seconds=900))
+        self.influx_connector.set_recording_policy("temperature", RecordingPolicy(RecordingAggregation.MAX, window_in_seconds=900))
+        self.influx_connector.set_recording_policy("state", RecordingPolicy(RecordingAggregation.LAST, window_in_seconds=1800))
+        self.influx_connector.set_recording_policy("state_of_charge", RecordingPolicy(RecordingAggregation.EVERY_NTH, every_nth=10))
+        written_data_points = ColumnarPointBuffer()
+        self.influx_connector.write_data_points = MagicMock(side_effect=written_data_points.extend)
+        start_time = datetime(2024,1,1)
+
+        # Execute
+        for i in range(40):
+            simulation_datetime = start_time + timedelta(seconds=60 * i)
+            timestamp = get_epoch_seconds(simulation_datetime)
+            for battery_id in battery_ids:
+                self.influx_connector.set_time_step_data_point(battery_id, "active_power", simulation_datetime, float(i))
+                self.influx_connector.set_time_step_data_point(battery_id, "reactive_power", simulation_datetime, float(i))
+                recorded_data_points = ColumnarPointBuffer()
+                recorded_data_points.append(battery_id, "temperature", timestamp, 20 + i % 7)
+                recorded_data_points.append(battery_id, "state", timestamp, f"state-{i}")
+                recorded_data_points.append(battery_id, "state_of_charge", timestamp, i / 40)
+                self.influx_connector.set_time_step_data_points(recorded_data_points)
+        self.influx_connector.write_output()
+        self.influx_connector.stop_writer()
+
+        # Assert
+        window_timestamps = [get_epoch_seconds(start_time + timedelta(seconds=900 * window)) for window in range(3)]
+        for battery_id in battery_ids:
+            def written_values(output_name):
+                return [(timestamp, value) for esdl_id, written_output_name, timestamp, value in zip(written_data_points.esdl_ids, written_data_points.output_names, written_data_points.timestamps, written_data_points.values) if esdl_id == battery_id and written_output_name == output_name]
+            self.assertListEqual(written_values("active_power"), list(zip(window_timestamps, [7.0, 22.0, 34.5])))
+            self.assertListEqual(written_values("temperature"), list(zip(window_timestamps, [26, 26, 26])))
+            self.assertListEqual(written_values("state"), [(window_timestamps[0], "state-29"), (window_timestamps[2], "state-39")])
+            self.assertListEqual(written_values("state_of_charge"), [(get_epoch_seconds(start_time + timedelta(seconds=60 * i)), i / 40) for i in range(0, 40, 10)])
+            self.assertEqual(len(written_values("reactive_power")), 40)
+
+    def test_recording_policies_of_outputs_with_same_name_apply_per_calculation(self):
+        # Arrange
+        battery_id = str(uuid.uuid4())
+        self.influx_connector.init_profile_output_data("test-sim-id", "test-model-id", "Battery", {battery_id : Battery(name='battery_test', id=battery_id)})
+        self.influx_connector.set_recording_policy("active_power", RecordingPolicy(RecordingAggregation.MEAN, window_in_seconds=900), "calculation-1")
+        self.influx_connector.set_recording_policy("active_power", RecordingPolicy(RecordingAggregation.MAX, window_in_seconds=900), "calculation-2")
+        self.influx_connector.set_recording_policy("temperature", RecordingPolicy(RecordingAggregation.MIN, window_in_seconds=900))
+        written_data_points = ColumnarPointBuffer()
+        self.influx_connector.write_data_points = MagicMock(side_effect=written_data_points.extend)
+        start_time = datetime(2024,1,1)
+
+        # Execute
+        for i in range(15):
+            simulation_datetime = start_time + timedelta(seconds=60 * i)
+            recorded_data_points = ColumnarPointBuffer()
+            recorded_data_points.append(battery_id, "active_power", get_epoch_seconds(simulation_datetime), float(i))
+            self.influx_connector.set_time_step_data_points(recorded_data_points, "calculation-1")
+            self.influx_connector.set_calculation_name("calculation-2")
+            self.influx_connector.set_time_step_data_point(battery_id, "active_power", simulation_datetime, float(i))
+            self.influx_connector.set_time_step_data_point(battery_id, "temperature", simulation_datetime, float(20 + i), "calculation-3")
+        self.influx_connector.stop_writer()
+
+        # Assert
+        written_values = sorted(zip(written_data_points.output_names, written_data_points.values))
+        self.assertListEqual(written_values, [("active_power", 7.0), ("active_power", 14.0), ("temperature", 20.0)])
+
+    def _mock_chunked_query_response(self, response_chunks):
+        response = MagicMock()
+        response.iter_lines.return_value = [json.dumps(response_chunk).encode("utf-8") for response_chunk in response_chunks]
+        self.influx_connector.connect.return_value.request.return_value = response
+        return response
+
+    def _query_response_chunks(self):
+        return [
+            {"results": [{"statement_id": 0, "series": [{"name": "Battery", "tags": {"esdl_id": "battery-1"}, "columns": ["time", "active_power", "state"], "values": [[1704067200, 1.5, "charging"], [1704067201, None, "idle"]]}], "partial": True}]},
+            {"results": [{"statement_id": 0, "series": [{"name": "Battery", "tags": {"esdl_id": "battery-1"}, "columns": ["time", "active_power", "state"], "values": [[1704067202, 3.5, "charging"]]}], "partial": True}]},
+            {"results": [{"statement_id": 0, "series": [{"name": "Battery", "tags": {"esdl_id": "battery-2"}, "columns": ["time", "active_power", "state"], "values": [[1704067200, 2.0, None]]}]}]},
+        ]
+
+    def test_query_result_is_streamed_in_chunks_into_numpy_arrays_per_series(self):
+        # Arrange
+        response = self._mock_chunked_query_response(self._query_response_chunks())
+
+        # Execute
+        query_series = self.influx_connector.query_arrays('SELECT * FROM "Battery" GROUP BY "esdl_id"', chunk_size=2)
+
+        # Assert
+        self.influx_connector.client.request.assert_called_once_with(url="query", method="GET", params={"q": 'SELECT * FROM "Battery" GROUP BY "esdl_id"', "db": "test-db-name", "epoch": "s", "chunked": "true", "chunk_size": 2}, stream=True, expected_response_code=200)
+        response.close.assert_called_once()
+        self.assertListEqual([(series.name, series.tags, len(series)) for series in query_series], [("Battery", {"esdl_id": "battery-1"}, 3), ("Battery", {"esdl_id": "battery-2"}, 1)])
+        np.testing.assert_array_equal(query_series[0].columns["time"], np.array(["2024-01-01T00:00:00", "2024-01-01T00:00:01", "2024-01-01T00:00:02"], dtype="datetime64[s]"))
+        np.testing.assert_array_equal(query_series[0].columns["active_power"], np.array([1.5, np.nan, 3.5]))
+        self.assertEqual(query_series[0].columns["active_power"].dtype, np.float64)
+        self.assertListEqual(query_series[0].columns["state"].tolist(), ["charging", "idle", "charging"])
+
+    def test_query_error_in_chunked_response_is_raised(self):
+        # Arrange
+        self._mock_chunked_query_response([{"results": [{"statement_id": 0, "error": "database not found: test-db-name"}]}])
+
+        # Execute & Assert
+        with self.assertRaises(InfluxDBClientError):
+            list(self.influx_connector.iter_query_chunks('SELECT * FROM "Battery"'))
+
+    @unittest.skipIf(pd is None, "pandas is not installed")
+    def test_query_result_as_dataframe_has_column_per_field_and_tag(self):
+        # Arrange
+        self._mock_chunked_query_response(self._query_response_chunks())
+
+        # Execute
+        dataframe = self.influx_connector.query_dataframe('SELECT * FROM "Battery" GROUP BY "esdl_id"')
+
+        # Assert
+        self.assertListEqual(list(dataframe.columns), ["measurement", "active_power", "state", "esdl_id"])
+        self.assertListEqual(dataframe["esdl_id"].tolist(), ["battery-1", "battery-1", "battery-1", "battery-2"])
+        self.assertEqual(dataframe.index[2], pd.Timestamp("2024-01-01 00:00:02"))
+        self.assertEqual(dataframe["active_power"].sum(), 7.0)
+
+    def test_result_sink_without_write_data_points_can_not_be_constructed(self):
+        # Arrange
+        class ResultSinkWithoutWrite(ResultSink):
+            pass
+
+        # Execute / Assert
+        with self.assertRaises(TypeError):
+            ResultSinkWithoutWrite()
 
 if __name__ == '__main__':
     unittest.main()
\ No newline at end of file
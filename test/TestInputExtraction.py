@@ -1,10 +1,51 @@
 import unittest
 import base64
+import tempfile
+from unittest.mock import patch
 import helics as h
+from esdl import esdl
+from esdl.esdl_handler import EnergySystemHandler, StringURI
 
+from dots_infrastructure.EsdlCache import EsdlCache
 from dots_infrastructure.EsdlHelper import EsdlHelper
 from dots_infrastructure.DataClasses import CalculationServiceInput, SubscriptionDescription
 
+def create_radial_feeder_base64_esdl(amount_of_cables : int) -> str:
+    """Creates a feeder of cables in series with an EConnection on the out port of every cable."""
+    energy_system = esdl.EnergySystem(id="radial-feeder", name="radial-feeder")
+    instance = esdl.Instance(id="radial-feeder-instance")
+    instance.area = esdl.Area(id="radial-feeder-area")
+    energy_system.instance.append(instance)
+    previous_out_port = None
+    for i in range(amount_of_cables):
+        cable = esdl.ElectricityCable(id=f"cable-{i}", port=[esdl.InPort(id=f"cable-{i}-in"), esdl.OutPort(id=f"cable-{i}-out")])
+        e_connection = esdl.EConnection(id=f"e-connection-{i}", port=[esdl.InPort(id=f"e-connection-{i}-in")])
+        if previous_out_port is not None:
+            cable.port[0].connectedTo.append(previous_out_port)
+        e_connection.port[0].connectedTo.append(cable.port[1])
+        previous_out_port = cable.port[1]
+        instance.area.asset.extend([cable, e_connection])
+    esh = EnergySystemHandler()
+    esh.energy_system = energy_system
+    esh.resource = esh.rset.create_resource(StringURI("radial-feeder.esdl"))
+    esh.resource.append(energy_system)
+    return base64.b64encode(esh.to_string().encode('utf-8')).decode('utf-8')
+
+class NeighbourReadCounter(dict):
+    def __init__(self, neighbours : dict):
+        super().__init__(neighbours)
+        self.amount_of_neighbours_read = 0
+
+    def __getitem__(self, key):
+        value = super().__getitem__(key)
+        self.amount_of_neighbours_read += len(value)
+        return value
+
+    def get(self, key, default=None):
+        value = super().get(key, default)
+        self.amount_of_neighbours_read += len(value) if value is not None else 0
+        return value
+
 class TestParse(unittest.TestCase):
 
     def setUp(self):
@@ -169,5 +210,114 @@ class TestParse(unittest.TestCase):
         # Assert correct assets are extracted from esdl file
         self.assertListEqual(expected_input_descriptions, inputs)
 
+    def test_topology_index_places_connected_assets_in_the_same_component(self):
+        # Arrange
+        e_connection_id = '7415cddb-b735-4646-b772-47f101b5c7a8'
+        electricity_demand_id = '5ad97622-7226-40b1-a163-260b3478b1e3'
+        pv_installation_id = '208c4a92-148a-4893-b474-37cad47b2fcb'
+
+        # Execute
+        esdl_helper = EsdlHelper(self.encoded_base64_esdl)
+
+        # Assert
+        e_connection_component = esdl_helper.component_per_esdl_id[e_connection_id]
+        self.assertEqual(esdl_helper.component_per_esdl_id[electricity_demand_id], e_connection_component)
+        self.assertEqual(esdl_helper.component_per_esdl_id[pv_installation_id], e_connection_component)
+        self.assertTrue({"EConnection", "ElectricityDemand", "PVInstallation"}.issubset(esdl_helper.type_names_per_component[e_connection_component]))
+        self.assertTrue(all(esdl_helper.component_per_esdl_id[connected_asset.id] == e_connection_component for connected_asset in esdl_helper.connected_assets[e_connection_id]))
+
+    def test_warm_esdl_cache_returns_cached_inputs_without_searching_model(self):
+        # Arrange
+        simulator_esdl_id = '15bc27e8-97db-427c-959e-e2a2fca27f75'
+        subscription_descriptions = [
+            SubscriptionDescription(esdl_type="ElectricityDemand",input_name="active_power",input_unit="W",input_type=h.HelicsDataType.VECTOR),
+            SubscriptionDescription(esdl_type="EConnection",input_name="heat_to_dw",input_unit="W",input_type=h.HelicsDataType.VECTOR)
+        ]
+        calculation_services = [
+            "ElectricityDemand",
+            "EConnection"
+        ]
+
+        with tempfile.TemporaryDirectory() as cache_directory:
+            cold_esdl_helper = EsdlHelper(self.encoded_base64_esdl, esdl_cache=EsdlCache(cache_directory))
+            expected_inputs = cold_esdl_helper.get_connected_input_esdl_objects(simulator_esdl_id, calculation_services, subscription_descriptions)
+            cold_esdl_helper.store_cache_entry()
+
+            # Execute
+            warm_esdl_helper = EsdlHelper(self.encoded_base64_esdl, esdl_cache=EsdlCache(cache_directory))
+            with patch.object(warm_esdl_helper, "add_calc_services_from_ports") as add_calc_services_from_ports:
+                inputs = warm_esdl_helper.get_connected_input_esdl_objects(simulator_esdl_id, calculation_services, subscription_descriptions)
+
+            # Assert
+            self.assertListEqual(expected_inputs, inputs)
+            add_calc_services_from_ports.assert_not_called()
+
+    def test_services_sharing_esdl_cache_keep_each_others_subscriptions(self):
+        # Arrange
+        simulator_esdl_id = '15bc27e8-97db-427c-959e-e2a2fca27f75'
+        demand_descriptions = [SubscriptionDescription(esdl_type="ElectricityDemand",input_name="active_power",input_unit="W",input_type=h.HelicsDataType.VECTOR)]
+        connection_descriptions = [SubscriptionDescription(esdl_type="EConnection",input_name="heat_to_dw",input_unit="W",input_type=h.HelicsDataType.VECTOR)]
+
+        with tempfile.TemporaryDirectory() as cache_directory:
+            demand_service_helper = EsdlHelper(self.encoded_base64_esdl, esdl_cache=EsdlCache(cache_directory))
+            connection_service_helper = EsdlHelper(self.encoded_base64_esdl, esdl_cache=EsdlCache(cache_directory))
+
+            # Execute
+            expected_demand_inputs = demand_service_helper.get_connected_input_esdl_objects(simulator_esdl_id, ["ElectricityDemand"], demand_descriptions)
+            expected_connection_inputs = connection_service_helper.get_connected_input_esdl_objects(simulator_esdl_id, ["EConnection"], connection_descriptions)
+            demand_service_helper.store_cache_entry()
+            connection_service_helper.store_cache_entry()
+
+            # Assert
+            warm_esdl_helper = EsdlHelper(self.encoded_base64_esdl, esdl_cache=EsdlCache(cache_directory))
+            with patch.object(warm_esdl_helper, "add_calc_services_from_ports") as add_calc_services_from_ports:
+                self.assertListEqual(expected_demand_inputs, warm_esdl_helper.get_connected_input_esdl_objects(simulator_esdl_id, ["ElectricityDemand"], demand_descriptions))
+                self.assertListEqual(expected_connection_inputs, warm_esdl_helper.get_connected_input_esdl_objects(simulator_esdl_id, ["EConnection"], connection_descriptions))
+            add_calc_services_from_ports.assert_not_called()
+
+    def test_esdl_cache_key_of_subscriptions_does_not_depend_on_order_of_calculation_services(self):
+        # Arrange
+        esdl_helper = EsdlHelper(self.encoded_base64_esdl)
+        subscription_descriptions = [SubscriptionDescription(esdl_type="EConnection",input_name="heat_to_dw",input_unit="W",input_type=h.HelicsDataType.VECTOR)]
+
+        # Execute
+        cache_key = esdl_helper._get_subscriptions_cache_key(["ElectricityDemand", "EConnection"], subscription_descriptions)
+        reordered_cache_key = esdl_helper._get_subscriptions_cache_key(["EConnection", "ElectricityDemand"], subscription_descriptions)
+
+        # Assert
+        self.assertEqual(cache_key, reordered_cache_key)
+        self.assertEqual(cache_key, (("EConnection", "ElectricityDemand"), (("EConnection", "heat_to_dw", "W", int(h.HelicsDataType.VECTOR)),)))
+
+    def test_esdl_cache_can_be_used_with_esdl_file_stream(self):
+        # Arrange
+        with tempfile.TemporaryDirectory() as cache_directory:
+            esdl_helper = EsdlHelper(self.encoded_base64_esdl, esdl_cache=EsdlCache(cache_directory))
+
+            # Execute
+            with open("test-input-extraction-network.esdl", mode="rb") as esdl_file:
+                file_esdl_helper = EsdlHelper(esdl_stream=esdl_file, esdl_cache=EsdlCache(cache_directory))
+                energy_system_id = file_esdl_helper.energy_system.id
+
+            # Assert
+            self.assertEqual(esdl_helper.esdl_hash, file_esdl_helper.esdl_hash)
+            self.assertEqual(esdl_helper.energy_system.id, energy_system_id)
+
+    def test_connected_inputs_of_every_asset_are_answered_from_index_without_walking_the_feeder(self):
+        # Arrange
+        amount_of_cables = 200
+        esdl_helper = EsdlHelper(create_radial_feeder_base64_esdl(amount_of_cables))
+        subscription_descriptions = [SubscriptionDescription(esdl_type="EConnection",input_name="active_power",input_unit="W",input_type=h.HelicsDataType.DOUBLE)]
+        esdl_helper.connected_assets = NeighbourReadCounter(esdl_helper.connected_assets)
+        esdl_helper.neighbour_ids = NeighbourReadCounter(esdl_helper.neighbour_ids)
+
+        # Execute
+        inputs_per_cable = [esdl_helper.get_connected_input_esdl_objects(f"cable-{i}", ["EConnection"], subscription_descriptions) for i in range(amount_of_cables)]
+
+        # Assert
+        for i, inputs in enumerate(inputs_per_cable):
+            self.assertListEqual([connected_input.input_esdl_id for connected_input in inputs], [f"e-connection-{j}" for j in range(i, amount_of_cables)])
+        self.assertEqual(esdl_helper.neighbour_ids.amount_of_neighbours_read, 0)
+        self.assertLessEqual(esdl_helper.connected_assets.amount_of_neighbours_read, 3 * amount_of_cables)
+
 if __name__ == '__main__':
     unittest.main()
\ No newline at end of file
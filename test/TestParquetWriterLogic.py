@@ -0,0 +1,85 @@
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+import os
+import tempfile
+import unittest
+import uuid
+
+from esdl import Battery
+
+from dots_infrastructure.parquet_connector import ParquetConnector, pq
+
+@unittest.skipIf(pq is None, "pyarrow is not installed")
+class TestParquetWriterLogic(unittest.TestCase):
+
+    def setUp(self):
+        self.output_directory = tempfile.TemporaryDirectory()
+        self.parquet_connector = ParquetConnector(self.output_directory.name)
+
+    def tearDown(self):
+        self.parquet_connector.stop_writer()
+        self.output_directory.cleanup()
+
+    def test_data_points_are_written_in_row_groups_to_file_per_model_id(self):
+        # Arrange
+        test_battery_id = str(uuid.uuid4())
+        battery = Battery(name='battery_test', id=test_battery_id)
+        self.parquet_connector.init_profile_output_data("test-sim-id", "test-model-id", "Battery", {test_battery_id : battery})
+        for i in range(0,200100):
+            self.parquet_connector.set_time_step_data_point(test_battery_id, "test-output", datetime(2024,1,1) + timedelta(seconds=i), i * 0.5)
+
+        # Execute
+        self.parquet_connector.stop_writer()
+
+        # Assert
+        output_file = pq.ParquetFile(os.path.join(self.output_directory.name, "test-sim-id", "test-model-id.parquet"))
+        self.assertListEqual([output_file.metadata.row_group(i).num_rows for i in range(output_file.num_row_groups)], [100000, 100000, 100])
+        self.assertEqual(output_file.schema_arrow.metadata[b"model_id"], b"test-model-id")
+        table = output_file.read()
+        self.assertListEqual(table.column("value").to_pylist(), [i * 0.5 for i in range(0,200100)])
+        self.assertEqual(table.column("time")[1].as_py(), datetime(2024,1,1,0,0,1))
+        self.assertEqual(set(table.column("esdl_name").to_pylist()), {"battery_test"})
+
+    def test_data_points_are_written_in_row_groups_of_configured_chunk_size(self):
+        # Arrange
+        self.parquet_connector.stop_writer()
+        self.parquet_connector = ParquetConnector(self.output_directory.name, chunk_size=1000)
+        test_battery_id = str(uuid.uuid4())
+        self.parquet_connector.init_profile_output_data("test-sim-id", "test-model-id", "Battery", {test_battery_id : Battery(name='battery_test', id=test_battery_id)})
+        for i in range(0,2500):
+            self.parquet_connector.set_time_step_data_point(test_battery_id, "test-output", datetime(2024,1,1) + timedelta(seconds=i), i * 0.5)
+
+        # Execute
+        self.parquet_connector.stop_writer()
+
+        # Assert
+        output_file = pq.ParquetFile(os.path.join(self.output_directory.name, "test-sim-id", "test-model-id.parquet"))
+        self.assertListEqual([output_file.metadata.row_group(i).num_rows for i in range(output_file.num_row_groups)], [1000, 1000, 500])
+
+    def test_non_numeric_values_from_multiple_threads_are_stored_as_text(self):
+        # Arrange
+        battery_ids = [str(uuid.uuid4()) for _ in range(4)]
+        batteries = {battery_id : Battery(name=f'battery_{i}', id=battery_id) for i, battery_id in enumerate(battery_ids)}
+        self.parquet_connector.init_profile_output_data("test-sim-id", "test-model-id", "Battery", batteries)
+
+        def write_data_points(battery_id):
+            for i in range(15000):
+                self.parquet_connector.set_time_step_data_point(battery_id, "test-output", datetime(2024,1,1), i)
+                self.parquet_connector.set_time_step_data_point(battery_id, "test-vector", datetime(2024,1,1), [i, i])
+
+        # Execute
+        with ThreadPoolExecutor(len(battery_ids)) as executor:
+            list(executor.map(write_data_points, battery_ids))
+        self.parquet_connector.stop_writer()
+
+        # Assert
+        table = pq.read_table(os.path.join(self.output_directory.name, "test-sim-id", "test-model-id.parquet"))
+        self.assertEqual(table.num_rows, len(battery_ids) * 30000)
+        rows = table.to_pylist()
+        for battery_id in battery_ids:
+            battery_rows = [row for row in rows if row["esdl_id"] == battery_id]
+            self.assertListEqual([row["value"] for row in battery_rows if row["output_name"] == "test-output"], [float(i) for i in range(15000)])
+            self.assertListEqual([row["value_text"] for row in battery_rows if row["output_name"] == "test-vector"], [str([i, i]) for i in range(15000)])
+
+if __name__ == '__main__':
+    unittest.main()
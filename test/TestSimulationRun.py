@@ -397,6 +397,35 @@ class TestSimulation(unittest.TestCase):
         actual_data_point_values_dispatch = [dp.value for dp in cs_econnection.influx_connector.data_points]
         self.assertListEqual(expected_data_point_values_dispatch, actual_data_point_values_dispatch)
 
+    def test_given_output_with_tolerance_then_unchanged_values_are_not_published_and_subscriber_keeps_last_value(self):
+        # Arrange 
+        self.start_broker(2)
+
+        expected_data_point_values_dispatch = []
+        for i in range(1, 5):
+            expected_data_point_values_dispatch.append(i)
+            expected_data_point_values_dispatch.append(1)
+
+        # Execute
+        cs_econnection = CalculationServiceMultiplePvInputsEConnection()
+        cs_dispatch = CalculationServicePVDispatchMultipleOutputs()
+        cs_econnection.calculations[0].helics_value_federate_info.inputs[1].keep_last_value = True
+        cs_dispatch.calculations[0].helics_value_federate_info.outputs[1].absolute_tolerance = 5.0
+        cs_dispatch.calculations[0].publish_helics_value = MagicMock(side_effect=cs_dispatch.calculations[0].publish_helics_value)
+
+        cs_econnection.start_simulation()
+        cs_dispatch.start_simulation()
+        cs_econnection.stop_simulation()
+        cs_dispatch.stop_simulation()
+        self.stop_broker()
+
+        # Assert
+        actual_data_point_values_dispatch = [dp.value for dp in cs_econnection.influx_connector.data_points]
+        self.assertListEqual(expected_data_point_values_dispatch, actual_data_point_values_dispatch)
+        published_output_names = [output.output_name for output, _ in (publish_call.args for publish_call in cs_dispatch.calculations[0].publish_helics_value.call_args_list)]
+        self.assertEqual(published_output_names.count("PV_Dispatch"), 8)
+        self.assertEqual(published_output_names.count("PV_Dispatch2"), 2)
+
     def test_given_exception_occurss_termination_bool_is_set_to_true(self):
         # Arrange 
         self.start_broker(2)
@@ -464,6 +493,41 @@ class TestSimulation(unittest.TestCase):
         self.assertEqual(len(cs_dispatch.influx_connector.data_points), SIMULATION_DURATION_IN_SECONDS / pv_period * 2)
         self.assertTrue(cs_econnection.calculation_service_initialized)
 
+    def test_given_calculation_services_with_multiplexed_calculations_then_simulation_executes_as_with_federate_per_calculation(self):
+        # Arrange 
+        self.start_broker(4)
+
+        expected_data_point_values_dispatch = [i for i in range(1, 5)]
+        expected_data_point_values_schedule = [[i * 2.0 * i, i * 2.0 * i, i * 2.0 * i] for i in range(1, 3)]
+
+        # Execute
+        cs_econnection = CalculationServiceEConnection()
+        cs_dispatch = CalculationServicePVDispatch()
+        cs_market = CalculationServiceMarketService()
+        cs_electricity_commodity = CalculationServiceElectricityCommodity()
+        cs_econnection.simulator_configuration.multiplex_calculations = True
+        cs_dispatch.simulator_configuration.multiplex_calculations = True
+
+        cs_econnection.start_simulation()
+        cs_dispatch.start_simulation()
+        cs_market.start_simulation()
+        cs_electricity_commodity.start_simulation()
+        cs_econnection.stop_simulation()
+        cs_dispatch.stop_simulation()
+        cs_market.stop_simulation()
+        cs_electricity_commodity.stop_simulation()
+        self.stop_broker()
+
+        # Assert
+        actual_data_point_values_dispatch = [dp.value for dp in cs_econnection.influx_connector.data_points if not isinstance(dp.value, List)]
+        actual_data_point_values_schedule = [dp.value for dp in cs_econnection.influx_connector.data_points if isinstance(dp.value, List)]
+        actual_data_point_values_loadflow = [dp.value for dp in cs_electricity_commodity.influx_connector.data_points]
+        self.assertListEqual(expected_data_point_values_dispatch, actual_data_point_values_dispatch)
+        self.assertListEqual(expected_data_point_values_schedule, actual_data_point_values_schedule)
+        self.assertListEqual(expected_data_point_values_dispatch, actual_data_point_values_loadflow)
+        self.assertEqual(len(cs_dispatch.influx_connector.data_points), SIMULATION_DURATION_IN_SECONDS / 30 * 2)
+        self.assertTrue(all(calculation.running_status.terminated for calculation in cs_econnection.calculations + cs_dispatch.calculations))
+
     def test_given_a_two_calculation_services_in_control_loop_then_data_is_exchanged_as_expected(self):
         # Arrange 
         self.start_broker(3)
@@ -486,6 +550,75 @@ class TestSimulation(unittest.TestCase):
         actual_data_point_values_dispatch = [dp.value for dp in cs_dispatch.influx_connector.data_points ]
         self.assertListEqual(expected_data_point_values_dispatch, actual_data_point_values_dispatch)
 
+    def test_given_multiplexed_calculation_service_in_control_loop_then_data_is_exchanged_as_expected(self):
+        # Arrange 
+        self.start_broker(2)
+        expected_data_point_values_dispatch = []
+        for i in range(2, 6):
+            expected_data_point_values_dispatch.append(i)
+            expected_data_point_values_dispatch.append(i)
+
+        # Execute
+        cs_econnection = CalculationServiceEConnectionControlLoop()
+        cs_dispatch = CalculationServicePVDispatchControlLoop()
+        cs_dispatch.simulator_configuration.multiplex_calculations = True
+
+        cs_econnection.start_simulation()
+        cs_dispatch.start_simulation()
+        cs_econnection.stop_simulation()
+        cs_dispatch.stop_simulation()
+        self.stop_broker()
+
+        # Assert
+        actual_data_point_values_dispatch = [dp.value for dp in cs_dispatch.influx_connector.data_points ]
+        self.assertListEqual(expected_data_point_values_dispatch, actual_data_point_values_dispatch)
+
+    def test_given_calculation_service_federates_share_a_core_then_data_is_exchanged_as_expected(self):
+        # Arrange 
+        self.start_broker(3)
+        expected_data_point_values_dispatch = []
+        for i in range(2, 6):
+            expected_data_point_values_dispatch.append(i)
+            expected_data_point_values_dispatch.append(i)
+
+        # Execute
+        cs_econnection = CalculationServiceEConnectionControlLoop()
+        cs_dispatch = CalculationServicePVDispatchControlLoop()
+        cs_dispatch.simulator_configuration.share_helics_core = True
+
+        cs_econnection.start_simulation()
+        cs_dispatch.start_simulation()
+        cs_econnection.stop_simulation()
+        cs_dispatch.stop_simulation()
+        self.stop_broker()
+
+        # Assert
+        actual_data_point_values_dispatch = [dp.value for dp in cs_dispatch.influx_connector.data_points ]
+        self.assertListEqual(expected_data_point_values_dispatch, actual_data_point_values_dispatch)
+
+    def test_given_calculation_requests_time_asynchronously_then_data_is_exchanged_as_expected(self):
+        # Arrange 
+        self.start_broker(3)
+        expected_data_point_values_dispatch = []
+        for i in range(2, 6):
+            expected_data_point_values_dispatch.append(i)
+            expected_data_point_values_dispatch.append(i)
+
+        # Execute
+        cs_econnection = CalculationServiceEConnectionControlLoop()
+        cs_dispatch = CalculationServicePVDispatchControlLoop()
+        cs_dispatch.calculations[0].helics_value_federate_info.asynchronous_time_requests = True
+
+        cs_econnection.start_simulation()
+        cs_dispatch.start_simulation()
+        cs_econnection.stop_simulation()
+        cs_dispatch.stop_simulation()
+        self.stop_broker()
+
+        # Assert
+        actual_data_point_values_dispatch = [dp.value for dp in cs_dispatch.influx_connector.data_points ]
+        self.assertListEqual(expected_data_point_values_dispatch, actual_data_point_values_dispatch)
+
     def test_given_a_calculation_service_has_offset_then_first_execution_is_at_offset_time(self):
         # Arrange 
         self.start_broker(1)